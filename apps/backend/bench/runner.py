@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from bench.synthetic import DUO_PUUID_A, DUO_PUUID_B, generate_events, generate_matches
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT_DIR = Path.cwd() / ".cache" / "bench"
+PROFILES = {
+    "quick": {"matches": [10, 200, 1000], "events": [0, 1000, 10000]},
+    "full": {"matches": [10, 200, 1000, 10000], "events": [0, 1000, 10000, 100000]},
+}
+ANALYTICS_FUNCTIONS = ["build_duo_scorecard", "build_personalized_playbook", "build_duo_highlights"]
+
+
+def load_targets(app_dir: Path) -> tuple[Any, Any]:
+    # Import duo_analytics/main from the requested tree so a base checkout can be measured with this harness.
+    sys.path.insert(0, str(app_dir))
+    for name in ("duo_analytics", "main"):
+        sys.modules.pop(name, None)
+    return importlib.import_module("duo_analytics"), importlib.import_module("main")
+
+
+def measure(fn: Callable[[], Any], min_time: float, max_repeats: int) -> dict[str, Any]:
+    samples: list[float] = []
+    started = time.perf_counter()
+    gc.collect()
+    while len(samples) < 3 or (len(samples) < max_repeats and time.perf_counter() - started < min_time):
+        run_started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - run_started) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _current, peak = tracemalloc.get_traced_memory()
+    snapshot_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return {
+        "repeats": len(samples),
+        "medianMs": round(statistics.median(samples), 4),
+        "minMs": round(min(samples), 4),
+        "maxMs": round(max(samples), 4),
+        "peakKiB": round(peak / 1024, 1),
+        "liveBlocks": snapshot_blocks,
+    }
+
+
+def summarize_all(main_module: Any, raw_matches: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    out = []
+    for raw in raw_matches:
+        summary = main_module.summarize_duo_match(raw["metadata"]["match_id"], raw, DUO_PUUID_A, DUO_PUUID_B)
+        if summary is not None:
+            out.append(summary)
+    return out
+
+
+def run_suite(profile: str, app_dir: Path, min_time: float, max_repeats: int, only: set[str] | None = None) -> dict[str, Any]:
+    analytics, main_module = load_targets(app_dir)
+    sizes = PROFILES[profile]
+    results: list[dict[str, Any]] = []
+
+    def record(name: str, matches: int, events: int, fn: Callable[[], Any]) -> None:
+        if only and name not in only:
+            return
+        row = {"name": name, "matches": matches, "events": events, **measure(fn, min_time, max_repeats)}
+        results.append(row)
+        print(f"{name:<32} matches={matches:<6} events={events:<7} median={row['medianMs']:>10.3f}ms peak={row['peakKiB']:>10.1f}KiB", flush=True)
+
+    for match_count in sizes["matches"]:
+        raw_matches = generate_matches(match_count)
+        if hasattr(main_module, "summarize_duo_match"):
+            record("summarize_duo_match", match_count, 0, lambda raw_matches=raw_matches: summarize_all(main_module, raw_matches))
+            summarized = summarize_all(main_module, raw_matches)
+        else:
+            summarized = []
+        if hasattr(main_module, "summarize_matches"):
+            rows = [(raw["metadata"]["match_id"], raw) for raw in raw_matches]
+            record("summarize_matches", match_count, 0, lambda rows=rows: main_module.summarize_matches(rows, DUO_PUUID_A, DUO_PUUID_B))
+            record("summarize_matches_no_lobby", match_count, 0, lambda rows=rows: main_module.summarize_matches(rows, DUO_PUUID_A, DUO_PUUID_B, False))
+        participants = [entry for raw in raw_matches for entry in raw["info"]["participants"]]
+        record("summarize_participant", match_count, 0, lambda participants=participants: [main_module.summarize_participant(entry) for entry in participants])
+
+        if not summarized:
+            # A tree without summarize_duo_match cannot build real inputs; timing build_* on an empty list would be
+            # compared against real data under the same key, so those cases are skipped instead.
+            print(f"skipping analytics cases for matches={match_count}: {app_dir} has no summarize_duo_match", flush=True)
+            continue
+        match_ids = [match["id"] for match in summarized]
+        openers = None
+        if hasattr(main_module, "OpenerIndex"):
+            # duo_history folds each match into the opener index once on arrival and ranks it after each sync, so the
+            # playbook is timed on that path (rank cache cleared) instead of the full-history opener pass production
+            # never runs. It keeps the playbook's name so base and head trees still pair up in compare().
+            openers = main_module.OpenerIndex()
+            openers.add_matches(summarized)
+        for event_count in sizes["events"]:
+            events = generate_events(event_count, match_ids)
+            for name in ANALYTICS_FUNCTIONS:
+                fn = getattr(analytics, name)
+                if name == "build_personalized_playbook" and openers is not None:
+                    record(name, match_count, event_count, lambda fn=fn, summarized=summarized, events=events, openers=openers: (openers.ranked.clear(), fn(summarized, events, openers.rank())))
+                    continue
+                record(name, match_count, event_count, lambda fn=fn, summarized=summarized, events=events: fn(summarized, events))
+
+    return {
+        "meta": {
+            "profile": profile,
+            "appDir": str(app_dir),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "generatedAt": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float, min_delta_ms: float) -> list[dict[str, Any]]:
+    # Cases present on only one side are listed with `missing` ("baseline" or "current") instead of being dropped,
+    # so a renamed or newly skipped benchmark shows up in the report.
+    base_by_key = {(row["name"], row["matches"], row["events"]): row for row in baseline.get("results", [])}
+    current_keys = set()
+    rows = []
+    for row in current.get("results", []):
+        key = (row["name"], row["matches"], row["events"])
+        current_keys.add(key)
+        base = base_by_key.get(key)
+        if not base or not base.get("medianMs"):
+            rows.append({"name": row["name"], "matches": row["matches"], "events": row["events"], "baseMs": None, "currentMs": row["medianMs"], "ratio": None, "regressed": False, "missing": "baseline"})
+            continue
+        ratio = row["medianMs"] / base["medianMs"]
+        regressed = ratio > 1 + threshold and row["medianMs"] - base["medianMs"] > min_delta_ms
+        rows.append({"name": row["name"], "matches": row["matches"], "events": row["events"], "baseMs": base["medianMs"], "currentMs": row["medianMs"], "ratio": round(ratio, 3), "regressed": regressed})
+    for key, base in base_by_key.items():
+        if key not in current_keys:
+            rows.append({"name": key[0], "matches": key[1], "events": key[2], "baseMs": base.get("medianMs"), "currentMs": None, "ratio": None, "regressed": False, "missing": "current"})
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline benchmarks for duo_analytics and match summarization.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--app-dir", type=Path, default=BACKEND_DIR, help="Backend tree to import duo_analytics/main from.")
+    parser.add_argument("--only", default="", help="Comma-separated benchmark names to run.")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds spent timing each case.")
+    parser.add_argument("--max-repeats", type=int, default=25)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_DIR / "latest.json")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write results to .cache/bench/baseline.json.")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline results JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed median slowdown ratio before flagging (0.25 = +25%%).")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Ignore slowdowns smaller than this many milliseconds.")
+    args = parser.parse_args(argv)
+
+    only = {token.strip() for token in args.only.split(",") if token.strip()} or None
+    current = run_suite(args.profile, args.app_dir.resolve(), args.min_time, max(3, args.max_repeats), only)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(current, indent=2), encoding="utf-8")
+    print(f"wrote {args.output}")
+    if args.save_baseline:
+        baseline_path = DEFAULT_OUTPUT_DIR / "baseline.json"
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"wrote {baseline_path}")
+
+    if args.compare is None:
+        return 0
+    baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+    if only:
+        baseline["results"] = [row for row in baseline.get("results", []) if row["name"] in only]
+    rows = compare(current, baseline, args.threshold, args.min_delta_ms)
+    for row in rows:
+        if row.get("missing"):
+            timed = row["currentMs"] if row["missing"] == "baseline" else row["baseMs"]
+            print(f"{'MISSING':<10} {row['name']:<32} matches={row['matches']:<6} events={row['events']:<7} not in {row['missing']} ({timed:.3f}ms on the other side)")
+            continue
+        flag = "REGRESSION" if row["regressed"] else "ok"
+        print(f"{flag:<10} {row['name']:<32} matches={row['matches']:<6} events={row['events']:<7} {row['baseMs']:>10.3f}ms -> {row['currentMs']:>10.3f}ms (x{row['ratio']})")
+    regressions = [row for row in rows if row["regressed"]]
+    missing = [row for row in rows if row.get("missing")]
+    print(f"{len(regressions)} regression(s) across {len(rows) - len(missing)} compared case(s), {len(missing)} case(s) missing on one side")
+    return 1 if regressions else 0
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import random
+from typing import Any
+
+SET_NUMBER = 13
+PATCHES = ["14.22", "14.23", "14.24", "15.1"]
+TRAITS = [
+    "Ambusher", "Artillerist", "Bruiser", "Dominator", "Emissary", "Enforcer", "Experiment", "Family", "FormSwapper",
+    "Hextech", "Pugilist", "Quickstriker", "Rebel", "Scrap", "Sentinel", "Sniper", "Sorcerer", "Visionary", "Watcher",
+]
+UNITS = [
+    "Jinx", "Vi", "Ekko", "Silco", "Caitlyn", "Jayce", "Heimerdinger", "Ambessa", "Mel", "Warwick", "Viktor", "Zoe",
+    "Sevika", "Smeech", "Renni", "Loris", "Nunu", "Rell", "Leona", "Twitch", "Corki", "Garen", "Malzahar", "Kog'Maw",
+]
+ITEMS = [
+    "InfinityEdge", "GuinsoosRageblade", "JeweledGauntlet", "WarmogsArmor", "Bloodthirster", "TitansResolve",
+    "SpearOfShojin", "BrambleVest", "DragonsClaw", "HandOfJustice", "Quicksilver", "Redemption", "LastWhisper",
+]
+EVENT_TYPES = ["gift_sent", "roll_down", "rescue_arrival", "missed_bailout", "intent_tag", "comms_snapshot", "augment_pick"]
+
+DUO_PUUID_A = "bench-puuid-a"
+DUO_PUUID_B = "bench-puuid-b"
+BASE_GAME_DATETIME_MS = 1_730_000_000_000
+
+
+def make_participant(rng: random.Random, puuid: str, placement: int, partner_group_id: int, game_name: str) -> dict[str, Any]:
+    traits = []
+    for name in rng.sample(TRAITS, rng.randint(4, 9)):
+        style = rng.choice([0, 1, 1, 2, 3, 4])
+        traits.append({"name": f"TFT{SET_NUMBER}_{name}", "num_units": rng.randint(1, 7), "style": style, "tier_current": min(style, 3), "tier_total": 4})
+    units = []
+    for name in rng.sample(UNITS, rng.randint(6, 10)):
+        units.append(
+            {
+                "character_id": f"TFT{SET_NUMBER}_{name}",
+                "name": "",
+                "tier": rng.choice([1, 2, 2, 2, 3]),
+                "rarity": rng.randint(0, 6),
+                "itemNames": [f"TFT_Item_{item}" for item in rng.sample(ITEMS, rng.randint(0, 3))],
+            }
+        )
+    return {
+        "puuid": puuid,
+        "riotIdGameName": game_name,
+        "riotIdTagline": "BENCH",
+        "placement": placement,
+        "win": placement <= 4,
+        "level": rng.randint(6, 10),
+        "last_round": rng.randint(18, 42),
+        "gold_left": rng.randint(0, 60),
+        "players_eliminated": rng.randint(0, 3),
+        "total_damage_to_players": rng.randint(10, 180),
+        "time_eliminated": rng.uniform(900, 2300),
+        "partner_group_id": partner_group_id,
+        "augments": [f"TFT{SET_NUMBER}_Augment_{rng.randint(1, 200)}" for _ in range(3)],
+        "companion": {"content_ID": f"bench-companion-{rng.randint(1, 50)}", "item_ID": rng.randint(1000, 9999), "skin_ID": rng.randint(1, 40), "species": "PetBench"},
+        "arena_id": rng.randint(1, 30),
+        "arena_skin_id": rng.randint(1, 30),
+        "traits": traits,
+        "units": units,
+    }
+
+
+def make_match(rng: random.Random, index: int, patch: str, puuid_a: str = DUO_PUUID_A, puuid_b: str = DUO_PUUID_B, same_team_rate: float = 0.9) -> dict[str, Any]:
+    # Double Up lobby: 8 players in 4 partner groups, both partners share the team's placement band.
+    seats_by_group: dict[int, list[int]] = {}
+    for team_rank, group_id in enumerate(rng.sample(range(1, 5), 4), start=1):
+        seats_by_group[group_id] = [team_rank * 2 - 1, team_rank * 2]
+    groups = list(seats_by_group)
+    group_a = rng.choice(groups)
+    group_b = group_a if rng.random() < same_team_rate else rng.choice([group for group in groups if group != group_a])
+    seats = [(group_a, seats_by_group[group_a].pop()), (group_b, seats_by_group[group_b].pop())]
+    seats.extend((group_id, placement) for group_id, placements in seats_by_group.items() for placement in placements)
+    puuids = [puuid_a, puuid_b] + [f"bench-lobby-{index}-{seat}" for seat in range(6)]
+    participants = [make_participant(rng, puuid, placement, group_id, f"Bench{position}") for position, (puuid, (group_id, placement)) in enumerate(zip(puuids, seats))]
+    rng.shuffle(participants)
+    return {
+        "metadata": {"match_id": f"NA1_{5_000_000_000 + index}", "participants": puuids, "data_version": "6"},
+        "info": {
+            "game_datetime": BASE_GAME_DATETIME_MS + index * 45 * 60 * 1000,
+            "game_length": rng.uniform(1500, 2400),
+            "game_version": f"Version {patch}.123.4567 (Nov 20 2024/12:00:00) [PUBLIC] <Releases/{patch}>",
+            "queue_id": 1160,
+            "tft_game_type": "pairs",
+            "tft_set_number": SET_NUMBER,
+            "participants": participants,
+        },
+    }
+
+
+def generate_matches(count: int, seed: int = 7) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [make_match(rng, index, PATCHES[index * len(PATCHES) // max(1, count)]) for index in range(count)]
+
+
+def generate_events(count: int, match_ids: list[str], seed: int = 11) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    events: list[dict[str, Any]] = []
+    for index in range(count):
+        etype = rng.choice(EVENT_TYPES)
+        stage_major = rng.randint(2, 6)
+        payload: dict[str, Any] = {"stageMajor": stage_major, "stageMinor": rng.randint(1, 7)}
+        if etype == "gift_sent":
+            payload.update({"giftType": rng.choice(["unit", "item", "gold"]), "outcome": rng.choice(["became_carry", "benched", "sold"]), "partnerState": rng.choice(["stable", "bleeding"])})
+        elif etype == "roll_down":
+            payload.update({"goldBefore": rng.randint(20, 80), "goldAfter": rng.randint(0, 40)})
+        elif etype == "rescue_arrival":
+            payload.update({"roundOutcomeBefore": rng.choice(["loss_likely", "even"]), "roundOutcomeAfter": rng.choice(["won", "lost"]), "teammateAtRisk": rng.random() < 0.5})
+        elif etype == "intent_tag":
+            payload.update({"tag": rng.choice(["panic_roll", "missed_gift", "tempo", "econ"])})
+        events.append(
+            {
+                "id": f"bench-event-{index}",
+                "type": etype,
+                "matchId": match_ids[index % len(match_ids)] if match_ids else None,
+                "payload": payload,
+                "createdAt": BASE_GAME_DATETIME_MS + index * 1000,
+            }
+        )
+    return events
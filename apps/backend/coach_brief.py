@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import Counter, OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from duo_analytics import as_list, pct
+
+SYSTEM_PROMPT = (
+    "You are a TFT Double Up coach helping a duo climb rank. The user message is a compact JSON digest of their recent games "
+    "(per-player placements, traits, champion builds, event metrics and lobby/ladder meta). Return strict JSON with keys: "
+    "headline, summary, confidence (low|medium|high), teamPlan[], metaDelta[], topImprovementAreas[], winConditions[], "
+    "fiveGamePlan[], championBuilds[{player, champion, items[], games, top2Rate, note}], playerPlans[{player, focus, actions[]}], "
+    "patchContext. Compare their builds against the meta digest and say when patch conclusions are inferred."
+)
+# Fields that change on every call but carry no coaching signal; keeping them would defeat the content hash.
+VOLATILE_KEYS = {"generatedAt", "createdAt", "updatedAt", "id", "matchId"}
+LIST_LIMITS = (8, 5, 3, 2, 1)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting JSON prompts.
+    return math.ceil(len(text) / 4)
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def content_hash(value: Any) -> str:
+    return hashlib.sha256(canonical_json(value).encode("utf-8")).hexdigest()
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+async def iter_sse(lines: AsyncIterator[str]) -> AsyncIterator[tuple[str, str]]:
+    # Minimal text/event-stream parser for the upstream Responses stream: yields (event, data) per blank-line-terminated block.
+    event, data = "message", []
+    async for line in lines:
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+    if data:
+        yield event, "\n".join(data)
+
+
+def parse_brief_text(text: str) -> dict[str, Any] | None:
+    try:
+        brief = json.loads(text.strip() or "{}")
+    except ValueError:
+        return None
+    return brief if isinstance(brief, dict) and brief else None
+
+
+def round_number(value: Any, digits: int = 1) -> Any:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return round(float(value), digits) if isinstance(value, float) else value
+
+
+def compact_value(value: Any, list_limit: int, depth: int = 0, max_depth: int = 4) -> Any:
+    # Generic reducer for client-computed blobs (scorecard, coaching intel): rounded numbers, short strings, bounded lists.
+    if isinstance(value, dict):
+        if depth >= max_depth:
+            return None
+        out = {}
+        for key, item in value.items():
+            if key in VOLATILE_KEYS:
+                continue
+            reduced = compact_value(item, list_limit, depth + 1, max_depth)
+            if reduced not in (None, "", [], {}):
+                out[str(key)] = reduced
+        return out
+    if isinstance(value, list):
+        return [item for item in (compact_value(entry, list_limit, depth + 1, max_depth) for entry in value[:list_limit]) if item not in (None, "", [], {})]
+    if isinstance(value, str):
+        return value[:160]
+    return round_number(value)
+
+
+def player_match_features(matches: list[dict[str, Any]], key: str, list_limit: int) -> dict[str, Any]:
+    placements = [int((match.get(key) or {}).get("placement") or 0) for match in matches]
+    placements = [value for value in placements if value > 0]
+    trait_stats: dict[str, list[int]] = {}
+    build_stats: dict[str, dict[str, Any]] = {}
+    for match in matches:
+        player = match.get(key) or {}
+        placement = int(player.get("placement") or 0)
+        if placement <= 0:
+            continue
+        for trait in as_list(player.get("traits")):
+            if int((trait or {}).get("style") or 0) > 0 and trait.get("name"):
+                trait_stats.setdefault(str(trait["name"]), []).append(placement)
+        for unit in as_list(player.get("units")):
+            items = [str(item) for item in as_list((unit or {}).get("itemNames") or (unit or {}).get("items")) if item]
+            if len(items) < 2 or not unit.get("characterId"):
+                continue
+            row = build_stats.setdefault(str(unit["characterId"]), {"placements": [], "items": Counter()})
+            row["placements"].append(placement)
+            row["items"].update(items)
+    traits = sorted(trait_stats.items(), key=lambda entry: (-len(entry[1]), sum(entry[1]) / len(entry[1]), entry[0]))
+    builds = sorted(build_stats.items(), key=lambda entry: (-len(entry[1]["placements"]), sum(entry[1]["placements"]) / len(entry[1]["placements"]), entry[0]))
+    return {
+        "games": len(placements),
+        "avgPlacement": round(sum(placements) / len(placements), 2) if placements else None,
+        "top4Rate": round(pct(sum(1 for value in placements if value <= 4), len(placements)) or 0, 1),
+        "recentPlacements": placements[:10],
+        "avgLevel": round(sum(int((match.get(key) or {}).get("level") or 0) for match in matches) / len(matches), 2) if matches else None,
+        "avgGoldLeft": round(sum(int((match.get(key) or {}).get("goldLeft") or 0) for match in matches) / len(matches), 1) if matches else None,
+        "avgDamage": round(sum(int((match.get(key) or {}).get("totalDamageToPlayers") or 0) for match in matches) / len(matches), 1) if matches else None,
+        "topTraits": [{"name": name, "games": len(rows), "avgPlacement": round(sum(rows) / len(rows), 2)} for name, rows in traits[:list_limit]],
+        "championBuilds": [
+            {"champion": name, "items": [item for item, _count in row["items"].most_common(3)], "games": len(row["placements"]), "top2Rate": round(pct(sum(1 for value in row["placements"] if value <= 4), len(row["placements"])) or 0, 1)}
+            for name, row in builds[:list_limit]
+        ],
+    }
+
+
+def match_features(matches: list[dict[str, Any]], list_limit: int) -> dict[str, Any]:
+    ordered = sorted([match for match in matches if isinstance(match, dict)], key=lambda match: int(match.get("gameDatetime") or 0), reverse=True)
+    patches = Counter(str(match.get("patch") or "unknown") for match in ordered)
+    team_placements = [math.ceil(int((match.get("playerA") or {}).get("placement") or 0) / 2) for match in ordered if match.get("sameTeam") and int((match.get("playerA") or {}).get("placement") or 0) > 0]
+    return {
+        "games": len(ordered),
+        "sameTeamGames": len(team_placements),
+        "teamTop2Rate": round(pct(sum(1 for value in team_placements if value <= 2), len(team_placements)) or 0, 1),
+        "teamWinRate": round(pct(sum(1 for value in team_placements if value == 1), len(team_placements)) or 0, 1),
+        "recentTeamPlacements": team_placements[:10],
+        "patches": dict(patches.most_common(3)),
+        "playerA": player_match_features(ordered, "playerA", list_limit),
+        "playerB": player_match_features(ordered, "playerB", list_limit),
+    }
+
+
+def build_brief_features(payload: dict[str, Any], token_budget: int) -> dict[str, Any]:
+    # Deterministic digest of the client payload: raw matches become per-player aggregates, and list limits
+    # shrink until the serialized digest fits the prompt token budget.
+    matches = as_list(payload.get("matches"))
+    features: dict[str, Any] = {}
+    for list_limit in LIST_LIMITS:
+        features = {
+            "objective": str(payload.get("objective") or "Climb rank in TFT Double Up as a duo.")[:160],
+            "filter": compact_value(payload.get("filter") or {}, list_limit),
+            "players": compact_value(payload.get("players") or {}, list_limit),
+            "metrics": compact_value(payload.get("metrics") or {}, list_limit),
+            "matches": match_features(matches, list_limit),
+            "coachingIntel": compact_value(payload.get("coachingIntel") or {}, list_limit, max_depth=3),
+            "metaSnapshot": compact_value(payload.get("metaSnapshot") or {}, list_limit, max_depth=3),
+            "scorecard": compact_value(payload.get("scorecard") or {}, list_limit, max_depth=3),
+        }
+        if estimate_tokens(canonical_json(features)) <= token_budget:
+            return features
+    for optional in ("scorecard", "coachingIntel", "metaSnapshot"):
+        if estimate_tokens(canonical_json(features)) <= token_budget:
+            break
+        features.pop(optional, None)
+    return features
+
+
+def player_names(features: dict[str, Any]) -> tuple[str, str]:
+    players = features.get("players") or {}
+    return str(players.get("a") or "Player A"), str(players.get("b") or "Player B")
+
+
+def build_deterministic_findings(features: dict[str, Any]) -> dict[str, Any]:
+    stats = features.get("matches") or {}
+    name_a, name_b = player_names(features)
+    improvements: list[str] = []
+    win_conditions: list[str] = []
+    plan: list[str] = []
+    builds: list[dict[str, Any]] = []
+    for name, player in ((name_a, stats.get("playerA") or {}), (name_b, stats.get("playerB") or {})):
+        if not player.get("games"):
+            continue
+        if (player.get("avgGoldLeft") or 0) >= 15:
+            improvements.append(f"{name} ends games with {player['avgGoldLeft']} gold on average; spend it on levels or rolls before Stage 5.")
+        if player.get("avgPlacement") and player["avgPlacement"] > 4.5:
+            improvements.append(f"{name} averages {player['avgPlacement']} placement; stabilize earlier instead of greeding into Stage 4.")
+        traits = player.get("topTraits") or []
+        best = min(traits, key=lambda row: row["avgPlacement"], default=None)
+        if best and best["games"] >= 2 and best["avgPlacement"] <= 4:
+            win_conditions.append(f"{name} places {best['avgPlacement']} on average with {best['name']} ({best['games']} games); force it when it is open.")
+        for build in (player.get("championBuilds") or [])[:3]:
+            builds.append({"player": name, "champion": build["champion"], "items": build["items"], "games": build["games"], "top2Rate": build["top2Rate"], "note": "Most frequent itemized carry in this window."})
+    if (stats.get("teamTop2Rate") or 0) < 50 and stats.get("sameTeamGames"):
+        improvements.append(f"Team Top 2 rate is {stats['teamTop2Rate']}% over {stats['sameTeamGames']} shared games; agree on one stable board and one econ board by Stage 3.")
+    if not win_conditions:
+        win_conditions.append("Convert early board strength into faster level spikes and staggered roll timing.")
+    if not improvements:
+        improvements.append("Prioritize one stable board + one econ board each game.")
+    plan.append("Call the Stage 3-2 plan out loud: who rolls, who levels.")
+    plan.append("Send gifts to the partner who is closer to a two-star carry.")
+    if builds:
+        plan.append(f"Queue {builds[0]['player']}'s {builds[0]['champion']} build when contested traits are open.")
+    plan.append("Track one event tag every game to improve signal quality.")
+    games = int(stats.get("games") or 0)
+    return {
+        "sampleSize": games,
+        "topImprovementAreas": improvements[:4],
+        "winConditions": win_conditions[:4],
+        "fiveGamePlan": plan[:5],
+        "championBuilds": builds[:6],
+        "confidenceBand": "high" if games >= 25 else "medium" if games >= 10 else "low",
+    }
+
+
+def fallback_ai_coaching(features: dict[str, Any], findings: dict[str, Any] | None = None) -> dict[str, Any]:
+    # Local coaching brief in the same shape the model returns, built only from the digest.
+    findings = findings or build_deterministic_findings(features)
+    stats = features.get("matches") or {}
+    name_a, name_b = player_names(features)
+    meta = features.get("metaSnapshot") or {}
+    meta_traits = [str(row.get("name") if isinstance(row, dict) else row) for row in as_list(meta.get("regionalMetaTraits") or meta.get("lobbyTraits"))[:3]]
+    own_traits = {row["name"] for key in ("playerA", "playerB") for row in (stats.get(key) or {}).get("topTraits") or []}
+    meta_delta = [f"{trait} is common on the ladder but absent from your recent boards." for trait in meta_traits if trait and trait not in own_traits][:2]
+    meta_delta += [f"You already play {trait}, which lines up with the current ladder meta." for trait in meta_traits if trait in own_traits][:2]
+    plans = []
+    for name, player in ((name_a, stats.get("playerA") or {}), (name_b, stats.get("playerB") or {})):
+        actions = []
+        if player.get("avgLevel") and player["avgLevel"] < 8:
+            actions.append(f"Average final level is {player['avgLevel']}; push level 8 one turn earlier.")
+        if (player.get("avgGoldLeft") or 0) >= 15:
+            actions.append("Spend down to under 10 gold before dying.")
+        if player.get("topTraits"):
+            actions.append(f"Default to {player['topTraits'][0]['name']} when it is uncontested.")
+        plans.append({"player": name, "focus": "Stability and conversion" if (player.get("avgPlacement") or 0) > 4 else "Tempo and pressure", "actions": actions[:3] or ["Keep tracking placements; sample is still small."]})
+    top2 = stats.get("teamTop2Rate")
+    return {
+        "headline": f"{name_a} & {name_b}: {top2}% team Top 2 over {stats.get('sameTeamGames') or 0} shared games" if stats.get("sameTeamGames") else f"{name_a} & {name_b}: not enough shared games yet",
+        "summary": f"Recent team placements {stats.get('recentTeamPlacements') or []}. " + (findings["topImprovementAreas"][0] if findings["topImprovementAreas"] else ""),
+        "confidence": findings["confidenceBand"],
+        "teamPlan": ["Decide the stabilizer and the econ player by Stage 3-2.", "Stagger roll-downs so both boards do not spike on the same turn."],
+        "metaDelta": meta_delta,
+        "topImprovementAreas": findings["topImprovementAreas"],
+        "winConditions": findings["winConditions"],
+        "fiveGamePlan": findings["fiveGamePlan"],
+        "championBuilds": findings["championBuilds"],
+        "playerPlans": plans,
+        "patchContext": "Patch impact is inferred from your own recent games; no patch notes were consulted.",
+    }
+
+
+class BriefCache:
+    # TTL + LRU cache keyed by digest hash. Concurrent misses for the same key share one in-flight task.
+    def __init__(self, ttl_seconds: float = 900.0, max_entries: int = 256) -> None:
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.max_entries = max(1, int(max_entries))
+        self.entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.inflight: dict[str, asyncio.Task] = {}
+
+    def get(self, key: str) -> Any | None:
+        hit = self.entries.get(key)
+        if hit is None:
+            return None
+        if time.monotonic() >= hit[0]:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return hit[1]
+
+    def put(self, key: str, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_or_create(self, key: str, factory: Callable[[], Awaitable[tuple[Any, bool]]]) -> tuple[Any, str]:
+        # factory returns (value, cacheable); fallback results are shared with waiters but not cached.
+        cached = self.get(key)
+        if cached is not None:
+            return cached, "hit"
+        task = self.inflight.get(key)
+        if task is not None:
+            value, _cacheable = await asyncio.shield(task)
+            return value, "coalesced"
+
+        async def run() -> tuple[Any, bool]:
+            try:
+                value, cacheable = await factory()
+                if cacheable:
+                    self.put(key, value)
+                return value, cacheable
+            finally:
+                self.inflight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        self.inflight[key] = task
+        value, _cacheable = await asyncio.shield(task)
+        return value, "miss"
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Iterator
+
+TIMESTAMP_FIELDS = {"matches": "gameDatetime", "events": "createdAt"}
+
+
+def row_timestamp(kind: str, row: dict[str, Any]) -> int:
+    try:
+        return int(row.get(TIMESTAMP_FIELDS[kind]) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def compact_match(match: dict[str, Any]) -> dict[str, Any]:
+    # Scorecards never read the 8-player lobby projection, which is most of a summarized match's size.
+    return {key: value for key, value in match.items() if key != "lobby"}
+
+
+class ColdArchive:
+    # Append-only gzip JSON-lines segments per duo with a small time index (min/max timestamp per segment),
+    # so windowed queries only open segments that overlap the window and stream rows one at a time.
+    def __init__(self, root: Path, segment_target: int = 2000, max_small_segments: int = 8) -> None:
+        self.root = Path(root)
+        self.segment_target = max(1, int(segment_target))
+        self.max_small_segments = max(2, int(max_small_segments))
+        self.indexes: dict[str, dict[str, Any]] = {}
+        # Windowed reads run in a worker thread; the lock keeps compaction from unlinking segments mid-read.
+        self.lock = threading.Lock()
+
+    def duo_dir(self, duo_id: str) -> Path:
+        return self.root / hashlib.sha1(duo_id.encode("utf-8")).hexdigest()[:20]
+
+    def index(self, duo_id: str) -> dict[str, Any]:
+        cached = self.indexes.get(duo_id)
+        if cached is not None:
+            return cached
+        try:
+            index = json.loads((self.duo_dir(duo_id) / "index.json").read_text(encoding="utf-8"))
+        except Exception:
+            index = {"version": 1, "duoId": duo_id, "nextSegment": 1, "segments": []}
+        index["matchIds"] = {match_id for segment in index["segments"] if segment["kind"] == "matches" for match_id in segment.get("ids", [])}
+        self.indexes[duo_id] = index
+        return index
+
+    def save_index(self, duo_id: str, index: dict[str, Any]) -> None:
+        path = self.duo_dir(duo_id) / "index.json"
+        temp = path.with_suffix(".json.tmp")
+        temp.write_text(json.dumps({key: value for key, value in index.items() if key != "matchIds"}), encoding="utf-8")
+        os.replace(temp, path)
+
+    def write_segment(self, duo_id: str, index: dict[str, Any], kind: str, rows: list[dict[str, Any]]) -> dict[str, Any]:
+        directory = self.duo_dir(duo_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{kind}-{index['nextSegment']:06d}.jsonl.gz"
+        index["nextSegment"] += 1
+        with gzip.open(directory / name, "wt", encoding="utf-8", compresslevel=6) as handle:
+            for row in rows:
+                handle.write(json.dumps(row, separators=(",", ":")))
+                handle.write("\n")
+        stamps = [row_timestamp(kind, row) for row in rows]
+        segment = {"file": name, "kind": kind, "count": len(rows), "minTs": min(stamps), "maxTs": max(stamps), "bytes": (directory / name).stat().st_size}
+        if kind == "matches":
+            segment["ids"] = [str(row.get("id")) for row in rows]
+        return segment
+
+    def append(self, duo_id: str, kind: str, rows: list[dict[str, Any]]) -> int:
+        with self.lock:
+            return self.append_locked(duo_id, kind, rows)
+
+    def append_locked(self, duo_id: str, kind: str, rows: list[dict[str, Any]]) -> int:
+        index = self.index(duo_id)
+        if kind == "matches":
+            fresh = []
+            for row in rows:
+                match_id = str(row.get("id"))
+                if match_id not in index["matchIds"]:
+                    index["matchIds"].add(match_id)
+                    fresh.append(compact_match(row))
+            rows = fresh
+        if not rows:
+            return 0
+        index["segments"].append(self.write_segment(duo_id, index, kind, rows))
+        self.compact(duo_id, kind)
+        self.save_index(duo_id, index)
+        return len(rows)
+
+    def compact(self, duo_id: str, kind: str) -> None:
+        # Merge runs of small segments (frequent debounced flushes) into one larger segment.
+        index = self.index(duo_id)
+        small = [segment for segment in index["segments"] if segment["kind"] == kind and segment["count"] < self.segment_target]
+        if len(small) < self.max_small_segments:
+            return
+        rows = [row for segment in small for row in self.read_segment(duo_id, segment)]
+        merged = self.write_segment(duo_id, index, kind, rows)
+        small_files = {segment["file"] for segment in small}
+        index["segments"] = [segment for segment in index["segments"] if segment["file"] not in small_files] + [merged]
+        self.save_index(duo_id, index)
+        for name in small_files:
+            (self.duo_dir(duo_id) / name).unlink(missing_ok=True)
+
+    def read_segment(self, duo_id: str, segment: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        with gzip.open(self.duo_dir(duo_id) / segment["file"], "rt", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+    def iter_rows(self, duo_id: str, kind: str, since_ms: int = 0) -> Iterator[dict[str, Any]]:
+        for segment in list(self.index(duo_id)["segments"]):
+            if segment["kind"] != kind or segment["maxTs"] < since_ms:
+                continue
+            for row in self.read_segment(duo_id, segment):
+                if row_timestamp(kind, row) >= since_ms:
+                    yield row
+
+    def read_window(self, duo_id: str, kind: str, since_ms: int = 0) -> Iterator[dict[str, Any]]:
+        # Streams rows segment by segment; the lock is held until the iterator is exhausted or closed.
+        with self.lock:
+            yield from self.iter_rows(duo_id, kind, since_ms)
+
+    def overlaps(self, duo_id: str, kind: str, since_ms: int) -> bool:
+        return any(segment["kind"] == kind and segment["maxTs"] >= since_ms for segment in self.index(duo_id)["segments"])
+
+    def stats(self, duo_id: str) -> dict[str, Any]:
+        segments = self.index(duo_id)["segments"]
+        out: dict[str, Any] = {}
+        for kind in TIMESTAMP_FIELDS:
+            rows = [segment for segment in segments if segment["kind"] == kind]
+            out[kind] = {"segments": len(rows), "rows": sum(segment["count"] for segment in rows), "bytes": sum(segment["bytes"] for segment in rows), "oldestTs": min((segment["minTs"] for segment in rows), default=None)}
+        return out
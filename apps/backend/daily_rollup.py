@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from duo_analytics import add_event, add_match, empty_event_counters, empty_match_counters, merge_counters, pct
+
+ROLLUP_VERSION = 1
+DAY_MS = 24 * 60 * 60 * 1000
+PATCH_PATTERN = re.compile(r"(?<![\d.])(\d{1,3})\.(\d{1,3})(?:\.|\b)")
+
+
+def patch_from_game_version(version: Any) -> str | None:
+    # Riot sends e.g. "Version 14.23.636.7711 (Nov 20 2024/12:00:00) [PUBLIC] <Releases/14.23>"; plain "14.23.1" also parses.
+    found = PATCH_PATTERN.search(str(version or ""))
+    return f"{int(found.group(1))}.{int(found.group(2))}" if found else None
+
+
+def patch_sort_key(patch: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in patch.split(".") if part.isdigit()) or (-1,)
+
+
+def day_key(timestamp_ms: Any) -> str | None:
+    try:
+        stamp = int(timestamp_ms or 0)
+    except (TypeError, ValueError):
+        return None
+    if stamp <= 0:
+        return None
+    return datetime.fromtimestamp(stamp / 1000, timezone.utc).date().isoformat()
+
+
+def window_start_day(window_days: int, now_ms: int | None = None) -> str:
+    # Windows resolve to whole UTC days: the day containing now - windowDays is included in full.
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return day_key(now_ms - max(1, min(365, int(window_days))) * DAY_MS) or "0000-00-00"
+
+
+class DailyRollup:
+    # Materialized duo_metric_daily rows: per UTC day, additive match counters split by patch plus event counters.
+    # Matches are folded once (by id) when they arrive; events are folded as they are inserted into the log, so
+    # evicted and archived rows stay counted without rescanning history.
+    def __init__(self, state: dict[str, Any] | None = None) -> None:
+        self.days: dict[str, dict[str, Any]] = dict((state or {}).get("days") or {})
+        self.match_ids = {match_id for row in self.days.values() for match_id in row.get("matchIds") or []}
+
+    def row(self, day: str) -> dict[str, Any]:
+        row = self.days.get(day)
+        if row is None:
+            row = self.days[day] = {"matches": {}, "events": empty_event_counters(), "matchIds": []}
+        return row
+
+    def add_match(self, match: dict[str, Any]) -> bool:
+        match_id = str(match.get("id") or "")
+        day = day_key(match.get("gameDatetime"))
+        if not match_id or day is None or match_id in self.match_ids:
+            return False
+        patch = match.get("patch") or patch_from_game_version(match.get("gameVersion")) or "unknown"
+        row = self.row(day)
+        counters = row["matches"].get(patch)
+        if counters is None:
+            counters = row["matches"][patch] = empty_match_counters()
+        add_match(counters, match)
+        row["matchIds"].append(match_id)
+        self.match_ids.add(match_id)
+        return True
+
+    def add_matches(self, matches: Iterable[dict[str, Any]]) -> int:
+        return sum(1 for match in matches if isinstance(match, dict) and self.add_match(match))
+
+    def add_event(self, event: dict[str, Any]) -> None:
+        day = day_key(event.get("createdAt"))
+        if day is not None:
+            add_event(self.row(day)["events"], event)
+
+    def window_rows(self, since_day: str | None = None) -> list[dict[str, Any]]:
+        return [row for day, row in self.days.items() if since_day is None or day >= since_day]
+
+    def totals(self, since_day: str | None = None) -> tuple[dict[str, Any], dict[str, Any]]:
+        match_totals = empty_match_counters()
+        event_totals = empty_event_counters()
+        for row in self.window_rows(since_day):
+            for counters in row["matches"].values():
+                merge_counters(match_totals, counters)
+            merge_counters(event_totals, row["events"])
+        return match_totals, event_totals
+
+    def patch_totals(self) -> dict[str, dict[str, Any]]:
+        patches: dict[str, dict[str, Any]] = {}
+        for day in sorted(self.days):
+            for patch, counters in self.days[day]["matches"].items():
+                entry = patches.setdefault(patch, {"counters": empty_match_counters(), "firstDay": day, "lastDay": day})
+                merge_counters(entry["counters"], counters)
+                entry["lastDay"] = day
+        return patches
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"version": ROLLUP_VERSION, "days": self.days}
+
+
+def patch_summary(patch: str, entry: dict[str, Any]) -> dict[str, Any]:
+    counters = entry["counters"]
+    same_team = counters["sameTeamGames"]
+    return {
+        "patch": patch,
+        "firstDay": entry["firstDay"],
+        "lastDay": entry["lastDay"],
+        "games": counters["games"],
+        "sameTeamGames": same_team,
+        "top4Rate": pct(counters["top4"], same_team),
+        "winRate": pct(counters["wins"], same_team),
+        "avgPlacement": round(counters["placementSum"] / same_team, 3) if same_team else None,
+        "damageCarryShareA": pct(counters["damageCarryA"], same_team),
+        "damageCarryShareB": pct(counters["damageCarryB"], same_team),
+    }
+
+
+def rate_delta(current: float | None, previous: float | None) -> float | None:
+    return round(current - previous, 2) if current is not None and previous is not None else None
+
+
+def build_patch_diff(patch_totals: dict[str, dict[str, Any]], patch: str | None = None) -> dict[str, Any]:
+    # Compares a patch (default: latest with games) against the patch before it, from per-patch daily aggregates.
+    ordered = [patch_summary(name, patch_totals[name]) for name in sorted(patch_totals, key=patch_sort_key, reverse=True)]
+    ordered = [row for row in ordered if row["games"]]
+    current = next((row for row in ordered if row["patch"] == patch), None) if patch else (ordered[0] if ordered else None)
+    previous = None
+    if current is not None:
+        older = [row for row in ordered if row["patch"] != "unknown" and patch_sort_key(row["patch"]) < patch_sort_key(current["patch"])]
+        previous = older[0] if older else None
+
+    notes: list[str] = []
+    delta = None
+    if current is None:
+        notes.append("No matches on this patch yet.")
+    elif previous is None:
+        notes.append(f"Only {current['patch']} has games so far; patch comparisons start after the next patch.")
+    else:
+        delta = {
+            "games": current["games"] - previous["games"],
+            "top4Rate": rate_delta(current["top4Rate"], previous["top4Rate"]),
+            "winRate": rate_delta(current["winRate"], previous["winRate"]),
+            "avgPlacement": rate_delta(current["avgPlacement"], previous["avgPlacement"]),
+        }
+        if min(current["sameTeamGames"], previous["sameTeamGames"]) < 10:
+            notes.append(f"Small sample ({current['sameTeamGames']} vs {previous['sameTeamGames']} same-team games); treat deltas as directional.")
+        if delta["top4Rate"] is not None and delta["top4Rate"] <= -10:
+            notes.append(f"Top 4 rate fell {abs(delta['top4Rate']):.1f} points since {previous['patch']}; re-check openers that carried last patch.")
+        elif delta["top4Rate"] is not None and delta["top4Rate"] >= 10:
+            notes.append(f"Top 4 rate rose {delta['top4Rate']:.1f} points since {previous['patch']}; current lines are working.")
+        if not notes:
+            notes.append(f"Results on {current['patch']} are in line with {previous['patch']}.")
+
+    return {
+        "current": current,
+        "previous": previous,
+        "delta": delta,
+        "notes": notes,
+        "patches": ordered,
+    }
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import heapq
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any
@@ -9,6 +10,25 @@ def as_list(value: Any) -> list[Any]:
     return value if isinstance(value, list) else []
 
 
+def as_event_log(value: Any) -> Any:
+    # Indexed logs (event_log.DuoEventLog) pass through untouched; anything else must be a plain list.
+    return value if hasattr(value, "of_type") else as_list(value)
+
+
+def events_of_type(event_log: Any, event_type: str) -> list[dict[str, Any]]:
+    of_type = getattr(event_log, "of_type", None)
+    if of_type is not None:
+        return of_type(event_type)
+    return [event for event in as_list(event_log) if event.get("type") == event_type]
+
+
+def count_events_of_type(event_log: Any, event_type: str) -> int:
+    count_type = getattr(event_log, "count_type", None)
+    if count_type is not None:
+        return count_type(event_type)
+    return sum(1 for event in as_list(event_log) if event.get("type") == event_type)
+
+
 def read_field(event: dict[str, Any] | None, field_name: str, fallback: Any = None) -> Any:
     if isinstance(event, dict) and field_name in event:
         return event[field_name]
@@ -96,17 +116,148 @@ def compute_baseline_features(match: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def compute_synergy_fingerprint(matches: list[dict[str, Any]]) -> dict[str, Any]:
-    features = [compute_baseline_features(match) for match in matches]
-    same_team = [feature for feature in features if feature["sameTeam"]]
-    wins = [feature for feature in features if feature["won"]]
-
-    damage_carry_a = sum(1 for feature in same_team if feature["carryByDamageA"])
-    damage_carry_b = sum(1 for feature in same_team if feature["carryByDamageB"])
-    three_star_carry_a = sum(1 for feature in same_team if feature["carryByThreeStarA"])
-    three_star_carry_b = sum(1 for feature in same_team if feature["carryByThreeStarB"])
-    support_a = sum(1 for feature in same_team if feature["utilityA"])
-    support_b = sum(1 for feature in same_team if feature["utilityB"])
+MATCH_COUNTER_KEYS = (
+    "games",
+    "sameTeamGames",
+    "wins",
+    "top4",
+    "lowFinishes",
+    "placementSum",
+    "damageCarryA",
+    "damageCarryB",
+    "threeStarCarryA",
+    "threeStarCarryB",
+    "utilityA",
+    "utilityB",
+    "winsDamageGap",
+    "winsBothLevel8",
+    "winsLowOverlap",
+)
+EVENT_COUNTER_KEYS = (
+    "events",
+    "giftEarly",
+    "giftLate",
+    "giftUnit",
+    "giftItem",
+    "giftBecameCarry",
+    "giftBenched",
+    "giftPartnerStable",
+    "rescueFlips",
+    "rescueClutch",
+    "rollLowGold",
+    "tagPanicRoll",
+    "tagMissedGift",
+)
+DETAIL_EVENT_TYPES = {"gift_sent", "rescue_arrival", "roll_down"}
+OPENER_PRIOR_GAMES = 5
+
+
+# Every metric below is derived from additive counters, so counters folded per match/event can be summed across
+# days (daily_rollup) and produce exactly what a rescan of the raw rows would.
+def empty_match_counters() -> dict[str, Any]:
+    return {key: 0 for key in MATCH_COUNTER_KEYS}
+
+
+def add_match(counters: dict[str, Any], match: dict[str, Any]) -> None:
+    feature = compute_baseline_features(match)
+    counters["games"] += 1
+    if not feature["sameTeam"]:
+        return
+    counters["sameTeamGames"] += 1
+    counters["placementSum"] += feature["duoPlacement"]
+    counters["top4"] += int(feature["duoPlacement"] <= 4)
+    counters["lowFinishes"] += int(feature["duoPlacement"] >= 6)
+    counters["damageCarryA"] += int(feature["carryByDamageA"])
+    counters["damageCarryB"] += int(feature["carryByDamageB"])
+    counters["threeStarCarryA"] += int(feature["carryByThreeStarA"])
+    counters["threeStarCarryB"] += int(feature["carryByThreeStarB"])
+    counters["utilityA"] += int(feature["utilityA"])
+    counters["utilityB"] += int(feature["utilityB"])
+    if feature["won"]:
+        counters["wins"] += 1
+        counters["winsDamageGap"] += int(feature["duoDamageGap"] >= 10)
+        counters["winsBothLevel8"] += int(feature["bothLevel8Plus"])
+        counters["winsLowOverlap"] += int(feature["traitOverlap"] <= 1)
+
+
+def match_counters(matches: list[dict[str, Any]]) -> dict[str, Any]:
+    counters = empty_match_counters()
+    for match in as_list(matches):
+        add_match(counters, match)
+    return counters
+
+
+def empty_event_counters() -> dict[str, Any]:
+    return {**{key: 0 for key in EVENT_COUNTER_KEYS}, "types": {}, "rollStages": {}}
+
+
+def add_event_detail(counters: dict[str, Any], event_type: Any, event: dict[str, Any]) -> None:
+    if event_type == "gift_sent":
+        stage_major = int(read_field(event, "stageMajor", -1) or -1)
+        counters["giftEarly"] += int(stage_major <= 2)
+        counters["giftLate"] += int(stage_major >= 4)
+        counters["giftUnit"] += int(read_field(event, "giftType") == "unit")
+        counters["giftItem"] += int(read_field(event, "giftType") == "item")
+        counters["giftBecameCarry"] += int(read_field(event, "outcome") == "became_carry")
+        counters["giftBenched"] += int(read_field(event, "outcome") == "benched")
+        counters["giftPartnerStable"] += int(read_field(event, "partnerState") == "stable")
+    elif event_type == "rescue_arrival":
+        won = read_field(event, "roundOutcomeAfter") == "won"
+        counters["rescueFlips"] += int(won and read_field(event, "roundOutcomeBefore") == "loss_likely")
+        counters["rescueClutch"] += int(won and int(read_field(event, "stageMajor", 0) or 0) >= 4 and read_field(event, "teammateAtRisk") is True)
+    elif event_type == "roll_down":
+        stage = f"{read_field(event, 'stageMajor', '?')}-{read_field(event, 'stageMinor', '?')}"
+        counters["rollStages"][stage] = counters["rollStages"].get(stage, 0) + 1
+        counters["rollLowGold"] += int(int(read_field(event, "goldAfter", 99) or 99) < 20)
+
+
+def add_event(counters: dict[str, Any], event: dict[str, Any]) -> None:
+    event_type = event.get("type")
+    counters["events"] += 1
+    counters["types"][event_type] = counters["types"].get(event_type, 0) + 1
+    tag = read_field(event, "tag")
+    counters["tagPanicRoll"] += int(tag == "panic_roll")
+    counters["tagMissedGift"] += int(tag == "missed_gift")
+    if event_type in DETAIL_EVENT_TYPES:
+        add_event_detail(counters, event_type, event)
+
+
+def event_counters(event_log: Any) -> dict[str, Any]:
+    # Same result as add_event over the log, with the per-event work kept inline for long logs.
+    counters = empty_event_counters()
+    types = counters["types"]
+    events = 0
+    for event in as_event_log(event_log):
+        events += 1
+        event_type = event.get("type")
+        types[event_type] = types.get(event_type, 0) + 1
+        tag = read_field(event, "tag")
+        if tag == "panic_roll":
+            counters["tagPanicRoll"] += 1
+        elif tag == "missed_gift":
+            counters["tagMissedGift"] += 1
+        if event_type in DETAIL_EVENT_TYPES:
+            add_event_detail(counters, event_type, event)
+    counters["events"] = events
+    return counters
+
+
+def merge_counters(target: dict[str, Any], source: dict[str, Any]) -> dict[str, Any]:
+    for key, value in (source or {}).items():
+        if isinstance(value, dict):
+            merge_counters(target.setdefault(key, {}), value)
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+
+def synergy_from_counters(counters: dict[str, Any], timing: tuple[dict[str, Any], dict[str, Any]] | None = None) -> dict[str, Any]:
+    same_team = counters["sameTeamGames"]
+    wins = counters["wins"]
+    damage_carry_a = counters["damageCarryA"]
+    damage_carry_b = counters["damageCarryB"]
+    three_star_carry_a = counters["threeStarCarryA"]
+    three_star_carry_b = counters["threeStarCarryB"]
 
     if damage_carry_a > damage_carry_b:
         likely_stabilizer = "playerA"
@@ -126,17 +277,17 @@ def compute_synergy_fingerprint(matches: list[dict[str, Any]]) -> dict[str, Any]
         {
             "key": "carry_split_damage",
             "label": "One clear carry and one utility board",
-            "hitRate": pct(sum(1 for feature in wins if feature["duoDamageGap"] >= 10), len(wins)),
+            "hitRate": pct(counters["winsDamageGap"], wins),
         },
         {
             "key": "high_cap_boards",
             "label": "Both players hit level 8+",
-            "hitRate": pct(sum(1 for feature in wins if feature["bothLevel8Plus"]), len(wins)),
+            "hitRate": pct(counters["winsBothLevel8"], wins),
         },
         {
             "key": "low_trait_conflict",
             "label": "Lower trait overlap between partners",
-            "hitRate": pct(sum(1 for feature in wins if feature["traitOverlap"] <= 1), len(wins)),
+            "hitRate": pct(counters["winsLowOverlap"], wins),
         },
     ]
     pattern_catalog = [entry for entry in pattern_catalog if entry["hitRate"] is not None]
@@ -149,30 +300,35 @@ def compute_synergy_fingerprint(matches: list[dict[str, Any]]) -> dict[str, Any]
         },
         "carrySupport": {
             "carryPattern": carry_pattern,
-            "threeStarShareA": pct(three_star_carry_a, len(same_team)),
-            "threeStarShareB": pct(three_star_carry_b, len(same_team)),
-            "utilityShareA": pct(support_a, len(same_team)),
-            "utilityShareB": pct(support_b, len(same_team)),
+            "threeStarShareA": pct(three_star_carry_a, same_team),
+            "threeStarShareB": pct(three_star_carry_b, same_team),
+            "utilityShareA": pct(counters["utilityA"], same_team),
+            "utilityShareB": pct(counters["utilityB"], same_team),
         },
-        "boardTimingAlignment": {
+        # timing is (boardTimingAlignment, giftUsageStyle) from round_series.board_timing when round snapshots exist.
+        "boardTimingAlignment": timing[0] if timing else {
             "status": "needs_round_events",
             "reason": "Riot match payload does not expose per-stage board power spikes for Double Up.",
         },
-        "giftUsageStyle": {
+        "giftUsageStyle": timing[1] if timing else {
             "status": "needs_gift_events",
             "reason": "Gift timing/type requires round-level ingestion from in-client tracker or user tags.",
         },
         "whenYouWinPatterns": pattern_catalog[:3],
         "sampleSize": {
-            "sharedGames": len(matches),
-            "sameTeamGames": len(same_team),
-            "wins": len(wins),
+            "sharedGames": counters["games"],
+            "sameTeamGames": same_team,
+            "wins": wins,
         },
     }
 
 
-def compute_gift_efficiency(event_log: list[dict[str, Any]]) -> dict[str, Any]:
-    gifts = [event for event in as_list(event_log) if event.get("type") == "gift_sent"]
+def compute_synergy_fingerprint(matches: list[dict[str, Any]]) -> dict[str, Any]:
+    return synergy_from_counters(match_counters(matches))
+
+
+def gift_efficiency_from_counters(counters: dict[str, Any]) -> dict[str, Any]:
+    gifts = counters["types"].get("gift_sent", 0)
     if not gifts:
         return {
             "status": "needs_gift_events",
@@ -180,30 +336,27 @@ def compute_gift_efficiency(event_log: list[dict[str, Any]]) -> dict[str, Any]:
             "notes": ["No gift events ingested yet. Add event stream or manual tags to unlock ROI scoring."],
         }
 
-    early_gifts = [gift for gift in gifts if int(read_field(gift, "stageMajor", -1) or -1) <= 2]
-    late_gifts = [gift for gift in gifts if int(read_field(gift, "stageMajor", -1) or -1) >= 4]
-    unit_gifts = [gift for gift in gifts if read_field(gift, "giftType") == "unit"]
-    item_gifts = [gift for gift in gifts if read_field(gift, "giftType") == "item"]
-    converted_carry = sum(1 for gift in gifts if read_field(gift, "outcome") == "became_carry")
-    benched = sum(1 for gift in gifts if read_field(gift, "outcome") == "benched")
-
     return {
         "status": "ok",
         "metrics": {
-            "earlyGiftRate": pct(len(early_gifts), len(gifts)),
-            "lateGiftRate": pct(len(late_gifts), len(gifts)),
-            "unitGiftRate": pct(len(unit_gifts), len(gifts)),
-            "itemGiftRate": pct(len(item_gifts), len(gifts)),
-            "giftROI": pct(converted_carry, len(gifts)),
-            "benchWasteRate": pct(benched, len(gifts)),
+            "earlyGiftRate": pct(counters["giftEarly"], gifts),
+            "lateGiftRate": pct(counters["giftLate"], gifts),
+            "unitGiftRate": pct(counters["giftUnit"], gifts),
+            "itemGiftRate": pct(counters["giftItem"], gifts),
+            "giftROI": pct(counters["giftBecameCarry"], gifts),
+            "benchWasteRate": pct(counters["giftBenched"], gifts),
         },
-        "overGiftingAlerts": sum(1 for gift in gifts if read_field(gift, "partnerState") == "stable"),
+        "overGiftingAlerts": counters["giftPartnerStable"],
     }
 
 
-def compute_rescue_index(event_log: list[dict[str, Any]]) -> dict[str, Any]:
-    rescues = [event for event in as_list(event_log) if event.get("type") == "rescue_arrival"]
-    total_events = len(as_list(event_log))
+def compute_gift_efficiency(event_log: Any) -> dict[str, Any]:
+    return gift_efficiency_from_counters(event_counters(event_log))
+
+
+def rescue_index_from_counters(counters: dict[str, Any]) -> dict[str, Any]:
+    rescues = counters["types"].get("rescue_arrival", 0)
+    total_events = counters["events"]
     if not rescues:
         return {
             "status": "needs_round_events",
@@ -216,50 +369,32 @@ def compute_rescue_index(event_log: list[dict[str, Any]]) -> dict[str, Any]:
             "successfulFlips": 0,
         }
 
-    flips = [
-        rescue
-        for rescue in rescues
-        if read_field(rescue, "roundOutcomeBefore") == "loss_likely"
-        and read_field(rescue, "roundOutcomeAfter") == "won"
-    ]
-    clutch_wins = [
-        rescue
-        for rescue in rescues
-        if int(read_field(rescue, "stageMajor", 0) or 0) >= 4
-        and read_field(rescue, "teammateAtRisk") is True
-        and read_field(rescue, "roundOutcomeAfter") == "won"
-    ]
-
     return {
         "status": "ok",
-        "rescueRate": pct(len(rescues), total_events),
-        "missedBailouts": sum(1 for event in as_list(event_log) if event.get("type") == "missed_bailout"),
-        "clutchIndex": pct(len(clutch_wins), len(rescues)),
-        "successfulFlipRate": pct(len(flips), len(rescues)),
-        "rescueEvents": len(rescues),
+        "rescueRate": pct(rescues, total_events),
+        "missedBailouts": counters["types"].get("missed_bailout", 0),
+        "clutchIndex": pct(counters["rescueClutch"], rescues),
+        "successfulFlipRate": pct(counters["rescueFlips"], rescues),
+        "rescueEvents": rescues,
         "totalEvents": total_events,
-        "clutchWins": len(clutch_wins),
-        "successfulFlips": len(flips),
+        "clutchWins": counters["rescueClutch"],
+        "successfulFlips": counters["rescueFlips"],
     }
 
 
-def compute_econ_coordination(event_log: list[dict[str, Any]]) -> dict[str, Any]:
-    rolls = [event for event in as_list(event_log) if event.get("type") == "roll_down"]
-    if not rolls:
+def compute_rescue_index(event_log: Any) -> dict[str, Any]:
+    return rescue_index_from_counters(event_counters(event_log))
+
+
+def econ_coordination_from_counters(counters: dict[str, Any]) -> dict[str, Any]:
+    if not counters["types"].get("roll_down", 0):
         return {
             "status": "needs_round_events",
             "coordinationScore": None,
             "staggerSuggestions": [],
         }
 
-    roll_by_stage: dict[str, int] = {}
-    for roll in rolls:
-        stage_major = read_field(roll, "stageMajor", "?")
-        stage_minor = read_field(roll, "stageMinor", "?")
-        key = f"{stage_major}-{stage_minor}"
-        roll_by_stage[key] = roll_by_stage.get(key, 0) + 1
-
-    overlap_stages = [stage for stage, count in roll_by_stage.items() if count > 1]
+    overlap_stages = [stage for stage, count in counters["rollStages"].items() if count > 1]
     overlap_penalty = len(overlap_stages) * 18
 
     return {
@@ -273,29 +408,18 @@ def compute_econ_coordination(event_log: list[dict[str, Any]]) -> dict[str, Any]
     }
 
 
-def compute_decision_quality(matches: list[dict[str, Any]], event_log: list[dict[str, Any]]) -> dict[str, Any]:
-    same_team_matches = [match for match in matches if bool(match.get("sameTeam"))]
-    low_results = [
-        match
-        for match in same_team_matches
-        if max(int((match.get("playerA") or {}).get("placement") or 8), int((match.get("playerB") or {}).get("placement") or 8)) >= 6
-    ]
-    top_results = [
-        match
-        for match in same_team_matches
-        if max(int((match.get("playerA") or {}).get("placement") or 8), int((match.get("playerB") or {}).get("placement") or 8)) <= 4
-    ]
+def compute_econ_coordination(event_log: Any) -> dict[str, Any]:
+    return econ_coordination_from_counters(event_counters(event_log))
+
 
-    event_count = len(as_list(event_log))
-    has_decision_events = event_count > 0
+def decision_quality_from_counters(match_totals: dict[str, Any], event_totals: dict[str, Any]) -> dict[str, Any]:
+    low_results = match_totals["lowFinishes"]
+    top_results = match_totals["top4"]
+    has_decision_events = event_totals["events"] > 0
+    panic_roll_count = event_totals["tagPanicRoll"]
+    missed_gift_count = event_totals["tagMissedGift"]
+    unplanned_low_gold_rolls = event_totals["rollLowGold"]
     leaks: list[dict[str, str]] = []
-    panic_roll_count = sum(1 for event in as_list(event_log) if read_field(event, "tag") == "panic_roll")
-    missed_gift_count = sum(1 for event in as_list(event_log) if read_field(event, "tag") == "missed_gift")
-    unplanned_low_gold_rolls = sum(
-        1
-        for event in as_list(event_log)
-        if event.get("type") == "roll_down" and int(read_field(event, "goldAfter", 99) or 99) < 20
-    )
 
     if not has_decision_events and low_results:
         leaks.append(
@@ -306,7 +430,7 @@ def compute_decision_quality(matches: list[dict[str, Any]], event_log: list[dict
             }
         )
 
-    if len(low_results) > len(top_results):
+    if low_results > top_results:
         leaks.append(
             {
                 "leak": "Late board stabilization pattern",
@@ -342,35 +466,40 @@ def compute_decision_quality(matches: list[dict[str, Any]], event_log: list[dict
     )
 
     return {
-        "grade": clamp(68 + (len(top_results) - len(low_results)) * 2 - panic_roll_count * 3 - missed_gift_count * 2),
+        "grade": clamp(68 + (top_results - low_results) * 2 - panic_roll_count * 3 - missed_gift_count * 2),
         "leakCount": len(leaks),
         "biggestLeaks": leaks[:3],
         "evaluationMode": "process_plus_outcome" if has_decision_events else "outcome_with_coverage_warnings",
     }
 
 
-def build_data_coverage(event_log: list[dict[str, Any]]) -> dict[str, Any]:
-    has_events = len(as_list(event_log)) > 0
+def compute_decision_quality(matches: list[dict[str, Any]], event_log: Any) -> dict[str, Any]:
+    return decision_quality_from_counters(match_counters(matches), event_counters(event_log))
+
+
+def data_coverage_from_counters(counters: dict[str, Any]) -> dict[str, Any]:
     return {
         "riotMatchPayload": True,
-        "roundTimelineEvents": has_events,
-        "giftEvents": any(event.get("type") == "gift_sent" for event in as_list(event_log)),
-        "commsSignals": any(event.get("type") == "comms_snapshot" for event in as_list(event_log)),
-        "intentTags": any(event.get("type") == "intent_tag" for event in as_list(event_log)),
+        "roundTimelineEvents": counters["events"] > 0,
+        "giftEvents": counters["types"].get("gift_sent", 0) > 0,
+        "commsSignals": counters["types"].get("comms_snapshot", 0) > 0,
+        "intentTags": counters["types"].get("intent_tag", 0) > 0,
     }
 
 
-def build_duo_scorecard(matches: list[dict[str, Any]] | None = None, event_log: list[dict[str, Any]] | None = None) -> dict[str, Any]:
-    matches = as_list(matches)
-    event_log = as_list(event_log)
+def build_data_coverage(event_log: Any) -> dict[str, Any]:
+    return data_coverage_from_counters(event_counters(event_log))
+
+
+def scorecard_from_counters(match_totals: dict[str, Any], event_totals: dict[str, Any], timing: tuple[dict[str, Any], dict[str, Any]] | None = None) -> dict[str, Any]:
     return {
         "generatedAt": datetime.now(timezone.utc).isoformat(),
-        "dataCoverage": build_data_coverage(event_log),
-        "synergyFingerprint": compute_synergy_fingerprint(matches),
-        "giftEfficiency": compute_gift_efficiency(event_log),
-        "rescueIndex": compute_rescue_index(event_log),
-        "econCoordination": compute_econ_coordination(event_log),
-        "decisionQuality": compute_decision_quality(matches, event_log),
+        "dataCoverage": data_coverage_from_counters(event_totals),
+        "synergyFingerprint": synergy_from_counters(match_totals, timing),
+        "giftEfficiency": gift_efficiency_from_counters(event_totals),
+        "rescueIndex": rescue_index_from_counters(event_totals),
+        "econCoordination": econ_coordination_from_counters(event_totals),
+        "decisionQuality": decision_quality_from_counters(match_totals, event_totals),
         "coachingReplay": {
             "status": "template_ready",
             "stage2": "Choose highest board strength opener from shops + slammable components.",
@@ -384,33 +513,127 @@ def build_duo_scorecard(matches: list[dict[str, Any]] | None = None, event_log:
     }
 
 
-def build_personalized_playbook(matches: list[dict[str, Any]] | None = None, event_log: list[dict[str, Any]] | None = None) -> dict[str, Any]:
-    matches = as_list(matches)
-    event_log = as_list(event_log)
-    same_team_matches = [match for match in matches if bool(match.get("sameTeam"))]
-    wins = [
-        match
-        for match in same_team_matches
-        if max(int((match.get("playerA") or {}).get("placement") or 8), int((match.get("playerB") or {}).get("placement") or 8)) <= 4
-    ]
-    roll_events = [event for event in event_log if event.get("type") == "roll_down"]
-    gift_events = [event for event in event_log if event.get("type") == "gift_sent"]
-
-    top_openers: list[dict[str, Any]] = []
-    for index, match in enumerate(wins[:5]):
-        a_traits = top_traits(match.get("playerA") or {}, 2)
-        b_traits = top_traits(match.get("playerB") or {}, 2)
-        top_openers.append(
+def build_duo_scorecard(matches: list[dict[str, Any]] | None = None, event_log: Any = None, timing: tuple[dict[str, Any], dict[str, Any]] | None = None) -> dict[str, Any]:
+    return scorecard_from_counters(match_counters(as_list(matches)), event_counters(event_log), timing)
+
+
+def team_placement(match: dict[str, Any]) -> int:
+    # Double Up team rank 1..4 from the worse of the two partner placements (1-2 -> 1, 3-4 -> 2, ...).
+    duo_placement = max(int((match.get("playerA") or {}).get("placement") or 8), int((match.get("playerB") or {}).get("placement") or 8))
+    return max(1, min(4, (duo_placement + 1) // 2))
+
+
+def opener_traits(match: dict[str, Any]) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    # Each partner's top-two trait set, order-independent; summaries carry it precomputed as openerTraits.
+    stored = match.get("openerTraits")
+    if isinstance(stored, list) and len(stored) == 2:
+        return tuple(stored[0]) or ("Flex",), tuple(stored[1]) or ("Flex",)
+    a_traits = tuple(sorted(top_traits(match.get("playerA") or {}, 2))) or ("Flex",)
+    b_traits = tuple(sorted(top_traits(match.get("playerB") or {}, 2))) or ("Flex",)
+    return a_traits, b_traits
+
+
+def opener_key(set_number: Any, patch: Any, a_traits: tuple[str, ...], b_traits: tuple[str, ...]) -> str:
+    return f"{set_number}|{patch or 'unknown'}|{'+'.join(a_traits)}|{'+'.join(b_traits)}"
+
+
+def empty_opener_stats(set_number: Any, patch: Any, a_traits: tuple[str, ...], b_traits: tuple[str, ...]) -> dict[str, Any]:
+    return {"setNumber": set_number, "patch": patch or "unknown", "playerA": list(a_traits), "playerB": list(b_traits), "games": 0, "placementSum": 0, "placementSq": 0, "top2": 0, "wins": 0, "lastPlayed": 0, "matchId": None}
+
+
+def add_opener(stats: dict[str, Any], match: dict[str, Any]) -> None:
+    placement = team_placement(match)
+    stats["games"] += 1
+    stats["placementSum"] += placement
+    stats["placementSq"] += placement * placement
+    stats["top2"] += int(placement <= 2)
+    stats["wins"] += int(placement == 1)
+    played = int(match.get("gameDatetime") or 0)
+    if played >= stats["lastPlayed"]:
+        stats["lastPlayed"] = played
+        stats["matchId"] = match.get("id")
+
+
+def rank_openers(entries: list[dict[str, Any]], limit: int = 5) -> list[dict[str, Any]]:
+    # Merges patches per trait-set pair and ranks by expected team placement: the pair's mean shrunk toward the
+    # duo's overall mean by OPENER_PRIOR_GAMES pseudo-games, so one lucky 1st does not outrank a proven line.
+    # Pair accumulator: [games, placementSum, placementSq, top2, wins, latest entry, patches].
+    pairs: dict[tuple[str, ...], list[Any]] = {}
+    total_games = 0
+    total_placement = 0
+    for entry in entries:
+        games = entry["games"]
+        total_games += games
+        total_placement += entry["placementSum"]
+        pair_key = (*entry["playerA"], "|", *entry["playerB"])
+        pair = pairs.get(pair_key)
+        if pair is None:
+            pairs[pair_key] = [games, entry["placementSum"], entry["placementSq"], entry["top2"], entry["wins"], entry, [entry["patch"]]]
+            continue
+        pair[0] += games
+        pair[1] += entry["placementSum"]
+        pair[2] += entry["placementSq"]
+        pair[3] += entry["top2"]
+        pair[4] += entry["wins"]
+        pair[6].append(entry["patch"])
+        if entry["lastPlayed"] > pair[5]["lastPlayed"]:
+            pair[5] = entry
+    if not total_games:
+        return []
+    prior_weight = OPENER_PRIOR_GAMES * total_placement / total_games
+
+    def order(pair: list[Any]) -> tuple[float, int, int, str]:
+        return (round((pair[1] + prior_weight) / (pair[0] + OPENER_PRIOR_GAMES), 3), -pair[0], -pair[5]["lastPlayed"], str(pair[5]["matchId"]))
+
+    rows = []
+    for index, pair in enumerate(heapq.nsmallest(limit, pairs.values(), key=order)):
+        games, placement_sum, placement_sq, top2, wins, latest, patches = pair
+        mean = placement_sum / games
+        placement_range = None
+        if games > 1:
+            spread = 1.645 * (max(0.0, (placement_sq - games * mean * mean) / (games - 1)) / games) ** 0.5
+            placement_range = [round(max(1.0, mean - spread), 2), round(min(4.0, mean + spread), 2)]
+        rows.append(
             {
-                "id": f"{match.get('id') or 'match'}-{index}",
-                "matchId": match.get("id"),
-                "patch": match.get("patch"),
-                "setNumber": match.get("setNumber"),
-                "playerA": a_traits if a_traits else ["Flex"],
-                "playerB": b_traits if b_traits else ["Flex"],
+                "id": f"{latest['matchId'] or 'opener'}-{index}",
+                "matchId": latest["matchId"],
+                "patch": latest["patch"],
+                "patches": sorted(set(patches)),
+                "setNumber": latest["setNumber"],
+                "playerA": latest["playerA"],
+                "playerB": latest["playerB"],
+                "games": games,
+                "avgPlacement": round(mean, 3),
+                "expectedPlacement": order(pair)[0],
+                "placementRange": placement_range,
+                "top2Rate": pct(top2, games),
+                "winRate": pct(wins, games),
+                "confidence": round(clamp(100.0 * games / (games + OPENER_PRIOR_GAMES)), 1),
             }
         )
-
+    return rows
+
+
+def top_opener_rows(matches: list[dict[str, Any]], limit: int = 5) -> list[dict[str, Any]]:
+    # Full pass over the given matches, restricted to the latest set; stored duos query opener_index.OpenerIndex instead.
+    same_team = [match for match in matches if bool(match.get("sameTeam"))]
+    if not same_team:
+        return []
+    latest_set = max(same_team, key=lambda match: int(match.get("gameDatetime") or 0)).get("setNumber")
+    stats: dict[tuple[Any, ...], dict[str, Any]] = {}
+    for match in same_team:
+        if match.get("setNumber") != latest_set:
+            continue
+        a_traits, b_traits = opener_traits(match)
+        key = (match.get("patch"), a_traits, b_traits)
+        entry = stats.get(key)
+        if entry is None:
+            entry = stats[key] = empty_opener_stats(latest_set, match.get("patch"), a_traits, b_traits)
+        add_opener(entry, match)
+    return rank_openers(list(stats.values()), limit)
+
+
+def playbook_from_counts(roll_events: int, gift_events: int, same_team_games: int, top_openers: list[dict[str, Any]]) -> dict[str, Any]:
     return {
         "generatedAt": datetime.now(timezone.utc).isoformat(),
         "topOpeners": top_openers[:5],
@@ -422,32 +645,28 @@ def build_personalized_playbook(matches: list[dict[str, Any]] | None = None, eve
             "Both players holding same carry components without pivot assignment.",
         ],
         "signalSummary": {
-            "rollEvents": len(roll_events),
-            "giftEvents": len(gift_events),
-            "sameTeamGames": len(same_team_matches),
+            "rollEvents": roll_events,
+            "giftEvents": gift_events,
+            "sameTeamGames": same_team_games,
         },
     }
 
 
-def build_duo_highlights(matches: list[dict[str, Any]] | None = None, event_log: list[dict[str, Any]] | None = None) -> dict[str, Any]:
+def build_personalized_playbook(matches: list[dict[str, Any]] | None = None, event_log: Any = None, top_openers: list[dict[str, Any]] | None = None) -> dict[str, Any]:
     matches = as_list(matches)
-    event_log = as_list(event_log)
-    same_team_matches = [match for match in matches if bool(match.get("sameTeam"))]
-    rescue_events = [event for event in event_log if event.get("type") == "rescue_arrival"]
-    gifts = [event for event in event_log if event.get("type") == "gift_sent"]
-    top2s = [
-        match
-        for match in same_team_matches
-        if max(int((match.get("playerA") or {}).get("placement") or 8), int((match.get("playerB") or {}).get("placement") or 8)) <= 2
-    ]
+    event_log = as_event_log(event_log)
+    same_team_games = sum(1 for match in matches if bool(match.get("sameTeam")))
+    return playbook_from_counts(count_events_of_type(event_log, "roll_down"), count_events_of_type(event_log, "gift_sent"), same_team_games, top_opener_rows(matches) if top_openers is None else top_openers)
+
 
+def highlights_from_counts(top2_count: int, rescue_event_count: int, gift_count: int) -> dict[str, Any]:
     highlights: list[str] = []
-    if top2s:
-        highlights.append(f"Reached Top 2 in {len(top2s)} same-team games in this window.")
-    if rescue_events:
-        highlights.append(f"Triggered {len(rescue_events)} rescue arrivals.")
-    if gifts:
-        highlights.append(f"Sent {len(gifts)} tracked gifts to support duo spikes.")
+    if top2_count:
+        highlights.append(f"Reached Top 2 in {top2_count} same-team games in this window.")
+    if rescue_event_count:
+        highlights.append(f"Triggered {rescue_event_count} rescue arrivals.")
+    if gift_count:
+        highlights.append(f"Sent {gift_count} tracked gifts to support duo spikes.")
     if not highlights:
         highlights.append("No highlight events yet. Add journal/event tags to generate recaps.")
 
@@ -455,3 +674,15 @@ def build_duo_highlights(matches: list[dict[str, Any]] | None = None, event_log:
         "generatedAt": datetime.now(timezone.utc).isoformat(),
         "highlights": highlights,
     }
+
+
+def build_duo_highlights(matches: list[dict[str, Any]] | None = None, event_log: Any = None) -> dict[str, Any]:
+    matches = as_list(matches)
+    event_log = as_event_log(event_log)
+    top2_count = sum(
+        1
+        for match in matches
+        if bool(match.get("sameTeam"))
+        and max(int((match.get("playerA") or {}).get("placement") or 8), int((match.get("playerB") or {}).get("placement") or 8)) <= 2
+    )
+    return highlights_from_counts(top2_count, count_events_of_type(event_log, "rescue_arrival"), count_events_of_type(event_log, "gift_sent"))
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Callable, Iterator
+
+EVENT_TOP_LEVEL_FIELDS = ("stageMajor", "stageMinor", "actorSlot", "targetSlot")
+
+
+def event_stage(event: dict[str, Any]) -> int | None:
+    value = event.get("stageMajor")
+    if value is None and isinstance(event.get("payload"), dict):
+        value = event["payload"].get("stageMajor")
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def idempotency_key(duo_id: str, match_id: Any, event: dict[str, Any]) -> str | None:
+    # Client-supplied key wins; otherwise fall back to duoId + matchId + source + sequence from job-architecture.md.
+    explicit = str(event.get("idempotencyKey") or "").strip()
+    if explicit:
+        return explicit
+    source = str(event.get("source") or "").strip()
+    sequence = event.get("sequence")
+    if source and sequence is not None and str(sequence).strip():
+        return f"{duo_id}:{match_id or ''}:{source}:{sequence}"
+    return None
+
+
+class DuoEventLog:
+    # Bounded per-duo event log. Appends and evictions are O(1): events leave in arrival order,
+    # so an evicted event is always at the left end of every secondary index it belongs to.
+    def __init__(self, capacity: int = 6000, events: list[dict[str, Any]] | None = None, on_evict: Callable[[dict[str, Any]], None] | None = None) -> None:
+        self.capacity = max(1, int(capacity))
+        self.on_evict = on_evict
+        self.events: deque[dict[str, Any]] = deque()
+        self.by_type: dict[str, deque[dict[str, Any]]] = {}
+        self.by_match: dict[str, deque[dict[str, Any]]] = {}
+        self.by_stage: dict[int, deque[dict[str, Any]]] = {}
+        self.by_key: dict[str, dict[str, Any]] = {}
+        self.next_seq = 1
+        for event in events or []:
+            if isinstance(event, dict) and event.get("type"):
+                self.append(event)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(self.events)
+
+    def append(self, event: dict[str, Any]) -> dict[str, Any] | None:
+        # Returns None when the event's idempotency key is already retained.
+        key = event.get("idempotencyKey")
+        if key and key in self.by_key:
+            return None
+        if not isinstance(event.get("seq"), int) or event["seq"] < self.next_seq:
+            event["seq"] = self.next_seq
+        self.next_seq = event["seq"] + 1
+        if len(self.events) >= self.capacity:
+            self.evict_oldest()
+        self.events.append(event)
+        self.by_type.setdefault(str(event.get("type")), deque()).append(event)
+        if event.get("matchId"):
+            self.by_match.setdefault(str(event["matchId"]), deque()).append(event)
+        stage = event_stage(event)
+        if stage is not None:
+            self.by_stage.setdefault(stage, deque()).append(event)
+        if key:
+            self.by_key[key] = event
+        return event
+
+    def evict_oldest(self) -> None:
+        event = self.events.popleft()
+        self.pop_index(self.by_type, str(event.get("type")))
+        if event.get("matchId"):
+            self.pop_index(self.by_match, str(event["matchId"]))
+        stage = event_stage(event)
+        if stage is not None:
+            self.pop_index(self.by_stage, stage)
+        if event.get("idempotencyKey"):
+            self.by_key.pop(event["idempotencyKey"], None)
+        if self.on_evict is not None:
+            self.on_evict(event)
+
+    @staticmethod
+    def pop_index(index: dict[Any, deque[dict[str, Any]]], key: Any) -> None:
+        bucket = index.get(key)
+        if bucket:
+            bucket.popleft()
+            if not bucket:
+                del index[key]
+
+    def of_type(self, event_type: str) -> list[dict[str, Any]]:
+        return list(self.by_type.get(event_type, ()))
+
+    def count_type(self, event_type: str) -> int:
+        return len(self.by_type.get(event_type, ()))
+
+    def of_match(self, match_id: str) -> list[dict[str, Any]]:
+        return list(self.by_match.get(str(match_id), ()))
+
+    def of_stage(self, stage_major: int) -> list[dict[str, Any]]:
+        return list(self.by_stage.get(int(stage_major), ()))
+
+    def has_key(self, key: str) -> bool:
+        return key in self.by_key
+
+    def to_list(self) -> list[dict[str, Any]]:
+        return list(self.events)
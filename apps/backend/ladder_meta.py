@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from daily_rollup import patch_from_game_version, patch_sort_key
+from metrics import LADDER_META_MATCHES, LADDER_META_REQUESTS
+
+PLATFORM_ROUTING = {
+    "na1": "americas", "br1": "americas", "la1": "americas", "la2": "americas",
+    "euw1": "europe", "eun1": "europe", "tr1": "europe", "ru": "europe", "me1": "europe",
+    "kr": "asia", "jp1": "asia",
+    "oc1": "sea", "ph2": "sea", "sg2": "sea", "th2": "sea", "tw2": "sea", "vn2": "sea",
+}
+LADDER_TIERS = ("challenger", "grandmaster", "master")
+META_CATEGORIES = ("traits", "units", "items")
+
+
+class CountMinSketch:
+    # depth rows of width counters; an estimate never undercounts and overcounts by at most ~2N/width with
+    # probability 1 - 2^-depth. Conservative update (only raise the minimum rows) tightens that in practice.
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        self.width = max(16, int(width))
+        self.depth = max(1, int(depth))
+        self.rows = [array("I", bytes(4 * self.width)) for _ in range(self.depth)]
+        self.total = 0
+
+    def slots(self, key: str) -> list[int]:
+        data = key.encode("utf-8")
+        first = zlib.crc32(data)
+        step = zlib.adler32(data) | 1
+        return [(first + row * step) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        slots = self.slots(key)
+        estimate = min(row[slot] for row, slot in zip(self.rows, slots)) + count
+        for row, slot in zip(self.rows, slots):
+            if row[slot] < estimate:
+                row[slot] = estimate
+        self.total += count
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[slot] for row, slot in zip(self.rows, self.slots(key)))
+
+    def nbytes(self) -> int:
+        return sum(row.itemsize * len(row) for row in self.rows)
+
+
+class SpaceSaving:
+    # Stream-summary heavy hitters: at most `capacity` tracked keys. An untracked key replaces the current minimum
+    # and inherits its count as an error bound, so any key above total/capacity is guaranteed to be tracked.
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = max(1, int(capacity))
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+            return
+        evicted = min(self.counts, key=self.counts.__getitem__)
+        floor = self.counts.pop(evicted)
+        del self.errors[evicted]
+        self.counts[key] = floor + count
+        self.errors[key] = floor
+
+    def top(self, limit: int) -> list[tuple[str, int, int]]:
+        ranked = sorted(self.counts.items(), key=lambda row: (-row[1], row[0]))[:limit]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+
+class PatchMeta:
+    # Per-patch sketches: heavy hitters for picks plus count-min pick and Top 4 counters per category.
+    def __init__(self, capacity: int, width: int, depth: int) -> None:
+        self.boards = 0
+        self.top4_boards = 0
+        self.heavy = {category: SpaceSaving(capacity) for category in META_CATEGORIES}
+        self.picks = {category: CountMinSketch(width, depth) for category in META_CATEGORIES}
+        self.top4 = {category: CountMinSketch(width, depth) for category in META_CATEGORIES}
+
+    def add_board(self, participant: dict[str, Any]) -> None:
+        top4 = int(participant.get("placement") or 8) <= 4
+        self.boards += 1
+        self.top4_boards += int(top4)
+        units = [unit for unit in participant.get("units") or [] if isinstance(unit, dict)]
+        keys = {
+            "traits": {str(trait.get("name")) for trait in participant.get("traits") or [] if isinstance(trait, dict) and trait.get("name") and int(trait.get("style") or 0) > 0},
+            "units": {str(unit.get("character_id")) for unit in units if unit.get("character_id")},
+            "items": {str(item) for unit in units for item in unit.get("itemNames") or [] if item},
+        }
+        # Each key counts once per board, so pick rate reads as "share of boards running it".
+        for category, names in keys.items():
+            for name in names:
+                self.heavy[category].add(name)
+                self.picks[category].add(name)
+                if top4:
+                    self.top4[category].add(name)
+
+    def rows(self, category: str, limit: int) -> list[dict[str, Any]]:
+        # Both sketches only overcount, so the smaller of the two pick estimates is the tighter one.
+        out = []
+        for name, count, error in self.heavy[category].top(limit):
+            games = min(count, self.picks[category].estimate(name))
+            top4 = min(games, self.top4[category].estimate(name))
+            # `count` and, for units, `characterId` are the fields the client's regional meta chips read.
+            row = {"name": name, "count": games, "games": games, "pickRate": round(100.0 * games / self.boards, 1) if self.boards else None, "top4Rate": round(100.0 * top4 / games, 1) if games else None, "errorBound": error}
+            if category == "units":
+                row["characterId"] = name
+            out.append(row)
+        return out
+
+    def nbytes(self) -> int:
+        return sum(sketch.nbytes() for sketches in (self.picks, self.top4) for sketch in sketches.values())
+
+
+class LadderMeta:
+    # Bounded-memory ladder meta for one platform: sketches for the most recent `max_patches` patches and a
+    # fixed-size FIFO of match IDs already folded, so a match shared by several top players counts once.
+    def __init__(self, platform: str, capacity: int = 64, width: int = 2048, depth: int = 4, max_patches: int = 3, seen_capacity: int = 20000) -> None:
+        self.platform = platform
+        self.capacity = capacity
+        self.width = width
+        self.depth = depth
+        self.max_patches = max(1, int(max_patches))
+        self.seen_capacity = max(1, int(seen_capacity))
+        self.patches: dict[str, PatchMeta] = {}
+        self.seen: OrderedDict[str, None] = OrderedDict()
+        # Players walked in the last completed sampler cycle, so it stays within top_players like `seen` stays bounded.
+        self.sampled_players: set[str] = set()
+        self.updated_at: float | None = None
+
+    def add_match(self, match: dict[str, Any]) -> bool:
+        info = (match or {}).get("info") or {}
+        match_id = str(((match or {}).get("metadata") or {}).get("match_id") or "")
+        if not match_id or match_id in self.seen:
+            return False
+        self.seen[match_id] = None
+        while len(self.seen) > self.seen_capacity:
+            self.seen.popitem(last=False)
+        patch = patch_from_game_version(info.get("game_version")) or "unknown"
+        meta = self.patches.get(patch)
+        if meta is None:
+            meta = self.patches[patch] = PatchMeta(self.capacity, self.width, self.depth)
+            for stale in sorted(self.patches, key=patch_sort_key, reverse=True)[self.max_patches :]:
+                del self.patches[stale]
+        for participant in info.get("participants") or []:
+            if isinstance(participant, dict):
+                meta.add_board(participant)
+        self.updated_at = time.time()
+        LADDER_META_MATCHES.inc(platform=self.platform)
+        return True
+
+    def snapshot(self, patch: str | None = None, limit: int = 10) -> dict[str, Any]:
+        chosen = patch if patch in self.patches else (max(self.patches, key=patch_sort_key) if self.patches else None)
+        meta = self.patches.get(chosen) if chosen else None
+        return {
+            "platform": self.platform,
+            "patch": chosen,
+            "patches": sorted(self.patches, key=patch_sort_key, reverse=True),
+            "sampledTopPlayers": len(self.sampled_players),
+            "sampledMatches": len(self.seen),
+            "boards": meta.boards if meta else 0,
+            "updatedAt": int(self.updated_at * 1000) if self.updated_at else None,
+            "topTraits": meta.rows("traits", limit) if meta else [],
+            "topChampions": meta.rows("units", limit) if meta else [],
+            "topItems": meta.rows("items", limit) if meta else [],
+        }
+
+    def nbytes(self) -> int:
+        return sum(meta.nbytes() for meta in self.patches.values())
+
+
+class RiotRequestBudget:
+    # Token bucket shared by every Riot request. User requests always spend without waiting; background work
+    # waits until more than `reserve` tokens are free, so it only ever uses headroom user traffic leaves behind.
+    def __init__(self, requests_per_minute: int = 50, reserve: int = 25) -> None:
+        self.capacity = max(1, int(requests_per_minute))
+        self.rate = self.capacity / 60.0
+        self.reserve = min(self.capacity - 1, max(0, int(reserve)))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(float(self.capacity), self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return self.tokens
+
+    def spend(self) -> None:
+        self.tokens = max(0.0, self.refill() - 1)
+
+    async def acquire_background(self) -> None:
+        while self.refill() < self.reserve + 1:
+            await asyncio.sleep((self.reserve + 1 - self.tokens) / self.rate)
+        self.tokens -= 1
+
+    def stats(self) -> dict[str, Any]:
+        return {"requestsPerMinute": self.capacity, "reserve": self.reserve, "tokens": round(self.refill(), 1)}
+
+
+class LadderMetaSampler:
+    # Walks the top of each platform's ranked ladder and folds the players' recent matches into LadderMeta.
+    # Requests go through `fetch` (the Riot request path) one at a time, spaced to `requests_per_minute`; `fetch`
+    # draws from the budget it shares with user requests as background work, and 429s back off for Retry-After.
+    def __init__(self, fetch: Callable[[str], Awaitable[Any]], platforms: list[str], top_players: int = 50, matches_per_player: int = 10, requests_per_minute: int = 6, **meta_options: Any) -> None:
+        self.fetch = fetch
+        self.platforms = [platform for platform in platforms if platform in PLATFORM_ROUTING]
+        self.top_players = max(1, int(top_players))
+        self.matches_per_player = max(1, int(matches_per_player))
+        self.interval = 60.0 / max(1, int(requests_per_minute))
+        self.metas = {platform: LadderMeta(platform, **meta_options) for platform in self.platforms}
+        self.next_request_at = 0.0
+        self.cycles = 0
+        self.last_cycle: dict[str, Any] = {}
+
+    async def request(self, url: str) -> Any:
+        while True:
+            delay = self.next_request_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_request_at = time.monotonic() + self.interval
+            try:
+                data = await self.fetch(url)
+            except Exception as error:
+                if getattr(error, "status", None) != 429:
+                    LADDER_META_REQUESTS.inc(result="error")
+                    raise
+                LADDER_META_REQUESTS.inc(result="rate_limited")
+                self.next_request_at = time.monotonic() + max(1, int(getattr(error, "retry_after", None) or 10))
+                continue
+            LADDER_META_REQUESTS.inc(result="ok")
+            return data
+
+    async def ladder_puuids(self, platform: str) -> list[str]:
+        # Highest-LP entries first across Challenger, Grandmaster and Master until top_players are found.
+        puuids: list[str] = []
+        for tier in LADDER_TIERS:
+            league = await self.request(f"https://{platform}.api.riotgames.com/tft/league/v1/{tier}?queue=RANKED_TFT")
+            entries = sorted((league or {}).get("entries") or [], key=lambda entry: -int(entry.get("leaguePoints") or 0))
+            for entry in entries[: self.top_players - len(puuids)]:
+                puuid = entry.get("puuid")
+                if not puuid and entry.get("summonerId"):
+                    puuid = ((await self.request(f"https://{platform}.api.riotgames.com/tft/summoner/v1/summoners/{entry['summonerId']}")) or {}).get("puuid")
+                if puuid:
+                    puuids.append(str(puuid))
+            if len(puuids) >= self.top_players:
+                break
+        return puuids
+
+    async def sample_platform(self, platform: str) -> dict[str, int]:
+        meta = self.metas[platform]
+        routing = PLATFORM_ROUTING[platform]
+        folded = 0
+        sampled: set[str] = set()
+        puuids = await self.ladder_puuids(platform)
+        for puuid in puuids:
+            ids = await self.request(f"https://{routing}.api.riotgames.com/tft/match/v1/matches/by-puuid/{puuid}/ids?count={self.matches_per_player}")
+            sampled.add(puuid)
+            for match_id in ids or []:
+                if str(match_id) in meta.seen:
+                    continue
+                try:
+                    match = await self.request(f"https://{routing}.api.riotgames.com/tft/match/v1/matches/{match_id}")
+                except Exception:
+                    continue
+                folded += int(meta.add_match(match))
+        meta.sampled_players = sampled
+        return {"players": len(puuids), "matches": folded}
+
+    async def run_once(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        platforms: dict[str, Any] = {}
+        for platform in self.platforms:
+            try:
+                platforms[platform] = await self.sample_platform(platform)
+            except Exception as error:
+                platforms[platform] = {"error": str(error) or type(error).__name__}
+        self.cycles += 1
+        self.last_cycle = {"finishedAt": int(time.time() * 1000), "seconds": round(time.perf_counter() - started, 3), "platforms": platforms}
+        return self.last_cycle
+
+    async def run_forever(self, interval_seconds: float) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(interval_seconds)
+
+    def snapshot(self, platform: str, patch: str | None = None, limit: int = 10) -> dict[str, Any]:
+        meta = self.metas.get(platform)
+        if meta is None:
+            return {"platform": platform, "patch": None, "sampledTopPlayers": 0, "sampledMatches": 0, "topTraits": [], "topChampions": [], "topItems": []}
+        return meta.snapshot(patch, limit)
+
+    def stats(self) -> dict[str, Any]:
+        return {"platforms": self.platforms, "cycles": self.cycles, "lastCycle": self.last_cycle, "sketchBytes": {platform: meta.nbytes() for platform, meta in self.metas.items()}}
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from bench.synthetic import DUO_PUUID_A, DUO_PUUID_B, generate_events, generate_matches
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT = Path.cwd() / ".cache" / "loadtest" / "coldstart.json"
+
+
+def seed_store(work_dir: Path, match_count: int, event_count: int) -> str:
+    # One synthetic duo in the analytics store, so the first useful request needs no upstream access.
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("RIOT_API_KEY", "coldstart-key")
+    import main
+
+    summaries = [summary for raw in generate_matches(match_count) if (summary := main.summarize_duo_match(raw["metadata"]["match_id"], raw, DUO_PUUID_A, DUO_PUUID_B)) is not None]
+    now_ms = int(time.time() * 1000)
+    for index, summary in enumerate(summaries):
+        summary["gameDatetime"] = now_ms - index * 45 * 60 * 1000
+    duo_id = main.stable_duo_id(DUO_PUUID_A, DUO_PUUID_B)
+    events = generate_events(event_count, [summary["id"] for summary in summaries])
+    for event in events:
+        event["createdAt"] = now_ms
+    store = {"version": 1, "duos": {duo_id: {"duoId": duo_id, "matchesById": {summary["id"]: summary for summary in summaries}, "events": events, "journals": []}}}
+    cache_dir = work_dir / ".cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (cache_dir / "duo-analytics-store.json").write_text(json.dumps(store), encoding="utf-8")
+    return duo_id
+
+
+def boot_once(work_dir: Path, port: int, duo_id: str, timeout: float) -> dict[str, Any]:
+    # Wall time from spawning uvicorn to the first 200 from /api/duo/scorecard, plus the server's own boot marks.
+    env = {**os.environ, "RIOT_API_KEY": os.environ.get("RIOT_API_KEY", "coldstart-key"), "WARM_SNAPSHOT_INTERVAL_SECONDS": "0", "UPSTREAM_WARMUP_REGIONS": "", "LADDER_META_INTERVAL_SECONDS": "0"}
+    url = f"http://127.0.0.1:{port}"
+    spawned = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(BACKEND_DIR), "--port", str(port), "--log-level", "warning"], cwd=work_dir, env=env)
+    try:
+        listening_ms = None
+        with httpx.Client(timeout=timeout) as client:
+            while True:
+                if time.perf_counter() - spawned > timeout:
+                    raise RuntimeError(f"Backend did not answer within {timeout}s.")
+                try:
+                    response = client.get(f"{url}/api/duo/scorecard", params={"duoId": duo_id, "windowDays": 30})
+                except httpx.TransportError:
+                    time.sleep(0.005)
+                    continue
+                listening_ms = listening_ms or round((time.perf_counter() - spawned) * 1000, 1)
+                if response.status_code == 200:
+                    first_ms = round((time.perf_counter() - spawned) * 1000, 1)
+                    break
+            boot = client.get(f"{url}/health").json().get("boot") or {}
+    finally:
+        process.send_signal(signal.SIGINT)
+        process.wait(timeout=60)
+    return {"wakeToFirstUsefulMs": first_ms, "wakeToListeningMs": listening_ms, "serverMarksMs": boot.get("marksMs"), "restored": (boot.get("details") or {}).get("startup")}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.coldstart", description="Measure wake-to-first-response for a fresh backend process, without and with a warm-state snapshot.")
+    parser.add_argument("--matches", type=int, default=600)
+    parser.add_argument("--events", type=int, default=6000)
+    parser.add_argument("--port", type=int, default=3411)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="coldstart-") as work:
+        work_dir = Path(work)
+        duo_id = seed_store(work_dir, args.matches, args.events)
+        # The first boot has no snapshot; its shutdown writes one, which the second boot restores.
+        runs = {"cold": boot_once(work_dir, args.port, duo_id, args.timeout)}
+        runs["snapshot"] = boot_once(work_dir, args.port, duo_id, args.timeout)
+        snapshot = work_dir / ".cache" / "warm-state.bin"
+        report = {"matches": args.matches, "events": args.events, "snapshotBytes": snapshot.stat().st_size if snapshot.exists() else None, "runs": runs}
+
+    for name, run in report["runs"].items():
+        print(f"{name:<9} wake->first useful {run['wakeToFirstUsefulMs']:>8.1f}ms  listening {run['wakeToListeningMs']:>8.1f}ms  server marks {run['serverMarksMs']}  restored {run['restored']}")
+    print(f"snapshot {report['snapshotBytes']} bytes")
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import zlib
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from bench.synthetic import PATCHES, SET_NUMBER, TRAITS, make_match
+
+
+def puuid_for(game_name: str, tag_line: str) -> str:
+    return f"puuid-{game_name}-{tag_line}".lower()
+
+
+def upstream_route(path: str) -> str:
+    if path.startswith("/riot/account/"):
+        return "account"
+    if path.startswith("/tft/match/v1/matches/by-puuid/"):
+        return "match_ids"
+    if path.startswith("/tft/match/v1/matches/"):
+        return "match"
+    if path.startswith("/tft/summoner/"):
+        return "summoner"
+    if path.startswith("/tft/league/"):
+        return "league"
+    if path.startswith("/latest/"):
+        return "cdragon"
+    if path.startswith("/v1/responses"):
+        return "openai"
+    if path.startswith(("/v1/services", "/v1/metrics/")):
+        return "render"
+    return "other"
+
+
+def parse_rate_limits(raw: str) -> list[tuple[int, int]]:
+    # Riot header format: "20:1,100:120" (requests:seconds).
+    limits = []
+    for token in [part.strip() for part in str(raw or "").split(",") if part.strip()]:
+        count, _, seconds = token.partition(":")
+        if count.isdigit() and seconds.isdigit():
+            limits.append((int(count), int(seconds)))
+    return limits
+
+
+class FakeRiotUpstream:
+    # Serves synthetic accounts, match-id lists and Double Up matches for duos named "<prefix><n>A"/"<prefix><n>B".
+    def __init__(self, matches_per_duo: int = 200, latency_ms: float = 40.0, jitter_ms: float = 20.0, rate_limits: str = "", seed: int = 7, openai_chunks: int = 40, openai_chunk_ms: float = 25.0, render_services: int = 6, ladder_players: int = 100) -> None:
+        self.matches_per_duo = max(1, int(matches_per_duo))
+        self.latency_ms = max(0.0, float(latency_ms))
+        self.jitter_ms = max(0.0, float(jitter_ms))
+        self.rate_limits = parse_rate_limits(rate_limits)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.calls: Counter[str] = Counter()
+        self.rate_limited = 0
+        self.request_times: deque[float] = deque()
+        self.match_cache: dict[str, dict[str, Any]] = {}
+        self.match_owners: dict[str, tuple[str, str, int]] = {}
+        self.openai_chunks = max(1, int(openai_chunks))
+        self.openai_chunk_ms = max(0.0, float(openai_chunk_ms))
+        self.openai_cancelled = 0
+        self.render_services = max(0, int(render_services))
+        self.ladder_players = max(0, int(ladder_players))
+        self.app = self.build_app()
+
+    def duo_key(self, puuid: str) -> tuple[str, str] | None:
+        if not puuid.startswith("puuid-") or "-" not in puuid[6:]:
+            return None
+        name, _, tag = puuid[6:].rpartition("-")
+        if len(name) < 2 or name[-1] not in "ab":
+            return None
+        return name[:-1], tag
+
+    def match_ids_for(self, puuid: str) -> list[str]:
+        key = self.duo_key(puuid)
+        if key is None:
+            return []
+        base = zlib.crc32(f"{key[0]}-{key[1]}".encode("utf-8")) % 1_000_000
+        puuid_a = f"puuid-{key[0]}a-{key[1]}"
+        puuid_b = f"puuid-{key[0]}b-{key[1]}"
+        ids = []
+        for index in range(self.matches_per_duo):
+            match_id = f"NA1_{base:06d}{index:05d}"
+            self.match_owners.setdefault(match_id, (puuid_a, puuid_b, index))
+            ids.append(match_id)
+        return ids
+
+    def match(self, match_id: str) -> dict[str, Any] | None:
+        cached = self.match_cache.get(match_id)
+        if cached is not None:
+            return cached
+        owners = self.match_owners.get(match_id)
+        if owners is None:
+            return None
+        puuid_a, puuid_b, index = owners
+        rng = random.Random(zlib.crc32(match_id.encode("utf-8")) ^ self.seed)
+        match = make_match(rng, index, PATCHES[index * len(PATCHES) // self.matches_per_duo], puuid_a, puuid_b)
+        match["metadata"]["match_id"] = match_id
+        # Newest match first, matching Riot's by-puuid ordering.
+        match["info"]["game_datetime"] = int(time.time() * 1000) - index * 45 * 60 * 1000
+        self.match_cache[match_id] = match
+        return match
+
+    def ladder_entries(self, tier: str) -> list[dict[str, Any]]:
+        # Top players come in synthetic duo pairs ("ladder<n>a"/"ladder<n>b"), so partners share matches and the
+        # sampler's de-duplication is exercised. Challenger holds the first 30, Grandmaster the rest.
+        ranks = {"challenger": range(0, min(30, self.ladder_players)), "grandmaster": range(min(30, self.ladder_players), self.ladder_players)}.get(tier, range(0))
+        return [{"puuid": puuid_for(f"ladder{rank // 2}{'ab'[rank % 2]}", "top"), "summonerId": f"summoner-ladder-{rank}", "leaguePoints": 2000 - rank * 10, "rank": "I", "wins": 120, "losses": 90} for rank in ranks]
+
+    def coach_brief_text(self, prompt: str) -> str:
+        # Stand-in for the Responses API: a valid brief that echoes a little of the digest so cache keys are visible.
+        try:
+            digest = json.loads(prompt)
+        except ValueError:
+            digest = {}
+        games = int(((digest.get("matches") or {}).get("games")) or 0)
+        brief = {
+            "headline": f"Stand-in brief over {games} games",
+            "summary": "Generated by the local Responses API stand-in.",
+            "confidence": "low",
+            "teamPlan": ["Decide the stabilizer by Stage 3-2."],
+            "metaDelta": [],
+            "topImprovementAreas": ["Spend gold before Stage 5."],
+            "winConditions": ["Stagger roll-downs."],
+            "fiveGamePlan": ["Track one event tag every game."],
+            "championBuilds": [],
+            "playerPlans": [],
+            "patchContext": "Inferred.",
+        }
+        return json.dumps(brief)
+
+    async def responses_stream(self, text: str):
+        size = max(1, len(text) // self.openai_chunks + 1)
+        try:
+            yield f"event: response.created\ndata: {json.dumps({'type': 'response.created'})}\n\n"
+            for start in range(0, len(text), size):
+                if self.openai_chunk_ms:
+                    await asyncio.sleep(self.openai_chunk_ms / 1000.0)
+                yield f"event: response.output_text.delta\ndata: {json.dumps({'type': 'response.output_text.delta', 'delta': text[start : start + size]})}\n\n"
+            yield f"event: response.completed\ndata: {json.dumps({'type': 'response.completed', 'response': {'status': 'completed'}})}\n\n"
+        except (asyncio.CancelledError, GeneratorExit):
+            self.openai_cancelled += 1
+            raise
+
+    def render_metric_series(self, metric: str, resources: list[str], start: str, end: str, resolution: int) -> list[dict[str, Any]]:
+        # Two instances per service, one point per resolution step, in Render's labels/unit/values shape.
+        start_ts = int(datetime.fromisoformat(start.replace("Z", "+00:00")).timestamp())
+        end_ts = int(datetime.fromisoformat(end.replace("Z", "+00:00")).timestamp())
+        unit = {"cpu": "cpu", "memory": "bytes", "http-requests": "count", "bandwidth": "mb"}.get(metric, "count")
+        series = []
+        for resource in resources:
+            for instance in range(2):
+                rng = random.Random(zlib.crc32(f"{metric}:{resource}:{instance}".encode("utf-8")))
+                values = []
+                for stamp in range(start_ts, end_ts + 1, max(1, resolution)):
+                    if metric == "cpu":
+                        value = round(rng.uniform(0.01, 0.6), 4)
+                    elif metric == "memory":
+                        value = int(rng.uniform(180, 480) * 1024 * 1024)
+                    elif metric == "http-requests":
+                        value = rng.randint(0, 400)
+                    else:
+                        value = round(rng.uniform(0.1, 25.0), 3)
+                    values.append({"timestamp": datetime.fromtimestamp(stamp, timezone.utc).isoformat().replace("+00:00", "Z"), "value": value})
+                series.append({"labels": [{"field": "resource", "value": resource}, {"field": "instance", "value": f"{resource}-{instance}"}], "unit": unit, "values": values})
+        return series
+
+    def rate_limit_state(self) -> tuple[int, list[str]]:
+        now = time.monotonic()
+        self.request_times.append(now)
+        longest = max((seconds for _count, seconds in self.rate_limits), default=0)
+        while self.request_times and now - self.request_times[0] > longest:
+            self.request_times.popleft()
+        counts = []
+        retry_after = 0
+        for limit, seconds in self.rate_limits:
+            used = sum(1 for stamp in self.request_times if now - stamp <= seconds)
+            counts.append(f"{used}:{seconds}")
+            if used > limit:
+                retry_after = max(retry_after, seconds)
+        return retry_after, counts
+
+    def build_app(self) -> FastAPI:
+        app = FastAPI()
+        upstream = self
+
+        @app.middleware("http")
+        async def simulate_upstream(request: Request, call_next):
+            upstream.calls[upstream_route(request.url.path)] += 1
+            delay = upstream.latency_ms + (upstream.rng.uniform(-upstream.jitter_ms, upstream.jitter_ms) if upstream.jitter_ms else 0)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000.0)
+            headers = {}
+            if upstream.rate_limits:
+                retry_after, counts = upstream.rate_limit_state()
+                headers = {"X-App-Rate-Limit": ",".join(f"{limit}:{seconds}" for limit, seconds in upstream.rate_limits), "X-App-Rate-Limit-Count": ",".join(counts)}
+                if retry_after:
+                    upstream.rate_limited += 1
+                    return JSONResponse({"status": {"message": "Rate limit exceeded", "status_code": 429}}, status_code=429, headers={**headers, "Retry-After": str(retry_after), "X-Rate-Limit-Type": "application"})
+            response = await call_next(request)
+            response.headers.update(headers)
+            return response
+
+        @app.post("/v1/responses")
+        async def responses(request: Request):
+            body = await request.json()
+            prompt = str(((body.get("input") or [{}])[-1].get("content") or [{}])[0].get("text") or "")
+            text = upstream.coach_brief_text(prompt)
+            if body.get("stream"):
+                return StreamingResponse(upstream.responses_stream(text), media_type="text/event-stream")
+            if upstream.openai_chunk_ms:
+                await asyncio.sleep(upstream.openai_chunks * upstream.openai_chunk_ms / 1000.0)
+            return {"id": "resp_standin", "status": "completed", "output_text": text}
+
+        @app.get("/v1/services")
+        async def render_services(limit: int = 20):
+            return [{"cursor": f"c{index}", "service": {"id": f"srv-bench{index:03d}", "name": f"bench-service-{index}", "type": "web_service", "serviceDetails": {"region": "oregon", "runtime": "python"}}} for index in range(min(limit, upstream.render_services))]
+
+        @app.get("/v1/metrics/{metric}")
+        async def render_metrics(metric: str, request: Request):
+            params = request.query_params
+            return upstream.render_metric_series(metric, params.getlist("resource"), params.get("startTime", ""), params.get("endTime", ""), int(params.get("resolutionSeconds") or 60))
+
+        @app.get("/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}")
+        async def account(game_name: str, tag_line: str):
+            return {"puuid": puuid_for(game_name, tag_line), "gameName": game_name, "tagLine": tag_line}
+
+        @app.get("/tft/match/v1/matches/by-puuid/{puuid}/ids")
+        async def match_ids(puuid: str, start: int = 0, count: int = 20):
+            return upstream.match_ids_for(puuid)[start : start + count]
+
+        @app.get("/tft/match/v1/matches/{match_id}")
+        async def match(match_id: str):
+            payload = upstream.match(match_id)
+            if payload is None:
+                return JSONResponse({"status": {"message": "Data not found", "status_code": 404}}, status_code=404)
+            return payload
+
+        @app.get("/tft/summoner/v1/summoners/by-puuid/{puuid}")
+        async def summoner(puuid: str):
+            return {"id": f"summoner-{puuid}", "puuid": puuid, "summonerLevel": 300}
+
+        @app.get("/tft/league/v1/entries/by-summoner/{summoner_id}")
+        async def league_entries(summoner_id: str):
+            return [{"queueType": "RANKED_TFT", "tier": "DIAMOND", "rank": "II", "leaguePoints": 42, "summonerId": summoner_id}]
+
+        @app.get("/tft/league/v1/{tier}")
+        async def league(tier: str, queue: str = "RANKED_TFT"):
+            return {"tier": tier.upper(), "queue": queue, "entries": upstream.ladder_entries(tier)}
+
+        @app.get("/latest/cdragon/tft/en_us.json")
+        async def tft_manifest():
+            traits = [{"apiName": f"TFT{SET_NUMBER}_{name}", "icon": f"ASSETS/UX/TraitIcons/Trait_Icon_{SET_NUMBER}_{name}.TFT_Set{SET_NUMBER}.tex"} for name in TRAITS]
+            return {"setData": [{"number": SET_NUMBER, "traits": traits}]}
+
+        @app.get("/latest/plugins/rcp-be-lol-game-data/global/default/v1/companions.json")
+        async def companions():
+            return [{"itemId": 1000 + index, "contentId": f"bench-companion-{index}", "name": f"Bench Pet {index}", "speciesName": "PetBench", "rarity": "epic", "loadoutsIcon": f"/lol-game-data/assets/ASSETS/Loadouts/Companions/Bench_{index}.png"} for index in range(1, 51)]
+
+        return app
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from bench.synthetic import EVENT_TYPES
+from loadtest.fake_upstream import FakeRiotUpstream
+
+DEFAULT_OUTPUT = Path.cwd() / ".cache" / "loadtest" / "latest.json"
+TRAFFIC_PROFILES = {
+    "mixed": {"duo_history": 0.2, "events_batch": 0.5, "scorecard": 0.3},
+    "history": {"duo_history": 1.0},
+    "ingest": {"events_batch": 1.0},
+    "read": {"scorecard": 1.0},
+    "coach": {"coach_brief": 0.5, "coach_stream": 0.5},
+    "render": {"render_overview": 1.0},
+    "meta": {"ladder_meta": 0.8, "duo_history": 0.2},
+}
+
+
+def rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return int(peak if sys.platform == "darwin" else peak * 1024)
+    except Exception:
+        return None
+
+
+def percentile(samples: list[float], pct: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return round(ordered[index], 3)
+
+
+def load_app(keep_rate_limits: bool, store_dir: Path) -> Any:
+    # Configure the backend before import: a dummy Riot key, and no per-IP limits unless asked for.
+    os.environ.setdefault("RIOT_API_KEY", "loadtest-key")
+    os.environ.setdefault("OPENAI_API_KEY", "loadtest-key")
+    os.environ.setdefault("RENDER_API_KEY", "loadtest-key")
+    if not keep_rate_limits:
+        os.environ["RATE_LIMIT_MAX_REQUESTS"] = "1000000000"
+        os.environ["RATE_LIMIT_ROUTE_LIMITS"] = ""
+    import main
+
+    main.PERSISTED_CACHE_PATH = store_dir / "duo-history-cache.json"
+    main.ANALYTICS_STORE_PATH = store_dir / "duo-analytics-store.json"
+    main.cold_archive = main.ColdArchive(store_dir / "archive")
+    main.WARM_SNAPSHOT_PATH = store_dir / "warm-state.bin"
+    return main
+
+
+class LoadRun:
+    def __init__(self, args: argparse.Namespace, main_module: Any, upstream: FakeRiotUpstream) -> None:
+        self.args = args
+        self.main = main_module
+        self.upstream = upstream
+        self.rng = random.Random(args.seed)
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+        self.duo_ids: list[str] = []
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main_module.app, client=("10.0.0.1", 4000)), base_url="http://backend.local", timeout=120.0)
+
+    def record(self, kind: str, started: float, status: str) -> None:
+        self.latencies.setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+        counts = self.statuses.setdefault(kind, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def user_headers(self, user: int) -> dict[str, str]:
+        return {"x-forwarded-for": f"10.1.{user // 250}.{user % 250}"}
+
+    async def call(self, kind: str, user: int, method: str, url: str, **kwargs: Any) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.user_headers(user), **kwargs)
+            status = str(response.status_code)
+        except Exception as error:
+            response = None
+            status = type(error).__name__
+        self.record(kind, started, status)
+        return response
+
+    def duo_history_params(self, duo: int) -> dict[str, Any]:
+        return {"gameNameA": f"LoadDuo{duo}A", "tagLineA": "LOAD", "gameNameB": f"LoadDuo{duo}B", "tagLineB": "LOAD", "region": "americas", "platform": "na1", "count": self.args.count, "maxHistory": self.args.max_history}
+
+    async def duo_history(self, user: int, duo: int, kind: str = "duo_history") -> None:
+        response = await self.call(kind, user, "GET", "/api/tft/duo-history", params=self.duo_history_params(duo))
+        if response is not None and response.status_code == 200 and kind == "warmup":
+            self.duo_ids.append(str(response.json().get("duoId") or ""))
+
+    async def events_batch(self, user: int, duo_id: str) -> None:
+        events = []
+        for _ in range(self.args.events_per_batch):
+            events.append({"type": self.rng.choice(EVENT_TYPES), "payload": {"stageMajor": self.rng.randint(2, 6), "stageMinor": self.rng.randint(1, 7)}})
+        await self.call("events_batch", user, "POST", "/api/duo/events/batch", json={"duoId": duo_id, "matchId": f"NA1_LOAD{self.rng.randint(1, 999)}", "events": events})
+
+    async def scorecard(self, user: int, duo_id: str) -> None:
+        await self.call("scorecard", user, "GET", "/api/duo/scorecard", params={"duoId": duo_id, "windowDays": 30})
+
+    def coach_payload(self) -> dict[str, Any]:
+        # A fresh metric per request keeps the digest unique, so every call pays for generation rather than hitting the brief cache.
+        return {"players": {"a": "LoadA", "b": "LoadB"}, "metrics": {"nonce": self.rng.randrange(1 << 30)}, "matches": []}
+
+    async def coach_brief(self, user: int) -> None:
+        await self.call("coach_brief", user, "POST", "/api/coach/llm-brief", json=self.coach_payload())
+
+    async def coach_stream(self, user: int) -> None:
+        # httpx.ASGITransport buffers response bodies, so this measures the whole stream, not time to first event.
+        await self.call("coach_stream", user, "POST", "/api/coach/llm-brief/stream", json=self.coach_payload())
+
+    async def user_loop(self, user: int, deadline: float, budget: list[int]) -> None:
+        weights = TRAFFIC_PROFILES[self.args.profile]
+        kinds = list(weights)
+        while time.perf_counter() < deadline and budget[0] > 0:
+            budget[0] -= 1
+            kind = self.rng.choices(kinds, weights=[weights[name] for name in kinds])[0]
+            duo = self.rng.randrange(self.args.duos)
+            if kind == "duo_history":
+                await self.duo_history(user, duo)
+            elif kind == "events_batch":
+                await self.events_batch(user, self.duo_ids[duo % len(self.duo_ids)])
+            elif kind == "coach_brief":
+                await self.coach_brief(user)
+            elif kind == "coach_stream":
+                await self.coach_stream(user)
+            elif kind == "ladder_meta":
+                await self.call("ladder_meta", user, "GET", "/api/tft/ladder-meta", params={"platform": "na1"})
+            elif kind == "render_overview":
+                await self.call("render_overview", user, "GET", "/api/site-performance/render/overview", params={"hours": self.rng.choice([1, 24, 168]), "resolutionSeconds": 300})
+            else:
+                await self.scorecard(user, self.duo_ids[duo % len(self.duo_ids)])
+
+    async def run(self) -> dict[str, Any]:
+        rss_start = rss_bytes()
+        # One ladder sampler cycle against the stand-in's Challenger/Grandmaster lists before any user traffic.
+        ladder_cycle = await self.main.ladder_sampler.run_once() if self.args.ladder_players else None
+        warm_started = time.perf_counter()
+        await asyncio.gather(*(self.duo_history(duo, duo, "warmup") for duo in range(self.args.duos)))
+        warmup_seconds = time.perf_counter() - warm_started
+        if not self.duo_ids:
+            raise RuntimeError(f"Warm-up failed; no duo records were created (statuses: {self.statuses.get('warmup')}).")
+        upstream_after_warmup = dict(self.upstream.calls)
+        rss_warm = rss_bytes()
+
+        started = time.perf_counter()
+        budget = [self.args.requests if self.args.requests > 0 else 1 << 62]
+        await asyncio.gather(*(self.user_loop(user, started + self.args.duration, budget) for user in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - started
+        await self.client.aclose()
+        rss_end = rss_bytes()
+
+        endpoints = {}
+        for kind, samples in self.latencies.items():
+            endpoints[kind] = {
+                "requests": len(samples),
+                "throughputRps": round(len(samples) / (warmup_seconds if kind == "warmup" else elapsed), 2) if samples else 0,
+                "p50Ms": percentile(samples, 50),
+                "p90Ms": percentile(samples, 90),
+                "p99Ms": percentile(samples, 99),
+                "maxMs": round(max(samples), 3) if samples else None,
+                "meanMs": round(statistics.fmean(samples), 3) if samples else None,
+                "statuses": self.statuses.get(kind, {}),
+            }
+        total = sum(row["requests"] for kind, row in endpoints.items() if kind != "warmup")
+        return {
+            "meta": {"generatedAt": datetime.now(timezone.utc).isoformat(), **{key: value for key, value in vars(self.args).items() if key != "output"}},
+            "elapsedSeconds": round(elapsed, 3),
+            "warmupSeconds": round(warmup_seconds, 3),
+            "totalRequests": total,
+            "throughputRps": round(total / elapsed, 2) if elapsed else None,
+            "endpoints": endpoints,
+            "upstream": {"warmupCalls": upstream_after_warmup, "totalCalls": dict(self.upstream.calls), "rateLimited": self.upstream.rate_limited, "openaiStreamsCancelled": self.upstream.openai_cancelled},
+            "ladderMeta": {"cycle": ladder_cycle, **self.main.ladder_sampler.stats(), "snapshot": self.main.ladder_sampler.snapshot("na1", limit=5)} if ladder_cycle else None,
+            "memory": {"rssStartBytes": rss_start, "rssAfterWarmupBytes": rss_warm, "rssEndBytes": rss_end, "rssGrowthBytes": (rss_end - rss_start) if rss_start and rss_end else None, "riotCacheEntries": len(self.main.riot_cache)},
+        }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"{'endpoint':<14} {'reqs':>7} {'rps':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  statuses")
+    for kind, row in report["endpoints"].items():
+        print(f"{kind:<14} {row['requests']:>7} {row['throughputRps']:>9} {row['p50Ms']:>9} {row['p90Ms']:>9} {row['p99Ms']:>9} {row['maxMs']:>9}  {row['statuses']}")
+    print(f"total {report['totalRequests']} requests in {report['elapsedSeconds']}s ({report['throughputRps']} rps)")
+    print(f"upstream calls: {report['upstream']['totalCalls']} (rate limited: {report['upstream']['rateLimited']})")
+    ladder = report["ladderMeta"]
+    if ladder:
+        print(f"ladder meta: {ladder['cycle']['platforms']} in {ladder['cycle']['seconds']}s, {ladder['snapshot']['sampledMatches']} matches on {ladder['snapshot']['patches']}, sketches {ladder['sketchBytes']} bytes")
+    memory = report["memory"]
+    if memory["rssGrowthBytes"] is not None:
+        print(f"rss {memory['rssStartBytes'] / 1048576:.1f} MiB -> {memory['rssEndBytes'] / 1048576:.1f} MiB (+{memory['rssGrowthBytes'] / 1048576:.1f} MiB), riot_cache entries {memory['riotCacheEntries']}")
+
+
+async def run_async(args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="loadtest-store-") as store_dir:
+        main_module = load_app(args.keep_rate_limits, Path(store_dir))
+        upstream = FakeRiotUpstream(matches_per_duo=args.matches_per_duo, latency_ms=args.upstream_latency_ms, jitter_ms=args.upstream_jitter_ms, rate_limits=args.upstream_rate_limits, seed=args.seed, openai_chunk_ms=args.openai_chunk_ms, ladder_players=args.ladder_players)
+        # Every upstream pool talks to the in-process stand-in; ASGITransport has no connection pool, so pool wait
+        # and connection telemetry stay empty here and are only meaningful against real hosts.
+        original_pools = main_module.upstream_pools
+        main_module.upstream_pools = main_module.UpstreamPools(transport_factory=lambda _name: httpx.ASGITransport(app=upstream.app))
+        main_module.ladder_sampler = main_module.LadderMetaSampler(main_module.riot_request, ["na1"], max(1, args.ladder_players), args.ladder_matches_per_player, requests_per_minute=600000)
+        try:
+            return await LoadRun(args, main_module, upstream).run()
+        finally:
+            await main_module.upstream_pools.aclose()
+            main_module.upstream_pools = original_pools
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Drive the backend against a local Riot/CommunityDragon stand-in.")
+    parser.add_argument("--profile", choices=sorted(TRAFFIC_PROFILES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of steady-state traffic after warm-up.")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = duration only).")
+    parser.add_argument("--duos", type=int, default=10)
+    parser.add_argument("--count", type=int, default=40, help="duo-history count parameter.")
+    parser.add_argument("--max-history", type=int, default=200, help="duo-history maxHistory parameter.")
+    parser.add_argument("--matches-per-duo", type=int, default=200)
+    parser.add_argument("--events-per-batch", type=int, default=20)
+    parser.add_argument("--upstream-latency-ms", type=float, default=40.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--upstream-rate-limits", default="", help='Riot-style app limits for the stand-in, e.g. "20:1,100:120".')
+    parser.add_argument("--openai-chunk-ms", type=float, default=25.0, help="Delay between streamed chunks from the Responses API stand-in.")
+    parser.add_argument("--ladder-players", type=int, default=0, help="Run one ladder meta sampler cycle over this many stand-in top players first (0 = skip).")
+    parser.add_argument("--ladder-matches-per-player", type=int, default=10)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep the backend's own per-IP rate limits active.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+    args.duos = max(1, args.duos)
+    args.concurrency = max(1, args.concurrency)
+
+    report = asyncio.run(run_async(args))
+    print_report(report)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    print(f"wrote {args.output}")
+    return 0
@@ -1,22 +1,54 @@
 
 from __future__ import annotations
 
+import asyncio
+import hmac
 import json
+import multiprocessing
 import os
 import random
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
+from itertools import chain
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator
 from urllib.parse import quote, urlencode
 
-import httpx
 from dotenv import load_dotenv
 from fastapi import FastAPI, Query, Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-
-from duo_analytics import build_duo_highlights, build_duo_scorecard, build_personalized_playbook
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from coach_brief import SYSTEM_PROMPT, BriefCache, build_brief_features, build_deterministic_findings, canonical_json, content_hash, estimate_tokens, fallback_ai_coaching, iter_sse, parse_brief_text, sse_event
+from cold_archive import ColdArchive
+from daily_rollup import ROLLUP_VERSION, DailyRollup, build_patch_diff, window_start_day
+from duo_analytics import build_duo_highlights, build_duo_scorecard, build_personalized_playbook, highlights_from_counts, playbook_from_counts, scorecard_from_counters, team_placement
+from event_log import EVENT_TOP_LEVEL_FIELDS, DuoEventLog, idempotency_key
+from ladder_meta import PLATFORM_ROUTING, LadderMetaSampler, RiotRequestBudget
+# summarize_duo_match/summarize_participant stay importable from main for bench and loadtest.
+from match_summary import summarize_duo_match, summarize_matches, summarize_participant
+from metrics import (
+    COACH_BRIEF_REQUESTS,
+    COACH_PROMPT_TOKENS,
+    COLD_START_SECONDS,
+    RATE_LIMIT_BUCKETS,
+    RIOT_CACHE_ENTRIES,
+    RIOT_CACHE_REQUESTS,
+    STORE_OPERATION_DURATION,
+    UPSTREAM_POOL_CONNECTIONS,
+    MetricsMiddleware,
+    registry as metrics_registry,
+    timed_analytics,
+)
+from middleware import CorsAndRateLimitMiddleware, SlidingWindowLimiter, parse_route_limits
+from opener_index import OPENER_INDEX_VERSION, OpenerIndex
+from profiling import ProfileStore, ProfilingMiddleware, current_profile, span
+from render_metrics import StaleWhileRevalidateCache, fetch_rollup
+from round_series import RoundStore, board_timing, slot_label
+from upstream_pools import UpstreamPools, parse_pool_limits
+from warm_start import AnalysisMemo, BootClock, FirstResponseMiddleware, read_snapshot, write_snapshot
 
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR.parent / "tftduos" / ".env")
@@ -25,24 +57,76 @@ RIOT_API_KEY = os.getenv("RIOT_API_KEY", "").strip()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip() or "gpt-4o-mini"
 OPENAI_TIMEOUT_MS = max(3000, int(os.getenv("OPENAI_TIMEOUT_MS", "15000")))
+OPENAI_API_BASE_URL = os.getenv("OPENAI_API_BASE_URL", "https://api.openai.com/v1").strip().rstrip("/")
+COACH_BRIEF_CACHE_TTL_SECONDS = max(0, int(os.getenv("COACH_BRIEF_CACHE_TTL_SECONDS", "900")))
+COACH_PROMPT_TOKEN_BUDGET = max(300, int(os.getenv("COACH_PROMPT_TOKEN_BUDGET", "2000")))
 RENDER_API_KEY = os.getenv("RENDER_API_KEY", "").strip()
 RENDER_API_BASE_URL = os.getenv("RENDER_API_BASE_URL", "https://api.render.com/v1").strip().rstrip("/")
+RENDER_DASHBOARD_SERVICE_IDS = [token.strip() for token in os.getenv("RENDER_DASHBOARD_SERVICE_IDS", "").split(",") if token.strip()]
+RENDER_CHART_POINTS = max(10, int(os.getenv("RENDER_CHART_POINTS", "120")))
+RENDER_OVERVIEW_TTL_SECONDS = max(0, int(os.getenv("RENDER_OVERVIEW_TTL_SECONDS", "60")))
+RENDER_OVERVIEW_STALE_SECONDS = max(0, int(os.getenv("RENDER_OVERVIEW_STALE_SECONDS", "600")))
 ALLOWED_ORIGINS = [token.strip() for token in os.getenv("ALLOWED_ORIGINS", "").split(",") if token.strip()]
 RATE_LIMIT_WINDOW_MS = max(1000, int(os.getenv("RATE_LIMIT_WINDOW_MS", "60000")))
 RATE_LIMIT_MAX_REQUESTS = max(1, int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "90")))
+RATE_LIMIT_ROUTE_LIMITS = parse_route_limits(
+    os.getenv("RATE_LIMIT_ROUTE_LIMITS", "/api/tft/duo-history=20,/api/coach/llm-brief=20,/api/tft/icon-manifest=300,/api/tft/companion-manifest=300"),
+    RATE_LIMIT_WINDOW_MS,
+)
+RATE_LIMIT_TRUSTED_PROXY_HOPS = max(0, int(os.getenv("RATE_LIMIT_TRUSTED_PROXY_HOPS", "1")))
+RATE_LIMIT_MAX_BUCKETS = max(100, int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "50000")))
 DEBUG_TFT_PAYLOAD = os.getenv("DEBUG_TFT_PAYLOAD", "0") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "").strip()
+PROFILE_SAMPLE_RATE = max(0.0, min(1.0, float(os.getenv("PROFILE_SAMPLE_RATE", "0"))))
+PROFILE_RING_SIZE = max(1, int(os.getenv("PROFILE_RING_SIZE", "50")))
+EVENT_LOG_CAPACITY = max(100, int(os.getenv("EVENT_LOG_CAPACITY", "6000")))
+STORE_SAVE_DEBOUNCE_MS = max(0, int(os.getenv("STORE_SAVE_DEBOUNCE_MS", "2000")))
+HOT_MATCH_LIMIT = max(50, int(os.getenv("HOT_MATCH_LIMIT", "600")))
+WARM_SNAPSHOT_INTERVAL_SECONDS = max(0, int(os.getenv("WARM_SNAPSHOT_INTERVAL_SECONDS", "300")))
+WARM_SNAPSHOT_MATCH_ENTRIES = max(0, int(os.getenv("WARM_SNAPSHOT_MATCH_ENTRIES", "400")))
+ANALYSIS_MEMO_TTL_SECONDS = max(0, int(os.getenv("ANALYSIS_MEMO_TTL_SECONDS", "300")))
+UPSTREAM_POOL_LIMITS = parse_pool_limits(os.getenv("UPSTREAM_POOL_LIMITS", ""))
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "1") == "1"
+UPSTREAM_WARMUP_REGIONS = [token.strip().lower() for token in os.getenv("UPSTREAM_WARMUP_REGIONS", "americas,na1").split(",") if token.strip()]
+LADDER_META_PLATFORMS = [token.strip().lower() for token in os.getenv("LADDER_META_PLATFORMS", "na1").split(",") if token.strip()]
+LADDER_META_INTERVAL_SECONDS = max(0, int(os.getenv("LADDER_META_INTERVAL_SECONDS", "0")))
+LADDER_META_TOP_PLAYERS = max(1, int(os.getenv("LADDER_META_TOP_PLAYERS", "50")))
+LADDER_META_MATCHES_PER_PLAYER = max(1, int(os.getenv("LADDER_META_MATCHES_PER_PLAYER", "10")))
+LADDER_META_REQUESTS_PER_MINUTE = max(1, int(os.getenv("LADDER_META_REQUESTS_PER_MINUTE", "6")))
+RIOT_REQUESTS_PER_MINUTE = max(1, int(os.getenv("RIOT_REQUESTS_PER_MINUTE", "50")))
+RIOT_BACKGROUND_RESERVE = max(0, int(os.getenv("RIOT_BACKGROUND_RESERVE", str(RIOT_REQUESTS_PER_MINUTE // 2))))
+MATCH_SUMMARY_WORKERS = max(0, int(os.getenv("MATCH_SUMMARY_WORKERS", "0")))
+MATCH_SUMMARY_POOL_MIN_MATCHES = max(1, int(os.getenv("MATCH_SUMMARY_POOL_MIN_MATCHES", "50")))
 
 CACHE_TTL = {"account": 300, "match_ids": 120, "match": 86400, "summoner": 300, "rank": 60}
-QUEUE_LABELS = {1090: "Ranked", 1100: "Normal", 1110: "Hyper Roll", 1130: "Double Up", 1160: "Ranked", 6110: "Revival"}
 
 PERSISTED_CACHE_PATH = Path.cwd() / ".cache" / "duo-history-cache.json"
 ANALYTICS_STORE_PATH = Path.cwd() / ".cache" / "duo-analytics-store.json"
-
-http_client = httpx.AsyncClient(timeout=httpx.Timeout(25.0, connect=10.0))
+COLD_ARCHIVE_PATH = Path.cwd() / ".cache" / "archive"
+WARM_SNAPSHOT_PATH = Path.cwd() / ".cache" / "warm-state.bin"
+
+boot_clock = BootClock()
+upstream_pools = UpstreamPools(UPSTREAM_POOL_LIMITS, http2=UPSTREAM_HTTP2)
+# Resolves riot_request at call time, so the sampler follows upstream_pools swaps (load tests).
+riot_budget = RiotRequestBudget(RIOT_REQUESTS_PER_MINUTE, RIOT_BACKGROUND_RESERVE)
+ladder_sampler = LadderMetaSampler(lambda url: riot_request(url, background=True), LADDER_META_PLATFORMS, LADDER_META_TOP_PLAYERS, LADDER_META_MATCHES_PER_PLAYER, LADDER_META_REQUESTS_PER_MINUTE)
+summary_pool: ProcessPoolExecutor | None = None
 riot_cache: dict[str, tuple[float, Any]] = {}
-request_buckets: dict[str, dict[str, int]] = {}
+rate_limiter = SlidingWindowLimiter(max_keys=RATE_LIMIT_MAX_BUCKETS, sweep_interval_ms=RATE_LIMIT_WINDOW_MS)
+profile_store = ProfileStore(PROFILE_RING_SIZE)
 persisted_cache: dict[str, Any] = {"version": 1, "players": {}}
 analytics_store: dict[str, Any] = {"version": 1, "duos": {}}
+cold_archive = ColdArchive(COLD_ARCHIVE_PATH)
+brief_cache = BriefCache(COACH_BRIEF_CACHE_TTL_SECONDS)
+render_cache = StaleWhileRevalidateCache(RENDER_OVERVIEW_TTL_SECONDS, RENDER_OVERVIEW_STALE_SECONDS)
+analysis_memo = AnalysisMemo(ANALYSIS_MEMO_TTL_SECONDS)
+pending_archive: dict[str, dict[str, list[dict[str, Any]]]] = {}
+# Held while pending rows move into the cold archive and while a backfill snapshots pending + archive, so a
+# backfill never sees a row in both places or in neither.
+archive_lock = asyncio.Lock()
+stores_loaded = False
+pending_save: asyncio.Task | None = None
 manifest_cache: dict[str, Any] = {"loadedAt": 0, "bySet": {}}
 companion_manifest_cache: dict[str, Any] = {"loadedAt": 0, "byItemId": {}, "byContentId": {}}
 
@@ -51,147 +135,295 @@ def as_list(value: Any) -> list[Any]:
     return value if isinstance(value, list) else []
 
 
-def patch_from_game_version(version: Any) -> str | None:
-    parts = str(version or "").split(".")
-    if len(parts) < 2 or not parts[0].isdigit() or not parts[1].isdigit():
-        return None
-    return f"{parts[0]}.{parts[1]}"
+def stable_duo_id(puuid_a: str, puuid_b: str) -> str:
+    return "::".join(sorted([str(puuid_a or ""), str(puuid_b or "")]))
 
 
-def queue_label(queue_id: Any) -> str:
+def collect_runtime_metrics() -> None:
+    RIOT_CACHE_ENTRIES.set(len(riot_cache))
+    RATE_LIMIT_BUCKETS.set(len(rate_limiter.buckets))
+    for phase, elapsed_ms in boot_clock.marks.items():
+        COLD_START_SECONDS.set(elapsed_ms / 1000.0, phase=phase)
+    for pool, counts in upstream_pools.connection_counts().items():
+        for state, count in (counts or {}).items():
+            UPSTREAM_POOL_CONNECTIONS.set(count, pool=pool, state=state)
+
+
+metrics_registry.register_collector(collect_runtime_metrics)
+
+
+def run_analytics(fn: Any, *args: Any) -> Any:
+    with span(fn.__name__):
+        return timed_analytics(fn, *args)
+
+
+def new_summary_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: workers only import match_summary and never inherit the loop, sockets or threads.
+    pool = ProcessPoolExecutor(MATCH_SUMMARY_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    # Start the workers now so the next cold load does not pay their interpreter start-up.
+    for _ in range(MATCH_SUMMARY_WORKERS):
+        pool.submit(summarize_matches, [], "", "")
+    return pool
+
+
+async def summarize_shared_matches(rows: list[tuple[str, Any]], puuid_a: str, puuid_b: str, lobby: bool = True) -> list[dict[str, Any]]:
+    # Small syncs summarize inline in one batch. Cold loads of MATCH_SUMMARY_POOL_MIN_MATCHES or more split across the
+    # worker pool so the event loop keeps serving while the payloads are transformed.
+    global summary_pool
+    pool = summary_pool
+    with span("summarize_matches", str(len(rows))):
+        if pool is None or len(rows) < MATCH_SUMMARY_POOL_MIN_MATCHES:
+            summaries = summarize_matches(rows, puuid_a, puuid_b, lobby)
+        else:
+            loop = asyncio.get_running_loop()
+            size = -(-len(rows) // MATCH_SUMMARY_WORKERS)
+            try:
+                chunks = await asyncio.gather(*(loop.run_in_executor(pool, summarize_matches, rows[start : start + size], puuid_a, puuid_b, lobby) for start in range(0, len(rows), size)))
+                summaries = [summary for chunk in chunks for summary in chunk]
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed) and the pool refuses all further work: replace it once, even when
+                # several requests hit the broken pool together, and summarize this batch inline.
+                if summary_pool is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    summary_pool = new_summary_pool()
+                summaries = summarize_matches(rows, puuid_a, puuid_b, lobby)
+    return [summary for summary in summaries if summary is not None]
+
+
+def has_bearer_token(request: Request, token: str) -> bool:
+    # Constant-time comparison, so response timing does not reveal how much of a guessed token matched.
+    return hmac.compare_digest(request.headers.get("authorization", "").encode(), f"Bearer {token}".encode())
+
+
+def is_admin_request(request: Request) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) and has_bearer_token(request, PROFILE_ADMIN_TOKEN)
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    global summary_pool
+    with STORE_OPERATION_DURATION.time(operation="restore"):
+        restored = await restore_warm_snapshot()
+    boot_clock.mark("startup", **restored)
+    tasks: list[asyncio.Task] = []
+    if WARM_SNAPSHOT_INTERVAL_SECONDS:
+        tasks.append(asyncio.create_task(snapshot_loop()))
+    # Open keep-alive connections to the configured Riot regions in the background; requests do not wait for it.
+    if RIOT_API_KEY and UPSTREAM_WARMUP_REGIONS:
+        tasks.append(asyncio.create_task(upstream_pools.warm_up(upstream_warmup_urls(), lambda url: riot_request(url, background=True))))
+    if RIOT_API_KEY and LADDER_META_INTERVAL_SECONDS and ladder_sampler.platforms:
+        tasks.append(asyncio.create_task(ladder_sampler.run_forever(LADDER_META_INTERVAL_SECONDS)))
+    if MATCH_SUMMARY_WORKERS:
+        summary_pool = new_summary_pool()
     try:
-        parsed = int(queue_id)
-    except Exception:
-        parsed = 0
-    return QUEUE_LABELS.get(parsed, f"Queue {queue_id or '?'}")
+        yield
+    finally:
+        # Stop background work, persist state, then release connections and workers whatever the saves did.
+        for task in tasks:
+            task.cancel()
+        try:
+            await flush_pending_save()
+            # Best effort, as in snapshot_loop: a missing snapshot only costs the next boot a cold start.
+            try:
+                await write_warm_snapshot()
+            except Exception:
+                pass
+        finally:
+            await upstream_pools.aclose()
+            if summary_pool is not None:
+                summary_pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfilingMiddleware, store=profile_store, admin_token=PROFILE_ADMIN_TOKEN, sample_rate=PROFILE_SAMPLE_RATE)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(
+    CorsAndRateLimitMiddleware,
+    allowed_origins=ALLOWED_ORIGINS,
+    window_ms=RATE_LIMIT_WINDOW_MS,
+    max_requests=RATE_LIMIT_MAX_REQUESTS,
+    route_limits=RATE_LIMIT_ROUTE_LIMITS,
+    trusted_proxy_hops=RATE_LIMIT_TRUSTED_PROXY_HOPS,
+    limiter=rate_limiter,
+)
+app.add_middleware(FirstResponseMiddleware, clock=boot_clock)
 
 
-def stable_duo_id(puuid_a: str, puuid_b: str) -> str:
-    return "::".join(sorted([str(puuid_a or ""), str(puuid_b or "")]))
+async def ensure_stores_loaded() -> None:
+    # Stores are read once per process; in-memory state (indexed event logs, debounced writes) is authoritative after that.
+    global persisted_cache, analytics_store, stores_loaded
+    if stores_loaded:
+        return
+    stores_loaded = True
+    with STORE_OPERATION_DURATION.time(operation="load"):
+        try:
+            persisted_cache = json.loads(PERSISTED_CACHE_PATH.read_text(encoding="utf-8"))
+        except Exception:
+            persisted_cache = {"version": 1, "players": {}}
+        try:
+            analytics_store = json.loads(ANALYTICS_STORE_PATH.read_text(encoding="utf-8"))
+        except Exception:
+            analytics_store = {"version": 1, "duos": {}}
 
 
-def summarize_traits(traits: list[dict[str, Any]] | None) -> list[dict[str, Any]]:
-    out = [
-        {"name": row.get("name"), "numUnits": row.get("num_units"), "style": row.get("style"), "tierCurrent": row.get("tier_current")}
-        for row in as_list(traits)
-    ]
-    out.sort(key=lambda row: (-(int(row.get("style") or 0)), -(int(row.get("numUnits") or 0))))
-    return out
-
-
-def summarize_units(units: list[dict[str, Any]] | None) -> list[dict[str, Any]]:
-    return [
-        {
-            "characterId": row.get("character_id"),
-            "name": row.get("name"),
-            "tier": row.get("tier"),
-            "rarity": row.get("rarity"),
-            "itemNames": as_list(row.get("itemNames")),
-            "items": as_list(row.get("itemNames")),
-        }
-        for row in as_list(units)
-    ]
+async def save_stores() -> None:
+    with span("save_stores"), STORE_OPERATION_DURATION.time(operation="save"):
+        # Archive rows leaving the hot window before the hot store that no longer holds them is written.
+        await archive_pending()
+        PERSISTED_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        ANALYTICS_STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        PERSISTED_CACHE_PATH.write_text(json.dumps(persisted_cache), encoding="utf-8")
+        ANALYTICS_STORE_PATH.write_text(json.dumps(analytics_store, default=store_json_default), encoding="utf-8")
 
 
-def summarize_participant(participant: dict[str, Any]) -> dict[str, Any]:
-    companion = participant.get("companion") or {}
-    return {
-        "puuid": participant.get("puuid"),
-        "riotIdGameName": participant.get("riotIdGameName"),
-        "riotIdTagline": participant.get("riotIdTagline"),
-        "placement": participant.get("placement"),
-        "win": participant.get("win"),
-        "level": participant.get("level"),
-        "lastRound": participant.get("last_round"),
-        "goldLeft": participant.get("gold_left"),
-        "playersEliminated": participant.get("players_eliminated"),
-        "totalDamageToPlayers": participant.get("total_damage_to_players"),
-        "timeEliminated": participant.get("time_eliminated"),
-        "partnerGroupId": participant.get("partner_group_id"),
-        "hasAugmentsField": "augments" in participant,
-        "augments": participant.get("augments") or [],
-        "companion": {
-            "contentId": companion.get("content_ID"),
-            "itemId": companion.get("item_ID"),
-            "skinId": companion.get("skin_ID"),
-            "species": companion.get("species"),
-            "raw": companion,
-        },
-        "arena": {"arenaId": participant.get("arena_id"), "skinId": participant.get("arena_skin_id"), "available": participant.get("arena_id") is not None},
-        "traits": summarize_traits(participant.get("traits")),
-        "units": summarize_units(participant.get("units")),
-    }
+def store_json_default(value: Any) -> Any:
+    if isinstance(value, DuoEventLog):
+        return value.to_list()
+    if isinstance(value, (DailyRollup, OpenerIndex, RoundStore)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
-class CorsAndRateLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        origin = request.headers.get("origin", "")
-        is_allowed = (not origin) or (not ALLOWED_ORIGINS) or (origin in ALLOWED_ORIGINS)
-
-        if request.method == "OPTIONS":
-            if not is_allowed:
-                return JSONResponse({"error": "Origin not allowed."}, status_code=403)
-            response = JSONResponse({}, status_code=204)
-            if origin:
-                response.headers["Access-Control-Allow-Origin"] = origin
-                response.headers["Vary"] = "Origin"
-            response.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS"
-            response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-            return response
-
-        if request.url.path.startswith("/api"):
-            now_ms = int(time.time() * 1000)
-            ip = (request.headers.get("x-forwarded-for") or request.client.host or "unknown").split(",")[0].strip()
-            bucket = request_buckets.get(ip)
-            if bucket is None or now_ms - int(bucket["windowStart"]) > RATE_LIMIT_WINDOW_MS:
-                request_buckets[ip] = {"windowStart": now_ms, "count": 1}
-            else:
-                if int(bucket["count"]) >= RATE_LIMIT_MAX_REQUESTS:
-                    retry_after = max(1, (RATE_LIMIT_WINDOW_MS - (now_ms - int(bucket["windowStart"]))) // 1000)
-                    response = JSONResponse({"error": "Too many requests. Please try again shortly.", "retryAfterSeconds": retry_after}, status_code=429)
-                    response.headers["Retry-After"] = str(retry_after)
-                    return response
-                bucket["count"] = int(bucket["count"]) + 1
-
-        if not is_allowed:
-            return JSONResponse({"error": "Origin not allowed."}, status_code=403)
-
-        response = await call_next(request)
-        if origin and is_allowed:
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Vary"] = "Origin"
-        if is_allowed:
-            response.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS"
-            response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-        return response
-
-
-app = FastAPI()
-app.add_middleware(CorsAndRateLimitMiddleware)
 
+def request_save() -> None:
+    # Coalesce writes from high-frequency ingest into one save per debounce window.
+    global pending_save
+    if pending_save is None or pending_save.done():
+        pending_save = asyncio.get_running_loop().create_task(debounced_save())
 
-async def ensure_stores_loaded() -> None:
-    global persisted_cache, analytics_store
-    try:
-        persisted_cache = json.loads(PERSISTED_CACHE_PATH.read_text(encoding="utf-8"))
-    except Exception:
-        persisted_cache = {"version": 1, "players": {}}
-    try:
-        analytics_store = json.loads(ANALYTICS_STORE_PATH.read_text(encoding="utf-8"))
-    except Exception:
-        analytics_store = {"version": 1, "duos": {}}
 
+async def debounced_save() -> None:
+    await asyncio.sleep(STORE_SAVE_DEBOUNCE_MS / 1000.0)
+    await save_stores()
 
-async def save_stores() -> None:
-    PERSISTED_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    ANALYTICS_STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    PERSISTED_CACHE_PATH.write_text(json.dumps(persisted_cache), encoding="utf-8")
-    ANALYTICS_STORE_PATH.write_text(json.dumps(analytics_store), encoding="utf-8")
+
+async def flush_pending_save() -> None:
+    global pending_save
+    if pending_save is not None and not pending_save.done():
+        pending_save.cancel()
+        pending_save = None
+        await save_stores()
 
 
-async def riot_request(url: str) -> Any:
+def archive_rows(duo_id: str, kind: str) -> list[dict[str, Any]]:
+    return pending_archive.setdefault(duo_id, {"matches": [], "events": []})[kind]
+
+
+async def archive_pending(duo_id: str | None = None) -> None:
+    # Moves evicted rows (one duo's, or every duo's) into the cold archive. Ingest calls it for the duo it just
+    # evicted from before responding, so evicted rows reach disk without waiting for the debounced save.
+    async with archive_lock:
+        pending = {key: {kind: list(rows) for kind, rows in kinds.items()} for key, kinds in pending_archive.items() if duo_id is None or key == duo_id}
+        if not pending:
+            return
+        await asyncio.to_thread(flush_archive, pending)
+        for key, kinds in pending.items():
+            for kind, rows in kinds.items():
+                # Rows evicted while the gzip writes ran stay pending for the next flush.
+                del pending_archive[key][kind][: len(rows)]
+            if not any(pending_archive[key].values()):
+                del pending_archive[key]
+
+
+def flush_archive(pending: dict[str, dict[str, list[dict[str, Any]]]]) -> None:
+    # Runs in a worker thread: gzip segment writes stay off the event loop.
+    for duo_id, kinds in pending.items():
+        for kind, rows in kinds.items():
+            if rows:
+                cold_archive.append(duo_id, kind, rows)
+
+
+def duo_event_log(record: dict[str, Any]) -> DuoEventLog:
+    events = record.get("events")
+    if not isinstance(events, DuoEventLog):
+        # Resolve the pending list on every eviction: flush_archive drops it after each save.
+        events = DuoEventLog(EVENT_LOG_CAPACITY, as_list(events), on_evict=lambda event, duo_id=str(record.get("duoId") or ""): archive_rows(duo_id, "events").append(event))
+        record["events"] = events
+    return events
+
+
+def backfill_daily_rollup(duo_id: str, hot_matches: list[dict[str, Any]], hot_events: list[dict[str, Any]], pending: dict[str, list[dict[str, Any]]]) -> DailyRollup:
+    rollup = DailyRollup()
+    rollup.add_matches(chain(cold_archive.read_window(duo_id, "matches"), pending.get("matches", []), hot_matches))
+    for event in chain(cold_archive.read_window(duo_id, "events"), pending.get("events", []), hot_events):
+        rollup.add_event(event)
+    return rollup
+
+
+def backfill_opener_index(duo_id: str, hot_matches: list[dict[str, Any]], _hot_events: list[dict[str, Any]], pending: dict[str, list[dict[str, Any]]]) -> OpenerIndex:
+    index = OpenerIndex()
+    index.add_matches(chain(cold_archive.read_window(duo_id, "matches"), pending.get("matches", []), hot_matches))
+    return index
+
+
+async def materialized_view(duo_id: str, record: dict[str, Any], field: str, view_type: type, version: int, backfill: Any) -> Any:
+    view = record.get(field)
+    if isinstance(view, view_type):
+        return view
+    if isinstance(view, dict) and view.get("version") == version:
+        view = view_type(view)
+    else:
+        # First use, or a changed layout: fold the full hot + archived history once, off the event loop.
+        async with archive_lock:
+            if isinstance(record.get(field), view_type):
+                return record[field]
+            hot_matches = list((record.get("matchesById") or {}).values())
+            hot_events = duo_event_log(record).to_list()
+            pending = {kind: list(rows) for kind, rows in (pending_archive.get(duo_id) or {}).items()}
+            with span(backfill.__name__):
+                view = await asyncio.to_thread(backfill, duo_id, hot_matches, hot_events, pending)
+        if isinstance(record.get(field), view_type):
+            return record[field]
+        request_save()
+    record[field] = view
+    return view
+
+
+async def duo_daily_rollup(duo_id: str, record: dict[str, Any]) -> DailyRollup:
+    return await materialized_view(duo_id, record, "daily", DailyRollup, ROLLUP_VERSION, backfill_daily_rollup)
+
+
+async def duo_opener_index(duo_id: str, record: dict[str, Any]) -> OpenerIndex:
+    return await materialized_view(duo_id, record, "openers", OpenerIndex, OPENER_INDEX_VERSION, backfill_opener_index)
+
+
+def window_playbook(openers: OpenerIndex, match_totals: dict[str, Any], event_totals: dict[str, Any], patch: str | None = None, trait: str | None = None) -> dict[str, Any]:
+    # Counts come from the daily rollup for the window; openers are ranked over the full history of the latest set.
+    return playbook_from_counts(event_totals["types"].get("roll_down", 0), event_totals["types"].get("gift_sent", 0), match_totals["sameTeamGames"], openers.rank(patch=patch, trait=trait))
+
+
+def duo_round_store(record: dict[str, Any]) -> RoundStore:
+    rounds = record.get("rounds")
+    if not isinstance(rounds, RoundStore):
+        rounds = RoundStore(rounds if isinstance(rounds, dict) else None, HOT_MATCH_LIMIT)
+        record["rounds"] = rounds
+    return rounds
+
+
+def duo_board_timing(record: dict[str, Any], since_day: str | None = None) -> tuple[dict[str, Any], dict[str, Any]] | None:
+    # Board-timing alignment and gift-to-spike latency over matches with round snapshots; None keeps the placeholders.
+    matches = record.get("matchesById") or {}
+    store = duo_round_store(record)
+    entries = store.since(since_day, {match_id: (matches.get(match_id) or {}).get("gameDatetime") for match_id in store.matches} if since_day else None)
+    if not entries:
+        return None
+    events = duo_event_log(record)
+    placements = {match_id: team_placement(matches[match_id]) for match_id, _rounds in entries if (matches.get(match_id) or {}).get("sameTeam")}
+    gifts = {match_id: [event for event in events.of_match(match_id) if event.get("type") == "gift_sent"] for match_id, _rounds in entries}
+    return run_analytics(board_timing, entries, placements, gifts)
+
+
+def window_highlights(match_totals: dict[str, Any], event_totals: dict[str, Any]) -> dict[str, Any]:
+    return highlights_from_counts(match_totals["wins"], event_totals["types"].get("rescue_arrival", 0), event_totals["types"].get("gift_sent", 0))
+
+
+async def riot_request(url: str, background: bool = False) -> Any:
     if not RIOT_API_KEY:
         raise RuntimeError("RIOT_API_KEY is missing on the server. Add it to your .env file.")
-    response = await http_client.get(url, headers={"X-Riot-Token": RIOT_API_KEY})
+    # Background callers (the ladder sampler) wait for headroom; user requests spend from the same budget and never wait.
+    if background:
+        await riot_budget.acquire_background()
+    else:
+        riot_budget.spend()
+    response = await upstream_pools.for_url(url).get(url, headers={"X-Riot-Token": RIOT_API_KEY})
     if response.status_code >= 400:
         error = RuntimeError(f"Riot API request failed ({response.status_code}).")
         setattr(error, "status", response.status_code)
@@ -205,7 +437,9 @@ async def riot_request_cached(url: str, ttl_seconds: int) -> Any:
     now = time.time()
     hit = riot_cache.get(url)
     if hit and now < hit[0]:
+        RIOT_CACHE_REQUESTS.inc(result="hit")
         return hit[1]
+    RIOT_CACHE_REQUESTS.inc(result="miss" if hit is None else "expired")
     data = await riot_request(url)
     riot_cache[url] = (now + ttl_seconds, data)
     return data
@@ -219,6 +453,19 @@ def riot_routing_url(routing_region: str, pathname: str) -> str:
     return f"https://{routing_region}.api.riotgames.com{pathname}"
 
 
+def upstream_warmup_urls() -> dict[str, str | None]:
+    # Platform hosts answer the TFT status endpoint. Routing hosts have no cheap request that needs no player, so they
+    # repeat an account lookup restored from the warm snapshot (None until one has been cached).
+    urls: dict[str, str | None] = {}
+    for region in UPSTREAM_WARMUP_REGIONS:
+        if region in PLATFORM_ROUTING:
+            urls[f"{region}.api.riotgames.com"] = riot_platform_url(region, "/tft/status/v1/platform-data")
+        else:
+            prefix = riot_routing_url(region, "/riot/account/v1/accounts/by-riot-id/")
+            urls[f"{region}.api.riotgames.com"] = next((url for url in riot_cache if url.startswith(prefix)), None)
+    return urls
+
+
 async def fetch_player_data(game_name: str, tag_line: str, routing_region: str, platform_region: str, max_history: int) -> dict[str, Any]:
     account = await riot_request_cached(
         riot_routing_url(routing_region, f"/riot/account/v1/accounts/by-riot-id/{quote(game_name)}/{quote(tag_line)}"),
@@ -255,7 +502,7 @@ async def ensure_tft_icon_manifest_loaded() -> None:
     ttl_seconds = 6 * 60 * 60
     if time.time() - manifest_cache.get("loadedAt", 0) < ttl_seconds and manifest_cache.get("bySet"):
         return
-    response = await http_client.get("https://raw.communitydragon.org/latest/cdragon/tft/en_us.json")
+    response = await upstream_pools.client("cdragon").get("https://raw.communitydragon.org/latest/cdragon/tft/en_us.json")
     response.raise_for_status()
     data = response.json()
     by_set: dict[str, Any] = {}
@@ -280,7 +527,7 @@ async def ensure_companion_manifest_loaded() -> None:
     ttl_seconds = 6 * 60 * 60
     if time.time() - companion_manifest_cache.get("loadedAt", 0) < ttl_seconds and companion_manifest_cache.get("byItemId"):
         return
-    response = await http_client.get("https://raw.communitydragon.org/latest/plugins/rcp-be-lol-game-data/global/default/v1/companions.json")
+    response = await upstream_pools.client("cdragon").get("https://raw.communitydragon.org/latest/plugins/rcp-be-lol-game-data/global/default/v1/companions.json")
     response.raise_for_status()
     by_item_id: dict[str, Any] = {}
     by_content_id: dict[str, Any] = {}
@@ -301,14 +548,93 @@ async def ensure_companion_manifest_loaded() -> None:
     companion_manifest_cache["byContentId"] = by_content_id
 
 
-@app.on_event("shutdown")
-async def shutdown_event() -> None:
-    await http_client.aclose()
+def store_mtime_ns() -> int | None:
+    try:
+        return ANALYTICS_STORE_PATH.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def warm_state() -> dict[str, Any]:
+    # Live riot_cache entries (match payloads capped to the most recently fetched), manifest indexes and memoized
+    # duo analyses. Shallow copies are taken on the event loop; serialization happens in a worker thread.
+    now = time.time()
+    live = [(url, entry) for url, entry in riot_cache.items() if entry[0] > now]
+    matches = sorted((row for row in live if "/tft/match/v1/matches/" in row[0] and "/by-puuid/" not in row[0]), key=lambda row: row[1][0], reverse=True)
+    others = [row for row in live if "/tft/match/v1/matches/" not in row[0] or "/by-puuid/" in row[0]]
+    return {
+        "version": 1,
+        "savedAt": int(now * 1000),
+        "storeMtimeNs": store_mtime_ns(),
+        "riotCache": [[url, expires, data] for url, (expires, data) in others + matches[:WARM_SNAPSHOT_MATCH_ENTRIES]],
+        "manifest": dict(manifest_cache),
+        "companionManifest": dict(companion_manifest_cache),
+        "analyses": analysis_memo.export(),
+    }
+
+
+async def write_warm_snapshot() -> None:
+    state = warm_state()
+    with STORE_OPERATION_DURATION.time(operation="snapshot"):
+        await asyncio.to_thread(write_snapshot, WARM_SNAPSHOT_PATH, state)
+
+
+async def restore_warm_snapshot() -> dict[str, int]:
+    state = await asyncio.to_thread(read_snapshot, WARM_SNAPSHOT_PATH)
+    if not state:
+        return {"riotCache": 0, "analyses": 0}
+    now = time.time()
+    restored = 0
+    for url, expires, data in state.get("riotCache") or []:
+        if expires > now and url not in riot_cache:
+            riot_cache[url] = (expires, data)
+            restored += 1
+    for target, saved in ((manifest_cache, state.get("manifest")), (companion_manifest_cache, state.get("companionManifest"))):
+        if isinstance(saved, dict) and float(saved.get("loadedAt") or 0) > float(target.get("loadedAt") or 0):
+            target.update(saved)
+    # Memoized analyses are only valid against the exact store file they were computed from.
+    analyses = 0
+    if state.get("storeMtimeNs") is not None and state.get("storeMtimeNs") == store_mtime_ns():
+        analyses = analysis_memo.restore(state.get("analyses") or [])
+    return {"riotCache": restored, "analyses": analyses}
+
+
+async def snapshot_loop() -> None:
+    while True:
+        await asyncio.sleep(WARM_SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            await write_warm_snapshot()
+        except Exception:
+            pass
 
 
 @app.get("/health")
-async def health() -> dict[str, bool]:
-    return {"ok": True}
+async def health() -> dict[str, Any]:
+    return {"ok": True, "boot": boot_clock.report(), "upstream": upstream_pools.stats(), "ladderMeta": ladder_sampler.stats(), "riotBudget": riot_budget.stats()}
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    if METRICS_TOKEN and not has_bearer_token(request, METRICS_TOKEN):
+        return JSONResponse({"error": "Unauthorized."}, status_code=401)
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/profiles")
+async def admin_profiles(request: Request):
+    if not is_admin_request(request):
+        return JSONResponse({"error": "Unauthorized."}, status_code=401)
+    return {"ok": True, "capacity": profile_store.profiles.maxlen, "profiles": profile_store.list()}
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def admin_profile(profile_id: str, request: Request):
+    if not is_admin_request(request):
+        return JSONResponse({"error": "Unauthorized."}, status_code=401)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return JSONResponse({"error": "Profile not found."}, status_code=404)
+    return {"ok": True, "profile": profile.to_dict()}
 
 
 @app.get("/api/tft/icon-manifest")
@@ -340,43 +666,55 @@ async def tft_companion_manifest(itemIds: str = "", contentIds: str = ""):
         return JSONResponse({"error": str(error) or "Failed to load companion manifest."}, status_code=500)
 
 
+@app.get("/api/tft/ladder-meta")
+async def tft_ladder_meta(platform: str = "na1", patch: str = "", limit: int = 10):
+    # Served from the in-memory sketches; never calls Riot.
+    return {"ladderMeta": ladder_sampler.snapshot(platform.strip().lower(), patch.strip() or None, max(1, min(50, int(limit)))), "sampler": ladder_sampler.stats()}
+
+
+async def load_render_overview(hours: int, resolution_seconds: int) -> dict[str, Any]:
+    # End the window on a resolution boundary so repeated loads of the same window line up bucket for bucket.
+    end_ts = int(time.time()) // resolution_seconds * resolution_seconds
+    window = {
+        "hours": hours,
+        "resolutionSeconds": resolution_seconds,
+        "startTime": datetime.fromtimestamp(end_ts - hours * 3600, timezone.utc).isoformat(),
+        "endTime": datetime.fromtimestamp(end_ts, timezone.utc).isoformat(),
+    }
+    response = await upstream_pools.client("render").get(
+        f"{RENDER_API_BASE_URL}/services",
+        params={"limit": 100, "includePreviews": "false"},
+        headers={"Authorization": f"Bearer {RENDER_API_KEY}", "Accept": "application/json"},
+    )
+    response.raise_for_status()
+    services = []
+    for row in as_list(response.json()):
+        service = row.get("service") if isinstance(row, dict) and "service" in row else row
+        if not isinstance(service, dict) or not service.get("id"):
+            continue
+        if RENDER_DASHBOARD_SERVICE_IDS and service["id"] not in RENDER_DASHBOARD_SERVICE_IDS:
+            continue
+        details = service.get("serviceDetails") if isinstance(service.get("serviceDetails"), dict) else {}
+        services.append({"id": service.get("id"), "name": service.get("name") or service.get("id"), "type": service.get("type") or "unknown", "region": details.get("region"), "runtime": details.get("runtime") or details.get("env")})
+    summary, metrics, warnings = await fetch_rollup(upstream_pools.client("render"), RENDER_API_BASE_URL, RENDER_API_KEY, [service["id"] for service in services], window, RENDER_CHART_POINTS)
+    return {"ok": True, "generatedAt": int(time.time() * 1000), "window": window, "services": services, "summary": summary, "metrics": metrics, "pointBudget": RENDER_CHART_POINTS, "warnings": warnings}
+
+
 @app.get("/api/site-performance/render/overview")
 async def site_performance_overview(hours: int = 24, resolutionSeconds: int = 300):
     try:
         if not RENDER_API_KEY:
             raise RuntimeError("RENDER_API_KEY is missing on the backend service.")
-        end_time = datetime.now(timezone.utc)
-        start_time = end_time.timestamp() - max(1, min(168, int(hours))) * 3600
-        window = {
-            "hours": max(1, min(168, int(hours))),
-            "resolutionSeconds": max(30, min(3600, int(resolutionSeconds))),
-            "startTime": datetime.fromtimestamp(start_time, timezone.utc).isoformat(),
-            "endTime": end_time.isoformat(),
-        }
-        response = await http_client.get(
-            f"{RENDER_API_BASE_URL}/services",
-            params={"limit": 100, "includePreviews": "false"},
-            headers={"Authorization": f"Bearer {RENDER_API_KEY}", "Accept": "application/json"},
-        )
-        response.raise_for_status()
-        services = []
-        for row in as_list(response.json()):
-            service = row.get("service") if isinstance(row, dict) else row
-            if not isinstance(service, dict) or not service.get("id"):
-                continue
-            services.append({"id": service.get("id"), "name": service.get("name") or service.get("id"), "type": service.get("type") or "unknown"})
-        return {
-            "ok": True,
-            "generatedAt": int(time.time() * 1000),
-            "window": window,
-            "services": services,
-            "summary": {"serviceCount": len(services), "totalHttpRequests": 0, "totalBandwidthBytes": 0, "avgCpuPercent": None, "avgMemoryGb": None, "peakMemoryGb": None},
-            "metrics": {},
-            "warnings": ["Python migration: detailed Render metric rollups not yet ported."],
-        }
+        hours = max(1, min(168, int(hours)))
+        resolution_seconds = max(30, min(3600, int(resolutionSeconds)))
+        with span("render_overview"):
+            overview, state, age = await render_cache.get((hours, resolution_seconds), lambda: load_render_overview(hours, resolution_seconds))
+        # The overview is plain JSON already; JSONResponse skips FastAPI's per-element encoding of the chart arrays.
+        return JSONResponse({**overview, "cache": {"state": state, "ageSeconds": round(age, 1)}})
     except Exception as error:
         return JSONResponse({"ok": False, "error": str(error), "details": None}, status_code=500)
 
+
 @app.get("/api/tft/duo-history")
 async def duo_history(
     gameNameA: str = "",
@@ -388,60 +726,47 @@ async def duo_history(
     count: int = 40,
     maxHistory: int = 200,
     deltaHours: int = 24,
+    includeLobby: bool = True,
 ):
     try:
         if region.strip().lower() not in {"americas", "europe", "asia"}:
             return JSONResponse({"error": "region must be one of: americas, europe, asia"}, status_code=400)
         await ensure_stores_loaded()
-        player_a = await fetch_player_data(gameNameA.strip(), tagLineA.strip(), region.strip().lower(), platform.strip().lower(), max(50, min(1000, int(maxHistory))))
-        player_b = await fetch_player_data(gameNameB.strip(), tagLineB.strip(), region.strip().lower(), platform.strip().lower(), max(50, min(1000, int(maxHistory))))
+        with span("fetch_player_data", "playerA"):
+            player_a = await fetch_player_data(gameNameA.strip(), tagLineA.strip(), region.strip().lower(), platform.strip().lower(), max(50, min(1000, int(maxHistory))))
+        with span("fetch_player_data", "playerB"):
+            player_b = await fetch_player_data(gameNameB.strip(), tagLineB.strip(), region.strip().lower(), platform.strip().lower(), max(50, min(1000, int(maxHistory))))
 
         ids_b = set(player_b["matchIds"])
         shared_ids = [match_id for match_id in player_a["matchIds"] if match_id in ids_b][: max(1, min(200, int(count)))]
 
-        matches: list[dict[str, Any]] = []
+        raw_matches: list[tuple[str, Any]] = []
         for match_id in shared_ids:
-            match = await riot_request_cached(riot_routing_url(region.strip().lower(), f"/tft/match/v1/matches/{match_id}"), CACHE_TTL["match"])
-            participants = as_list(((match or {}).get("info") or {}).get("participants"))
-            participant_a = next((entry for entry in participants if entry.get("puuid") == (player_a["account"] or {}).get("puuid")), None)
-            participant_b = next((entry for entry in participants if entry.get("puuid") == (player_b["account"] or {}).get("puuid")), None)
-            if not participant_a or not participant_b:
-                continue
-            summary_a = summarize_participant(participant_a)
-            summary_b = summarize_participant(participant_b)
-            same_team = bool(summary_a.get("partnerGroupId") and summary_b.get("partnerGroupId") and summary_a.get("partnerGroupId") == summary_b.get("partnerGroupId"))
-            lobby = [summarize_participant(entry) for entry in participants]
-            lobby.sort(key=lambda row: int(row.get("placement") or 99))
-            matches.append(
-                {
-                    "id": match_id,
-                    "queueId": ((match or {}).get("info") or {}).get("queue_id"),
-                    "queueLabel": queue_label(((match or {}).get("info") or {}).get("queue_id")),
-                    "gameDatetime": ((match or {}).get("info") or {}).get("game_datetime"),
-                    "gameLength": ((match or {}).get("info") or {}).get("game_length"),
-                    "setNumber": ((match or {}).get("info") or {}).get("tft_set_number"),
-                    "gameVersion": ((match or {}).get("info") or {}).get("game_version"),
-                    "patch": patch_from_game_version(((match or {}).get("info") or {}).get("game_version")),
-                    "playerA": summary_a,
-                    "playerB": summary_b,
-                    "sameTeam": same_team,
-                    "lobby": lobby,
-                }
-            )
+            with span("fetch_match", match_id):
+                raw_matches.append((match_id, await riot_request_cached(riot_routing_url(region.strip().lower(), f"/tft/match/v1/matches/{match_id}"), CACHE_TTL["match"])))
+        matches = await summarize_shared_matches(raw_matches, str((player_a["account"] or {}).get("puuid") or ""), str((player_b["account"] or {}).get("puuid") or ""), includeLobby)
 
         duo_id = stable_duo_id(str((player_a.get("account") or {}).get("puuid") or ""), str((player_b.get("account") or {}).get("puuid") or ""))
         record = analytics_store.setdefault("duos", {}).setdefault(duo_id, {"duoId": duo_id, "matchesById": {}, "events": [], "journals": []})
+        stored = record.setdefault("matchesById", {})
         for match in matches:
-            record.setdefault("matchesById", {})[str(match.get("id"))] = match
-        if len(record.get("matchesById", {})) > 600:
-            keep = sorted(record["matchesById"].keys(), key=lambda mid: int((record["matchesById"].get(mid) or {}).get("gameDatetime") or 0), reverse=True)[:600]
-            record["matchesById"] = {mid: record["matchesById"][mid] for mid in keep}
+            # A lobby-less sync refreshes a stored summary but keeps the lobby an earlier full sync recorded.
+            previous = stored.get(str(match.get("id")))
+            stored[str(match.get("id"))] = match if includeLobby or not previous or "lobby" not in previous else {**match, "lobby": previous["lobby"]}
+        if len(record.get("matchesById", {})) > HOT_MATCH_LIMIT:
+            ordered = sorted(record["matchesById"].keys(), key=lambda mid: int((record["matchesById"].get(mid) or {}).get("gameDatetime") or 0), reverse=True)
+            archive_rows(duo_id, "matches").extend(record["matchesById"][mid] for mid in ordered[HOT_MATCH_LIMIT:])
+            record["matchesById"] = {mid: record["matchesById"][mid] for mid in ordered[:HOT_MATCH_LIMIT]}
+        (await duo_daily_rollup(duo_id, record)).add_matches(matches)
+        openers = await duo_opener_index(duo_id, record)
+        openers.add_matches(matches)
+        analysis_memo.invalidate(duo_id)
         await save_stores()
 
-        events = as_list(record.get("events"))
-        analysis_v2 = build_duo_scorecard(matches, events)
-        playbook = build_personalized_playbook(matches, events)
-        highlights = build_duo_highlights(matches, events)
+        events = duo_event_log(record)
+        analysis_v2 = run_analytics(build_duo_scorecard, matches, events, duo_board_timing(record))
+        playbook = run_analytics(build_personalized_playbook, matches, events, openers.rank())
+        highlights = run_analytics(build_duo_highlights, matches, events)
         latest = matches[0] if matches else None
 
         payload = {
@@ -457,14 +782,16 @@ async def duo_history(
             "deltaHours": max(1, min(168, int(deltaHours))),
             "matches": matches,
             "analysis": {"kpis": {"gamesTogether": len(matches), "sameTeamGames": len([m for m in matches if m.get("sameTeam")])}},
-            "rankContext": {"region": region.strip().lower(), "platform": platform.strip().lower(), "snapshotAt": datetime.now(timezone.utc).isoformat(), "queuePopulation": None, "ladderMeta": {"topTraits": [], "topChampions": [], "sampledTopPlayers": 0}},
+            "rankContext": {"region": region.strip().lower(), "platform": platform.strip().lower(), "snapshotAt": datetime.now(timezone.utc).isoformat(), "queuePopulation": None, "ladderMeta": ladder_sampler.snapshot(platform.strip().lower(), (latest or {}).get("patch"))},
             "analysisV2": analysis_v2,
             "playbook": playbook,
             "highlights": highlights,
         }
         if DEBUG_TFT_PAYLOAD:
-            payload["debug"] = {"sharedMatchCount": len(shared_ids)}
-        return payload
+            profile = current_profile.get()
+            payload["debug"] = {"sharedMatchCount": len(shared_ids), "profileId": profile.id if profile else None, "spanTotals": profile.totals() if profile else []}
+        # Summaries are plain JSON already; JSONResponse skips FastAPI's per-element encoding of every match and lobby board.
+        return JSONResponse(payload)
     except Exception as error:
         status = int(getattr(error, "status", 500))
         retry_after = int(getattr(error, "retry_after", "0") or "0")
@@ -474,79 +801,222 @@ async def duo_history(
 @app.post("/api/duo/events/batch")
 async def duo_events_batch(request: Request):
     body = await request.json()
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "Request body must be a JSON object."}, status_code=400)
     await ensure_stores_loaded()
-    duo_id = str((body or {}).get("duoId") or "").strip()
+    duo_id = str(body.get("duoId") or "").strip()
     if not duo_id:
         return JSONResponse({"error": "duoId is required."}, status_code=400)
     if duo_id not in analytics_store.get("duos", {}):
         return JSONResponse({"error": "Unknown duoId. Analyze duo history first to initialize duo record."}, status_code=404)
-    events = as_list((body or {}).get("events"))
+    events = as_list(body.get("events"))
     if not events:
         return JSONResponse({"error": "events array is required."}, status_code=400)
-    record = analytics_store["duos"][duo_id]
-    normalized = []
+    event_log = duo_event_log(analytics_store["duos"][duo_id])
+    rollup = await duo_daily_rollup(duo_id, analytics_store["duos"][duo_id])
+    now_ms = int(time.time() * 1000)
+    valid = 0
+    inserted = 0
     for event in events:
-        etype = str((event or {}).get("type") or "").strip()
+        event = event if isinstance(event, dict) else {}
+        etype = str(event.get("type") or "").strip()
         if not etype:
             continue
-        normalized.append({"id": f"{int(time.time() * 1000)}-{random.randint(100000, 999999)}", "type": etype, "matchId": (event or {}).get("matchId") or (body or {}).get("matchId"), "payload": (event or {}).get("payload") if isinstance((event or {}).get("payload"), dict) else {}, "createdAt": int(time.time() * 1000)})
-    if not normalized:
+        valid += 1
+        match_id = event.get("matchId") or body.get("matchId")
+        normalized = {"type": etype, "matchId": match_id, "payload": event.get("payload") if isinstance(event.get("payload"), dict) else {}, "createdAt": now_ms}
+        for field_name in EVENT_TOP_LEVEL_FIELDS:
+            if event.get(field_name) is not None:
+                normalized[field_name] = event[field_name]
+        key = idempotency_key(duo_id, match_id, event)
+        if key:
+            normalized["idempotencyKey"] = key
+        stored = event_log.append(normalized)
+        if stored is not None:
+            stored["id"] = f"{now_ms}-{stored['seq']}"
+            rollup.add_event(stored)
+            inserted += 1
+    if not valid:
         return JSONResponse({"error": "No valid events to insert."}, status_code=400)
-    record.setdefault("events", []).extend(normalized)
-    record["events"] = record["events"][-6000:]
-    await save_stores()
-    return {"ok": True, "inserted": len(normalized), "totalEvents": len(record["events"])}
+    if inserted:
+        if duo_id in pending_archive:
+            await archive_pending(duo_id)
+        analysis_memo.invalidate(duo_id)
+        request_save()
+    return {"ok": True, "inserted": inserted, "duplicates": valid - inserted, "totalEvents": len(event_log)}
+
+
+@app.post("/api/duo/rounds/batch")
+async def duo_rounds_batch(request: Request):
+    body = await request.json()
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "Request body must be a JSON object."}, status_code=400)
+    await ensure_stores_loaded()
+    duo_id = str(body.get("duoId") or "").strip()
+    if not duo_id:
+        return JSONResponse({"error": "duoId is required."}, status_code=400)
+    if duo_id not in analytics_store.get("duos", {}):
+        return JSONResponse({"error": "Unknown duoId. Analyze duo history first to initialize duo record."}, status_code=404)
+    snapshots = as_list(body.get("snapshots"))
+    if not snapshots:
+        return JSONResponse({"error": "snapshots array is required."}, status_code=400)
+    by_match: dict[str, list[Any]] = {}
+    for snapshot in snapshots:
+        match_id = str((snapshot.get("matchId") if isinstance(snapshot, dict) else None) or body.get("matchId") or "").strip()
+        by_match.setdefault(match_id, []).append(snapshot)
+    rounds = duo_round_store(analytics_store["duos"][duo_id])
+    # Snapshots without a matchId anywhere cannot be placed in a series.
+    rejected = len(by_match.pop("", []))
+    accepted = 0
+    for match_id, rows in by_match.items():
+        added, skipped = rounds.ingest(match_id, rows)
+        accepted += added
+        rejected += skipped
+    if not accepted:
+        return JSONResponse({"error": "No valid snapshots to store.", "rejected": rejected}, status_code=400)
+    analysis_memo.invalidate(duo_id)
+    request_save()
+    return {"ok": True, "accepted": accepted, "rejected": rejected, "matches": len(by_match), "totalMatches": len(rounds.matches)}
+
+
+@app.get("/api/duo/rounds")
+async def duo_rounds(duoId: str = "", matchId: str = ""):
+    duo_id = duoId.strip()
+    if not duo_id or not matchId.strip():
+        return JSONResponse({"error": "duoId and matchId are required."}, status_code=400)
+    await ensure_stores_loaded()
+    record = (analytics_store.get("duos") or {}).get(duo_id)
+    rounds = duo_round_store(record).matches.get(matchId.strip()) if record else None
+    if rounds is None:
+        return JSONResponse({"error": "No round snapshots for this match."}, status_code=404)
+    spike_a, spike_b = rounds.power_spikes()
+    return {"duoId": duo_id, "matchId": matchId.strip(), "createdAt": rounds.created_at, "powerSpike": {"A": slot_label(spike_a) if spike_a is not None else None, "B": slot_label(spike_b) if spike_b is not None else None}, "series": rounds.series()}
 
 
 @app.get("/api/duo/scorecard")
 async def duo_scorecard(duoId: str = "", windowDays: int = 30):
-    await ensure_stores_loaded()
     duo_id = duoId.strip()
     if not duo_id:
         return JSONResponse({"error": "duoId is required."}, status_code=400)
+    memo = analysis_memo.get("scorecard", duo_id, windowDays)
+    if memo is not None:
+        return memo
+    await ensure_stores_loaded()
     record = (analytics_store.get("duos") or {}).get(duo_id)
     if not record:
         return JSONResponse({"error": "duoId not found."}, status_code=404)
-    cutoff = int(time.time() * 1000) - max(1, min(365, int(windowDays))) * 24 * 60 * 60 * 1000
-    matches = [m for m in (record.get("matchesById") or {}).values() if int((m or {}).get("gameDatetime") or 0) >= cutoff]
-    events = as_list(record.get("events"))
-    return {"duoId": duo_id, "windowDays": windowDays, "matchCount": len(matches), "eventCount": len(events), "scorecard": build_duo_scorecard(matches, events), "playbook": build_personalized_playbook(matches, events), "highlights": build_duo_highlights(matches, events)}
+    rollup = await duo_daily_rollup(duo_id, record)
+    since_day = window_start_day(windowDays)
+    match_totals, event_totals = rollup.totals(since_day)
+    result = {"duoId": duo_id, "windowDays": windowDays, "windowStartDay": since_day, "rollupDays": len(rollup.window_rows(since_day)), "matchCount": match_totals["games"], "eventCount": event_totals["events"], "archive": cold_archive.stats(duo_id), "scorecard": run_analytics(scorecard_from_counters, match_totals, event_totals, duo_board_timing(record, since_day)), "playbook": window_playbook(await duo_opener_index(duo_id, record), match_totals, event_totals), "highlights": window_highlights(match_totals, event_totals)}
+    analysis_memo.put("scorecard", duo_id, windowDays, result)
+    return result
 
 
-@app.post("/api/coach/llm-brief")
-async def coach_llm_brief(request: Request):
-    payload = await request.json()
-    payload = payload if isinstance(payload, dict) else {}
-    deterministic_findings = {
-        "sampleSize": len(as_list(payload.get("matches"))),
-        "topImprovementAreas": ["Prioritize one stable board + one econ board each game."],
-        "winConditions": ["Convert early board strength into faster level spikes and staggered roll timing."],
-        "fiveGamePlan": ["Track one event tag every game to improve signal quality."],
-        "championBuilds": [],
-        "confidenceBand": "low",
-    }
-    if not OPENAI_API_KEY:
-        return {"ok": True, "fallback": True, "reason": "OPENAI_API_KEY missing", "model": OPENAI_MODEL, "webSearchUsed": False, "generatedAt": int(time.time() * 1000), "deterministicFindings": deterministic_findings, "brief": fallback_ai_coaching(payload)}
-
+def responses_request(prompt: str, stream: bool = False) -> dict[str, Any]:
     body = {
         "model": OPENAI_MODEL,
         "input": [
-            {"role": "system", "content": [{"type": "input_text", "text": "Return strict JSON coaching output for TFT Double Up."}]},
-            {"role": "user", "content": [{"type": "input_text", "text": json.dumps(payload)}]},
+            {"role": "system", "content": [{"type": "input_text", "text": SYSTEM_PROMPT}]},
+            {"role": "user", "content": [{"type": "input_text", "text": prompt}]},
         ],
         "text": {"format": {"type": "json_object"}},
     }
+    if stream:
+        body["stream"] = True
+    return {"url": f"{OPENAI_API_BASE_URL}/responses", "headers": {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}, "content": json.dumps(body), "timeout": OPENAI_TIMEOUT_MS / 1000.0}
+
+
+def coach_brief_result(features: dict[str, Any], prompt: str, findings: dict[str, Any], brief: dict[str, Any] | None, reason: str | None) -> dict[str, Any]:
+    base = {"ok": True, "model": OPENAI_MODEL, "webSearchUsed": False, "generatedAt": int(time.time() * 1000), "deterministicFindings": findings, "promptTokens": estimate_tokens(prompt)}
+    if brief is None:
+        return {**base, "fallback": True, "reason": reason or "Model returned no JSON object.", "brief": fallback_ai_coaching(features, findings)}
+    return {**base, "fallback": False, "reason": None, "brief": brief}
+
+
+async def generate_coach_brief(features: dict[str, Any], prompt: str) -> tuple[dict[str, Any], bool]:
+    # Returns (response, cacheable). Only live model output is cached; fallbacks are recomputed so a later call can recover.
+    findings = build_deterministic_findings(features)
+    if not OPENAI_API_KEY:
+        return coach_brief_result(features, prompt, findings, None, "OPENAI_API_KEY missing"), False
     try:
-        response = await http_client.post("https://api.openai.com/v1/responses", headers={"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}, content=json.dumps(body), timeout=OPENAI_TIMEOUT_MS / 1000.0)
+        with span("openai_brief"):
+            response = await upstream_pools.client("openai").post(**responses_request(prompt))
         response.raise_for_status()
-        parsed = response.json()
-        output_text = str(parsed.get("output_text") or "{}").strip() or "{}"
-        brief = json.loads(output_text)
-        if not isinstance(brief, dict):
-            brief = fallback_ai_coaching(payload)
-        return {"ok": True, "fallback": False, "reason": None, "model": OPENAI_MODEL, "webSearchUsed": False, "generatedAt": int(time.time() * 1000), "deterministicFindings": deterministic_findings, "brief": brief}
+        brief = parse_brief_text(str(response.json().get("output_text") or ""))
+        return coach_brief_result(features, prompt, findings, brief, None), brief is not None
+    except Exception as error:
+        return coach_brief_result(features, prompt, findings, None, str(error)), False
+
+
+async def stream_coach_brief(features: dict[str, Any], prompt: str, key: str):
+    # SSE sequence: findings (deterministic digest + provisional local brief) immediately, delta per model text chunk,
+    # then brief with the validated result. A client disconnect cancels this generator, which closes the upstream stream.
+    findings = build_deterministic_findings(features)
+    yield sse_event("findings", {"deterministicFindings": findings, "provisionalBrief": fallback_ai_coaching(features, findings), "promptHash": key[:16], "promptTokens": estimate_tokens(prompt)})
+    cached = brief_cache.get(key)
+    inflight = brief_cache.inflight.get(key)
+    if cached is not None or inflight is not None or not OPENAI_API_KEY:
+        result, cache = await brief_cache.get_or_create(key, lambda: generate_coach_brief(features, prompt))
+        COACH_BRIEF_REQUESTS.inc(result=cache)
+        yield sse_event("brief", {**result, "promptHash": key[:16], "serverCache": cache})
+        return
+    parts: list[str] = []
+    reason = None
+    try:
+        with span("openai_brief_stream"):
+            request_args = responses_request(prompt, stream=True)
+            async with upstream_pools.client("openai").stream("POST", request_args.pop("url"), **request_args) as response:
+                response.raise_for_status()
+                async for event, data in iter_sse(response.aiter_lines()):
+                    message = json.loads(data) if data.startswith("{") else {}
+                    kind = str(message.get("type") or event)
+                    if kind == "response.output_text.delta":
+                        delta = str(message.get("delta") or "")
+                        parts.append(delta)
+                        yield sse_event("delta", {"text": delta})
+                    elif kind in ("response.failed", "response.incomplete", "error"):
+                        raise RuntimeError(str((message.get("response") or {}).get("error") or message.get("message") or kind))
+                    elif kind == "response.completed":
+                        break
+    except (asyncio.CancelledError, GeneratorExit):
+        COACH_BRIEF_REQUESTS.inc(result="cancelled")
+        raise
     except Exception as error:
-        return {"ok": True, "fallback": True, "reason": str(error), "model": OPENAI_MODEL, "webSearchUsed": False, "generatedAt": int(time.time() * 1000), "deterministicFindings": deterministic_findings, "brief": fallback_ai_coaching(payload)}
+        reason = str(error)
+    brief = None if reason else parse_brief_text("".join(parts))
+    result = coach_brief_result(features, prompt, findings, brief, reason)
+    if brief is not None:
+        brief_cache.put(key, result)
+    COACH_BRIEF_REQUESTS.inc(result="stream")
+    yield sse_event("brief", {**result, "promptHash": key[:16], "serverCache": "miss"})
+
+
+async def coach_brief_input(request: Request) -> tuple[dict[str, Any], str, str]:
+    try:
+        payload = await request.json()
+    except Exception:
+        payload = {}
+    payload = payload if isinstance(payload, dict) else {}
+    with span("brief_features"):
+        features = build_brief_features(payload, COACH_PROMPT_TOKEN_BUDGET)
+        prompt = canonical_json(features)
+    COACH_PROMPT_TOKENS.observe(estimate_tokens(prompt))
+    return features, prompt, content_hash({"model": OPENAI_MODEL, "prompt": prompt})
+
+
+@app.post("/api/coach/llm-brief")
+async def coach_llm_brief(request: Request):
+    features, prompt, key = await coach_brief_input(request)
+    result, cache = await brief_cache.get_or_create(key, lambda: generate_coach_brief(features, prompt))
+    COACH_BRIEF_REQUESTS.inc(result=cache)
+    return {**result, "promptHash": key[:16], "serverCache": cache}
+
+
+@app.post("/api/coach/llm-brief/stream")
+async def coach_llm_brief_stream(request: Request):
+    features, prompt, key = await coach_brief_input(request)
+    return StreamingResponse(stream_coach_brief(features, prompt, key), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.exception_handler(404)
@@ -579,37 +1049,69 @@ async def duo_journal(request: Request):
 
 
 @app.get("/api/duo/playbook")
-async def duo_playbook(duoId: str = "", windowDays: int = 30):
-    await ensure_stores_loaded()
+async def duo_playbook(duoId: str = "", windowDays: int = 30, patch: str = "", trait: str = ""):
     duo_id = duoId.strip()
     if not duo_id:
         return JSONResponse({"error": "duoId is required."}, status_code=400)
+    memo_kind = f"playbook:{patch.strip()}:{trait.strip()}" if patch.strip() or trait.strip() else "playbook"
+    memo = analysis_memo.get(memo_kind, duo_id, windowDays)
+    if memo is not None:
+        return memo
+    await ensure_stores_loaded()
     record = (analytics_store.get("duos") or {}).get(duo_id)
     if not record:
         return JSONResponse({"error": "duoId not found."}, status_code=404)
-    cutoff = int(time.time() * 1000) - max(1, min(365, int(windowDays))) * 24 * 60 * 60 * 1000
-    matches = [m for m in (record.get("matchesById") or {}).values() if int((m or {}).get("gameDatetime") or 0) >= cutoff]
-    events = as_list(record.get("events"))
-    playbook = build_personalized_playbook(matches, events)
-    record["playbookSnapshot"] = playbook
-    await save_stores()
-    return {"duoId": duo_id, "windowDays": windowDays, "playbook": playbook}
+    since_day = window_start_day(windowDays)
+    match_totals, event_totals = (await duo_daily_rollup(duo_id, record)).totals(since_day)
+    openers = await duo_opener_index(duo_id, record)
+    playbook = window_playbook(openers, match_totals, event_totals, patch.strip() or None, trait.strip() or None)
+    if memo_kind == "playbook":
+        record["playbookSnapshot"] = playbook
+        await save_stores()
+    result = {"duoId": duo_id, "windowDays": windowDays, "openerIndex": openers.stats(), "playbook": playbook}
+    analysis_memo.put(memo_kind, duo_id, windowDays, result)
+    return result
 
 
 @app.get("/api/duo/highlights")
 async def duo_highlights(duoId: str = "", windowDays: int = 30):
+    duo_id = duoId.strip()
+    if not duo_id:
+        return JSONResponse({"error": "duoId is required."}, status_code=400)
+    memo = analysis_memo.get("highlights", duo_id, windowDays)
+    if memo is not None:
+        return memo
     await ensure_stores_loaded()
+    record = (analytics_store.get("duos") or {}).get(duo_id)
+    if not record:
+        return JSONResponse({"error": "duoId not found."}, status_code=404)
+    since_day = window_start_day(windowDays)
+    match_totals, event_totals = (await duo_daily_rollup(duo_id, record)).totals(since_day)
+    result = {"duoId": duo_id, "windowDays": windowDays, "highlights": window_highlights(match_totals, event_totals)}
+    analysis_memo.put("highlights", duo_id, windowDays, result)
+    return result
+
+
+@app.get("/api/duo/patch-diff")
+async def duo_patch_diff(duoId: str = "", patch: str = ""):
     duo_id = duoId.strip()
     if not duo_id:
         return JSONResponse({"error": "duoId is required."}, status_code=400)
+    # The memo key's window slot is unused here; any data change for the duo drops it like the other analyses.
+    memo = analysis_memo.get(f"patch-diff:{patch.strip()}", duo_id, 0)
+    if memo is not None:
+        return memo
+    await ensure_stores_loaded()
     record = (analytics_store.get("duos") or {}).get(duo_id)
     if not record:
         return JSONResponse({"error": "duoId not found."}, status_code=404)
-    cutoff = int(time.time() * 1000) - max(1, min(365, int(windowDays))) * 24 * 60 * 60 * 1000
-    matches = [m for m in (record.get("matchesById") or {}).values() if int((m or {}).get("gameDatetime") or 0) >= cutoff]
-    events = as_list(record.get("events"))
-    return {"duoId": duo_id, "windowDays": windowDays, "highlights": build_duo_highlights(matches, events)}
+    rollup = await duo_daily_rollup(duo_id, record)
+    result = {"duoId": duo_id, "patchDiff": run_analytics(build_patch_diff, rollup.patch_totals(), patch.strip() or None)}
+    analysis_memo.put(f"patch-diff:{patch.strip()}", duo_id, 0, result)
+    return result
+
 
+boot_clock.mark("imported")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import Any
+
+from daily_rollup import patch_from_game_version
+from duo_analytics import as_list, top_traits
+from profiling import span
+
+QUEUE_LABELS = {1090: "Ranked", 1100: "Normal", 1110: "Hyper Roll", 1130: "Double Up", 1160: "Ranked", 6110: "Revival"}
+
+
+def queue_label(queue_id: Any) -> str:
+    try:
+        parsed = int(queue_id)
+    except Exception:
+        parsed = 0
+    return QUEUE_LABELS.get(parsed, f"Queue {queue_id or '?'}")
+
+
+def summarize_traits(traits: list[dict[str, Any]] | None, table: dict[tuple[Any, ...], dict[str, Any]] | None = None) -> list[dict[str, Any]]:
+    # `table` is the batch's shared row table: a trait at a given tier repeats across most boards of a batch, so each
+    # distinct row is projected once and shared (rows are never mutated after summarization).
+    if table is None:
+        out = [{"name": row.get("name"), "numUnits": row.get("num_units"), "style": row.get("style"), "tierCurrent": row.get("tier_current")} for row in as_list(traits)]
+        out.sort(key=lambda row: (-(int(row["style"] or 0)), -(int(row["numUnits"] or 0))))
+        return out
+    out = []
+    for row in as_list(traits):
+        key = ("trait", row.get("name"), row.get("num_units"), row.get("style"), row.get("tier_current"))
+        trait = table.get(key)
+        if trait is None:
+            trait = table[key] = {"name": key[1], "numUnits": key[2], "style": key[3], "tierCurrent": key[4]}
+        out.append(trait)
+    out.sort(key=lambda row: (-(int(row["style"] or 0)), -(int(row["numUnits"] or 0))))
+    return out
+
+
+def summarize_units(units: list[dict[str, Any]] | None, table: dict[tuple[Any, ...], dict[str, Any]] | None = None) -> list[dict[str, Any]]:
+    if table is None:
+        return [{"characterId": row.get("character_id"), "name": row.get("name"), "tier": row.get("tier"), "rarity": row.get("rarity"), "itemNames": as_list(row.get("itemNames")), "items": as_list(row.get("itemNames"))} for row in as_list(units)]
+    out = []
+    for row in as_list(units):
+        items = as_list(row.get("itemNames"))
+        key = ("unit", row.get("character_id"), row.get("name"), row.get("tier"), row.get("rarity"), *items)
+        unit = table.get(key)
+        if unit is None:
+            unit = table[key] = {"characterId": key[1], "name": key[2], "tier": key[3], "rarity": key[4], "itemNames": items, "items": items}
+        out.append(unit)
+    return out
+
+
+def summarize_participant(participant: dict[str, Any], table: dict[tuple[Any, ...], dict[str, Any]] | None = None) -> dict[str, Any]:
+    companion = participant.get("companion") or {}
+    return {
+        "puuid": participant.get("puuid"),
+        "riotIdGameName": participant.get("riotIdGameName"),
+        "riotIdTagline": participant.get("riotIdTagline"),
+        "placement": participant.get("placement"),
+        "win": participant.get("win"),
+        "level": participant.get("level"),
+        "lastRound": participant.get("last_round"),
+        "goldLeft": participant.get("gold_left"),
+        "playersEliminated": participant.get("players_eliminated"),
+        "totalDamageToPlayers": participant.get("total_damage_to_players"),
+        "timeEliminated": participant.get("time_eliminated"),
+        "partnerGroupId": participant.get("partner_group_id"),
+        "hasAugmentsField": "augments" in participant,
+        "augments": participant.get("augments") or [],
+        "companion": {
+            "contentId": companion.get("content_ID"),
+            "itemId": companion.get("item_ID"),
+            "skinId": companion.get("skin_ID"),
+            "species": companion.get("species"),
+            "raw": companion,
+        },
+        "arena": {"arenaId": participant.get("arena_id"), "skinId": participant.get("arena_skin_id"), "available": participant.get("arena_id") is not None},
+        "traits": summarize_traits(participant.get("traits"), table),
+        "units": summarize_units(participant.get("units"), table),
+    }
+
+
+def summarize_duo_match(match_id: str, match: dict[str, Any] | None, puuid_a: str, puuid_b: str, lobby: bool = True, table: dict[tuple[Any, ...], dict[str, Any]] | None = None) -> dict[str, Any] | None:
+    info = (match or {}).get("info") or {}
+    participants = as_list(info.get("participants"))
+    # One pass builds puuid -> seat; the first seat wins, as a linear scan would.
+    seats: dict[Any, int] = {}
+    for seat, entry in enumerate(participants):
+        seats.setdefault(entry.get("puuid"), seat)
+    seat_a = seats.get(puuid_a)
+    seat_b = seats.get(puuid_b)
+    if seat_a is None or seat_b is None:
+        return None
+    summary_a = summarize_participant(participants[seat_a], table)
+    summary_b = summary_a if seat_b == seat_a else summarize_participant(participants[seat_b], table)
+    same_team = bool(summary_a.get("partnerGroupId") and summary_b.get("partnerGroupId") and summary_a.get("partnerGroupId") == summary_b.get("partnerGroupId"))
+    summary = {
+        "id": match_id,
+        "queueId": info.get("queue_id"),
+        "queueLabel": queue_label(info.get("queue_id")),
+        "gameDatetime": info.get("game_datetime"),
+        "gameLength": info.get("game_length"),
+        "setNumber": info.get("tft_set_number"),
+        "gameVersion": info.get("game_version"),
+        "patch": patch_from_game_version(info.get("game_version")),
+        "playerA": summary_a,
+        "playerB": summary_b,
+        "sameTeam": same_team,
+        # Each partner's top-two trait set, precomputed once for the opener index.
+        "openerTraits": [sorted(top_traits(summary_a, 2)), sorted(top_traits(summary_b, 2))],
+    }
+    if lobby:
+        # The duo's own seats reuse their summaries; only the other six boards are projected.
+        rows = [summary_a if seat == seat_a else summary_b if seat == seat_b else summarize_participant(entry, table) for seat, entry in enumerate(participants)]
+        rows.sort(key=lambda row: int(row.get("placement") or 99))
+        summary["lobby"] = rows
+    return summary
+
+
+def summarize_matches(matches: list[tuple[str, dict[str, Any] | None]], puuid_a: str, puuid_b: str, lobby: bool = True) -> list[dict[str, Any] | None]:
+    # Batch entry point (also the process-pool task): one shared trait/unit row table for every board in the batch.
+    # Returns one summary per input, None where either player is missing. Each match's participants get a
+    # summarize_participant span when run inline in a profiled request (worker processes have no profile).
+    table: dict[tuple[Any, ...], dict[str, Any]] = {}
+    out = []
+    for match_id, match in matches:
+        with span("summarize_participant", match_id):
+            out.append(summarize_duo_match(match_id, match, puuid_a, puuid_b, lobby, table))
+    return out
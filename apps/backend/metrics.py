@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+if TYPE_CHECKING:
+    import httpx
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: tuple[str, ...], values: tuple[Any, ...], extra: str = "") -> str:
+    parts = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple[Any, ...], Any] = {}
+
+    def key(self, labels: dict[str, Any]) -> tuple[Any, ...]:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        for values, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labelnames, values)} {format_value(value)}"
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.values[self.key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self.key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = [[0] * len(self.buckets), 0, 0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][index] += 1
+                break
+        state[1] += 1
+        state[2] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        for values, (counts, total, value_sum) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + format_value(bound) + '"'
+                yield f"{self.name}_bucket{format_labels(self.labelnames, values, le)} {cumulative}"
+            inf = 'le="+Inf"'
+            yield f"{self.name}_bucket{format_labels(self.labelnames, values, inf)} {total}"
+            yield f"{self.name}_count{format_labels(self.labelnames, values)} {total}"
+            yield f"{self.name}_sum{format_labels(self.labelnames, values)} {format_value(value_sum)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], None]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        metric = Gauge(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        # Collectors refresh scrape-time gauges (cache sizes, limiter state) right before rendering.
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines: list[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram("http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status"))
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge("http_requests_in_flight", "Requests currently being handled.", ("method",))
+UPSTREAM_REQUEST_DURATION = registry.histogram("upstream_request_duration_seconds", "Outbound request latency to response headers.", ("upstream", "host", "status"))
+UPSTREAM_POOL_WAIT = registry.histogram("upstream_pool_wait_seconds", "Time a request waited for a pooled upstream connection.", ("pool",), buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+UPSTREAM_POOL_IN_FLIGHT = registry.gauge("upstream_pool_requests_in_flight", "Outbound requests currently holding or waiting for a pool connection.", ("pool",))
+UPSTREAM_POOL_CONNECTIONS = registry.gauge("upstream_pool_connections", "Open upstream connections by pool and state.", ("pool", "state"))
+UPSTREAM_CONNECTIONS_OPENED = registry.counter("upstream_connections_opened_total", "New upstream TCP connections by pool.", ("pool",))
+RIOT_CACHE_REQUESTS = registry.counter("riot_cache_requests_total", "riot_cache lookups by result.", ("result",))
+RIOT_CACHE_ENTRIES = registry.gauge("riot_cache_entries", "Entries currently held in riot_cache.")
+STORE_OPERATION_DURATION = registry.histogram("store_operation_duration_seconds", "Persisted store load/save time.", ("operation",))
+RATE_LIMIT_REJECTED = registry.counter("rate_limit_rejected_total", "Requests rejected by the rate limiter.", ("route",))
+RATE_LIMIT_BUCKETS = registry.gauge("rate_limit_buckets", "Client buckets tracked by the rate limiter.")
+ANALYTICS_COMPUTE_DURATION = registry.histogram("analytics_compute_duration_seconds", "duo_analytics build_* compute time.", ("function",))
+COLD_START_SECONDS = registry.gauge("cold_start_seconds", "Seconds from process start to each boot milestone.", ("phase",))
+COACH_BRIEF_REQUESTS = registry.counter("coach_brief_requests_total", "Coach brief requests by cache result.", ("result",))
+LADDER_META_MATCHES = registry.counter("ladder_meta_matches_total", "Ladder matches folded into the meta sketches.", ("platform",))
+LADDER_META_REQUESTS = registry.counter("ladder_meta_requests_total", "Riot requests made by the ladder meta sampler by result.", ("result",))
+COACH_PROMPT_TOKENS = registry.histogram("coach_prompt_tokens", "Estimated prompt tokens sent for coach briefs.", buckets=(250, 500, 1000, 2000, 4000, 8000, 16000))
+
+
+def upstream_name(host: str) -> str:
+    if host.endswith("api.riotgames.com"):
+        return "riot"
+    if host.endswith("communitydragon.org"):
+        return "cdragon"
+    if host.endswith("openai.com"):
+        return "openai"
+    if host.endswith("render.com"):
+        return "render"
+    return "other"
+
+
+class InstrumentedTransport:
+    # Duck-typed httpx transport, so importing this module does not pull in httpx before the first upstream call.
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None) -> None:
+        if transport is None:
+            import httpx
+
+            transport = httpx.AsyncHTTPTransport()
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - started, upstream=upstream_name(host), host=host, status=status)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    async def __aenter__(self) -> InstrumentedTransport:
+        return self
+
+    async def __aexit__(self, *_exc: Any) -> None:
+        await self.aclose()
+
+
+def timed_analytics(fn: Callable[..., Any], *args: Any) -> Any:
+    with ANALYTICS_COMPUTE_DURATION.time(function=fn.__name__):
+        return fn(*args)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+            # FastAPI writes the matched APIRoute into the scope; use its template to keep label cardinality bounded.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=method, route=route, status=status)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any
+
+from metrics import RATE_LIMIT_REJECTED
+
+CORS_ALLOW_METHODS = b"GET,POST,OPTIONS"
+CORS_ALLOW_HEADERS = b"Content-Type, Authorization"
+
+
+def parse_route_limits(raw: str, default_window_ms: int) -> list[tuple[str, int, int]]:
+    # Format: "/api/tft/duo-history=20,/api/tft/icon-manifest=300:60000" (prefix=max[:windowMs]).
+    rules: list[tuple[str, int, int]] = []
+    for token in [part.strip() for part in str(raw or "").split(",") if part.strip()]:
+        prefix, _, limit = token.partition("=")
+        max_text, _, window_text = limit.partition(":")
+        try:
+            max_requests = max(1, int(max_text))
+            window_ms = max(1000, int(window_text)) if window_text.strip() else default_window_ms
+        except ValueError:
+            continue
+        if prefix.strip().startswith("/"):
+            rules.append((prefix.strip(), max_requests, window_ms))
+    rules.sort(key=lambda rule: len(rule[0]), reverse=True)
+    return rules
+
+
+class SlidingWindowLimiter:
+    # Sliding-window counter: the previous fixed window is weighted by how much of it still
+    # overlaps the trailing window. Buckets live in LRU order, so idle ones are evicted from the front.
+    def __init__(self, max_keys: int = 50000, sweep_interval_ms: int = 60000) -> None:
+        self.buckets: OrderedDict[tuple[str, str], list[int]] = OrderedDict()
+        self.max_keys = max(1, int(max_keys))
+        self.sweep_interval_ms = max(1000, int(sweep_interval_ms))
+        self.last_sweep_ms = 0
+
+    def hit(self, key: tuple[str, str], max_requests: int, window_ms: int, now_ms: int | None = None) -> int:
+        # Returns 0 when allowed, otherwise the suggested Retry-After in seconds.
+        now_ms = int(time.time() * 1000) if now_ms is None else int(now_ms)
+        if now_ms - self.last_sweep_ms >= self.sweep_interval_ms:
+            self.sweep(now_ms)
+        window_start = now_ms - now_ms % window_ms
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = [window_start, 0, 0, now_ms, window_ms]
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            if bucket[0] != window_start:
+                bucket[2] = bucket[1] if window_start - bucket[0] == window_ms else 0
+                bucket[0] = window_start
+                bucket[1] = 0
+        bucket[3] = now_ms
+        overlap = 1.0 - (now_ms - window_start) / window_ms
+        estimated = bucket[2] * overlap + bucket[1]
+        if estimated >= max_requests:
+            RATE_LIMIT_REJECTED.inc(route=key[1])
+            if bucket[1] >= max_requests or bucket[2] <= 0:
+                wait_ms = window_start + window_ms - now_ms
+            else:
+                # Time until enough of the previous window slides out to admit one more request.
+                wait_ms = min(window_start + window_ms - now_ms, int((estimated - max_requests) / bucket[2] * window_ms) + 1)
+            return max(1, -(-wait_ms // 1000))
+        bucket[1] += 1
+        return 0
+
+    def sweep(self, now_ms: int | None = None) -> int:
+        now_ms = int(time.time() * 1000) if now_ms is None else int(now_ms)
+        self.last_sweep_ms = now_ms
+        evicted = 0
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if now_ms - bucket[3] < 2 * bucket[4]:
+                break
+            del self.buckets[key]
+            evicted += 1
+        return evicted
+
+
+@lru_cache(maxsize=128)
+def cors_headers(origin: str) -> tuple[tuple[bytes, bytes], ...]:
+    headers: list[tuple[bytes, bytes]] = []
+    if origin:
+        headers.append((b"access-control-allow-origin", origin.encode("latin-1")))
+        headers.append((b"vary", b"Origin"))
+    headers.append((b"access-control-allow-methods", CORS_ALLOW_METHODS))
+    headers.append((b"access-control-allow-headers", CORS_ALLOW_HEADERS))
+    return tuple(headers)
+
+
+def client_ip(scope: dict[str, Any], headers: dict[bytes, bytes], trusted_proxy_hops: int) -> str:
+    # Only trust X-Forwarded-For entries appended by our own proxies (counted from the right);
+    # the leftmost hop is client-controlled and trivially spoofable.
+    if trusted_proxy_hops > 0:
+        forwarded = [hop.strip() for hop in headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",") if hop.strip()]
+        if forwarded:
+            return forwarded[-min(trusted_proxy_hops, len(forwarded))]
+    client = scope.get("client")
+    return str(client[0]) if client else "unknown"
+
+
+async def send_json(send: Any, payload: dict[str, Any], status: int, extra_headers: tuple[tuple[bytes, bytes], ...] = ()) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1")), *extra_headers]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class CorsAndRateLimitMiddleware:
+    def __init__(
+        self,
+        app: Any,
+        allowed_origins: list[str],
+        window_ms: int,
+        max_requests: int,
+        route_limits: list[tuple[str, int, int]] | None = None,
+        trusted_proxy_hops: int = 1,
+        limiter: SlidingWindowLimiter | None = None,
+    ) -> None:
+        self.app = app
+        self.allowed_origins = frozenset(allowed_origins)
+        self.window_ms = window_ms
+        self.max_requests = max_requests
+        self.route_limits = route_limits or []
+        self.trusted_proxy_hops = max(0, int(trusted_proxy_hops))
+        self.limiter = limiter or SlidingWindowLimiter(sweep_interval_ms=window_ms)
+
+    def limit_for(self, path: str) -> tuple[str, int, int]:
+        for prefix, max_requests, window_ms in self.route_limits:
+            if path.startswith(prefix):
+                return prefix, max_requests, window_ms
+        return "/api", self.max_requests, self.window_ms
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        origin = headers.get(b"origin", b"").decode("latin-1")
+        is_allowed = (not origin) or (not self.allowed_origins) or (origin in self.allowed_origins)
+
+        if scope["method"] == "OPTIONS":
+            if not is_allowed:
+                await send_json(send, {"error": "Origin not allowed."}, 403)
+                return
+            await send({"type": "http.response.start", "status": 204, "headers": list(cors_headers(origin))})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        path = scope.get("path") or ""
+        if path.startswith("/api"):
+            prefix, max_requests, window_ms = self.limit_for(path)
+            retry_after = self.limiter.hit((client_ip(scope, headers, self.trusted_proxy_hops), prefix), max_requests, window_ms)
+            if retry_after:
+                await send_json(
+                    send,
+                    {"error": "Too many requests. Please try again shortly.", "retryAfterSeconds": retry_after},
+                    429,
+                    ((b"retry-after", str(retry_after).encode("latin-1")), *(cors_headers(origin) if is_allowed else ())),
+                )
+                return
+
+        if not is_allowed:
+            await send_json(send, {"error": "Origin not allowed."}, 403)
+            return
+
+        extra = cors_headers(origin)
+
+        async def send_with_cors(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *extra]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
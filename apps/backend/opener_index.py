@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from duo_analytics import add_opener, empty_opener_stats, opener_key, opener_traits, rank_openers
+
+OPENER_INDEX_VERSION = 1
+
+
+class OpenerIndex:
+    # Inverted index from (set, patch, playerA trait set, playerB trait set) to additive placement stats over the
+    # duo's full history. Matches are folded once (by id) on arrival; posting lists by set, patch and trait are
+    # rebuilt on load so a query only merges the entries it needs.
+    def __init__(self, state: dict[str, Any] | None = None) -> None:
+        self.entries: dict[str, dict[str, Any]] = dict((state or {}).get("entries") or {})
+        self.match_ids: set[str] = set((state or {}).get("matchIds") or [])
+        self.latest: tuple[int, Any] = tuple((state or {}).get("latest") or (-1, None))
+        self.by_set: dict[Any, set[str]] = {}
+        self.by_patch: dict[str, set[str]] = {}
+        self.by_trait: dict[str, set[str]] = {}
+        self.ranked: dict[tuple[Any, ...], list[dict[str, Any]]] = {}
+        for key, entry in self.entries.items():
+            self.post(key, entry)
+
+    def post(self, key: str, entry: dict[str, Any]) -> None:
+        self.by_set.setdefault(entry["setNumber"], set()).add(key)
+        self.by_patch.setdefault(entry["patch"], set()).add(key)
+        for trait in entry["playerA"] + entry["playerB"]:
+            self.by_trait.setdefault(trait, set()).add(key)
+
+    def add_match(self, match: dict[str, Any]) -> bool:
+        match_id = str(match.get("id") or "")
+        if not match_id or match_id in self.match_ids or not bool(match.get("sameTeam")):
+            return False
+        a_traits, b_traits = opener_traits(match)
+        key = opener_key(match.get("setNumber"), match.get("patch"), a_traits, b_traits)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = empty_opener_stats(match.get("setNumber"), match.get("patch"), a_traits, b_traits)
+            self.post(key, entry)
+        add_opener(entry, match)
+        self.match_ids.add(match_id)
+        self.ranked.clear()
+        played = int(match.get("gameDatetime") or 0)
+        if played >= self.latest[0]:
+            self.latest = (played, match.get("setNumber"))
+        return True
+
+    def add_matches(self, matches: Iterable[dict[str, Any]]) -> int:
+        return sum(1 for match in matches if isinstance(match, dict) and self.add_match(match))
+
+    def rank(self, set_number: Any = None, patch: str | None = None, trait: str | None = None, limit: int = 5) -> list[dict[str, Any]]:
+        # Defaults to the set of the most recent game; patch and trait narrow the posting lists before ranking.
+        # Rankings are kept until the next match is folded in.
+        query = (set_number, patch, trait, limit)
+        if query in self.ranked:
+            return self.ranked[query]
+        keys = set(self.by_set.get(self.latest[1] if set_number is None else set_number) or ())
+        if patch:
+            keys &= self.by_patch.get(patch) or set()
+        if trait:
+            keys &= self.by_trait.get(trait) or set()
+        self.ranked[query] = rank_openers([self.entries[key] for key in keys], limit)
+        return self.ranked[query]
+
+    def stats(self) -> dict[str, Any]:
+        return {"games": len(self.match_ids), "openers": len(self.entries), "sets": sorted(str(set_number) for set_number in self.by_set), "patches": sorted(self.by_patch)}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"version": OPENER_INDEX_VERSION, "entries": self.entries, "matchIds": sorted(self.match_ids), "latest": list(self.latest)}
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hmac
+import io
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import cProfile
+
+MAX_SPANS_PER_PROFILE = 1000
+
+current_profile: ContextVar["RequestProfile | None"] = ContextVar("current_profile", default=None)
+cprofile_active = False
+
+
+class RequestProfile:
+    def __init__(self, profile_id: str, method: str, path: str, reason: str) -> None:
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = int(time.time() * 1000)
+        self.started = time.perf_counter()
+        self.duration_ms: float | None = None
+        self.status: int | None = None
+        self.spans: list[dict[str, Any]] = []
+        self.dropped_spans = 0
+        self.profiler: cProfile.Profile | None = None
+        self.cprofile_text: str | None = None
+
+    def add_span(self, name: str, started: float, ended: float, detail: str | None) -> None:
+        if len(self.spans) >= MAX_SPANS_PER_PROFILE:
+            self.dropped_spans += 1
+            return
+        self.spans.append({"name": name, "detail": detail, "startMs": round((started - self.started) * 1000, 3), "durationMs": round((ended - started) * 1000, 3)})
+
+    def totals(self) -> list[dict[str, Any]]:
+        by_name: dict[str, dict[str, Any]] = {}
+        for row in self.spans:
+            total = by_name.setdefault(row["name"], {"name": row["name"], "count": 0, "durationMs": 0.0})
+            total["count"] += 1
+            total["durationMs"] += row["durationMs"]
+        return sorted(by_name.values(), key=lambda row: row["durationMs"], reverse=True)
+
+    def server_timing(self) -> str:
+        # Repeated spans (one per match fetch) are collapsed so the header stays small.
+        parts = []
+        for row in self.totals():
+            name = "".join(ch if ch.isalnum() or ch in "_-" else "_" for ch in row["name"])
+            desc = f';desc="x{row["count"]}"' if row["count"] > 1 else ""
+            parts.append(f"{name}{desc};dur={row['durationMs']:.1f}")
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> dict[str, Any]:
+        return {"id": self.id, "method": self.method, "path": self.path, "reason": self.reason, "status": self.status, "startedAt": self.started_at, "durationMs": self.duration_ms, "spanTotals": self.totals()}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**self.summary(), "spans": self.spans, "droppedSpans": self.dropped_spans, "cprofile": self.cprofile_text}
+
+
+class span:
+    # No-op unless the current request is being profiled, so spans can stay on hot paths.
+    __slots__ = ("name", "detail", "profile", "started")
+
+    def __init__(self, name: str, detail: str | None = None) -> None:
+        self.name = name
+        self.detail = detail
+        self.profile: RequestProfile | None = None
+        self.started = 0.0
+
+    def __enter__(self) -> "span":
+        self.profile = current_profile.get()
+        if self.profile is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        if self.profile is not None:
+            self.profile.add_span(self.name, self.started, time.perf_counter(), self.detail)
+
+
+class ProfileStore:
+    def __init__(self, size: int = 50) -> None:
+        self.profiles: deque[RequestProfile] = deque(maxlen=max(1, int(size)))
+
+    def add(self, profile: RequestProfile) -> None:
+        self.profiles.append(profile)
+
+    def list(self) -> list[dict[str, Any]]:
+        return [profile.summary() for profile in reversed(self.profiles)]
+
+    def get(self, profile_id: str) -> RequestProfile | None:
+        return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: Any, store: ProfileStore, admin_token: str = "", sample_rate: float = 0.0) -> None:
+        self.app = app
+        self.store = store
+        self.admin_token = admin_token
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+
+    def profile_reason(self, headers: dict[bytes, bytes]) -> str | None:
+        if self.admin_token and hmac.compare_digest(headers.get(b"x-profile-token", b""), self.admin_token.encode("latin-1", "replace")):
+            return "admin"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        global cprofile_active
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        reason = self.profile_reason(headers)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(f"{int(time.time() * 1000)}-{random.randint(100000, 999999)}", scope["method"], scope.get("path") or "", reason)
+        # cProfile hooks the whole thread, so only one admin-requested capture runs at a time and
+        # concurrent requests on the event loop will show up in its stats.
+        if reason == "admin" and headers.get(b"x-profile-mode", b"") == b"cprofile" and not cprofile_active:
+            cprofile_active = True
+            # cProfile/pstats are imported on demand; only admin captures need them.
+            import cProfile
+
+            profile.profiler = cProfile.Profile()
+            profile.profiler.enable()
+
+        async def send_with_timing(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"server-timing", profile.server_timing().encode("latin-1")), (b"x-profile-id", profile.id.encode("latin-1"))]
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            profile.duration_ms = round((time.perf_counter() - profile.started) * 1000, 3)
+            if profile.profiler is not None:
+                profile.profiler.disable()
+                cprofile_active = False
+                output = io.StringIO()
+                import pstats
+
+                pstats.Stats(profile.profiler, stream=output).sort_stats("cumulative").print_stats(40)
+                profile.cprofile_text = output.getvalue()
+                profile.profiler = None
+            self.store.add(profile)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+if TYPE_CHECKING:
+    import httpx
+
+# Render metric endpoint -> key in the overview payload. Each endpoint accepts repeated `resource` params,
+# so one call per metric covers every service instead of one call per service per metric.
+RENDER_METRICS = {"cpu": "cpu", "memory": "memory", "http-requests": "httpRequests", "bandwidth": "bandwidth"}
+UNIT_BYTES = {"b": 1, "bytes": 1, "kb": 1_000, "mb": 1_000_000, "gb": 1_000_000_000}
+RESOURCES_PER_CALL = 20
+
+
+def parse_timestamp(value: Any) -> float | None:
+    if isinstance(value, (int, float)):
+        return float(value) * (1 if value > 1e12 else 1000)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp() * 1000
+    except ValueError:
+        return None
+
+
+def lttb(points: list[tuple[float, float]], threshold: int) -> list[tuple[float, float]]:
+    # Largest-Triangle-Three-Buckets: keeps the first/last point and, per bucket, the point forming the largest
+    # triangle with the previously kept point and the next bucket's average, so spikes survive downsampling.
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return points
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    anchor = 0
+    for bucket in range(threshold - 2):
+        avg_start = int((bucket + 1) * every) + 1
+        avg_end = min(int((bucket + 2) * every) + 1, count)
+        window = points[avg_start:avg_end] or points[-1:]
+        avg_x = sum(point[0] for point in window) / len(window)
+        avg_y = sum(point[1] for point in window) / len(window)
+        range_start = int(bucket * every) + 1
+        range_end = int((bucket + 1) * every) + 1
+        anchor_x, anchor_y = points[anchor]
+        best_area = -1.0
+        best_index = range_start
+        for index in range(range_start, range_end):
+            x, y = points[index]
+            area = abs((anchor_x - avg_x) * (y - anchor_y) - (anchor_x - x) * (avg_y - anchor_y))
+            if area > best_area:
+                best_area = area
+                best_index = index
+        sampled.append(points[best_index])
+        anchor = best_index
+    sampled.append(points[-1])
+    return sampled
+
+
+def series_resource(series: dict[str, Any], fallback: str | None) -> str | None:
+    for label in series.get("labels") or []:
+        if isinstance(label, dict) and label.get("field") in ("resource", "service", "serviceId"):
+            return str(label.get("value"))
+    return fallback
+
+
+def series_scale(metric: str, series: dict[str, Any]) -> float:
+    if metric in ("memory", "bandwidth"):
+        return float(UNIT_BYTES.get(str(series.get("unit") or "b").lower(), 1))
+    return 1.0
+
+
+def collect_series(metric: str, rows: Any, fallback_resource: str | None) -> dict[str, list[list[tuple[float, float]]]]:
+    # Returns resource id -> list of per-instance/label series as sorted (timestampMs, value) points.
+    out: dict[str, list[list[tuple[float, float]]]] = {}
+    for series in rows if isinstance(rows, list) else []:
+        if not isinstance(series, dict):
+            continue
+        resource = series_resource(series, fallback_resource)
+        if not resource:
+            continue
+        scale = series_scale(metric, series)
+        points = []
+        for row in series.get("values") or []:
+            stamp = parse_timestamp((row or {}).get("timestamp"))
+            value = (row or {}).get("value")
+            if stamp is not None and isinstance(value, (int, float)):
+                points.append((stamp, float(value) * scale))
+        if points:
+            points.sort()
+            out.setdefault(resource, []).append(points)
+    return out
+
+
+def combine_series(series: list[list[tuple[float, float]]]) -> list[tuple[float, float]]:
+    # Instances/status-code series of one service add up per timestamp.
+    totals: dict[float, float] = {}
+    for points in series:
+        for stamp, value in points:
+            totals[stamp] = totals.get(stamp, 0.0) + value
+    return sorted(totals.items())
+
+
+def build_rollup(service_ids: list[str], raw: dict[str, dict[str, list[list[tuple[float, float]]]]], point_budget: int) -> tuple[dict[str, Any], dict[str, Any]]:
+    # Summary fields come from the full-resolution values; only the chart series are downsampled.
+    cpu_values = [value for series in raw.get("cpu", {}).values() for points in series for _stamp, value in points]
+    memory_values = [value for series in raw.get("memory", {}).values() for points in series for _stamp, value in points]
+    summary = {
+        "serviceCount": len(service_ids),
+        "totalHttpRequests": int(round(sum(value for series in raw.get("http-requests", {}).values() for points in series for _stamp, value in points))),
+        "totalBandwidthBytes": int(round(sum(value for series in raw.get("bandwidth", {}).values() for points in series for _stamp, value in points))),
+        "avgCpuPercent": round(sum(cpu_values) / len(cpu_values) * 100, 2) if cpu_values else None,
+        "avgMemoryGb": round(sum(memory_values) / len(memory_values) / 1e9, 3) if memory_values else None,
+        "peakMemoryGb": round(max(memory_values) / 1e9, 3) if memory_values else None,
+    }
+    metrics: dict[str, Any] = {}
+    for service_id in service_ids:
+        charts = {}
+        for metric, key in RENDER_METRICS.items():
+            combined = combine_series(raw.get(metric, {}).get(service_id, []))
+            charts[key] = {"points": [[int(stamp), round(value, 6)] for stamp, value in lttb(combined, point_budget)], "sourcePoints": len(combined)}
+        metrics[service_id] = charts
+    return summary, metrics
+
+
+async def fetch_metric(client: httpx.AsyncClient, base_url: str, api_key: str, metric: str, resources: list[str], window: dict[str, Any]) -> Any:
+    params: list[tuple[str, Any]] = [("resource", resource) for resource in resources]
+    params += [("startTime", window["startTime"]), ("endTime", window["endTime"]), ("resolutionSeconds", window["resolutionSeconds"])]
+    response = await client.get(f"{base_url}/metrics/{metric}", params=params, headers={"Authorization": f"Bearer {api_key}", "Accept": "application/json"})
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_rollup(client: httpx.AsyncClient, base_url: str, api_key: str, service_ids: list[str], window: dict[str, Any], point_budget: int) -> tuple[dict[str, Any], dict[str, Any], list[str]]:
+    chunks = [service_ids[index : index + RESOURCES_PER_CALL] for index in range(0, len(service_ids), RESOURCES_PER_CALL)]
+    jobs = [(metric, chunk) for metric in RENDER_METRICS for chunk in chunks]
+    results = await asyncio.gather(*(fetch_metric(client, base_url, api_key, metric, chunk, window) for metric, chunk in jobs), return_exceptions=True)
+    raw: dict[str, dict[str, list[list[tuple[float, float]]]]] = {metric: {} for metric in RENDER_METRICS}
+    warnings = []
+    for (metric, chunk), result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            warnings.append(f"{metric} metrics unavailable: {result}")
+            continue
+        for resource, series in collect_series(metric, result, chunk[0] if len(chunk) == 1 else None).items():
+            raw[metric].setdefault(resource, []).extend(series)
+    summary, metrics = build_rollup(service_ids, raw, point_budget)
+    return summary, metrics, warnings
+
+
+class StaleWhileRevalidateCache:
+    # Fresh entries are returned as-is; stale ones are returned immediately while one background refresh runs;
+    # entries past max_stale (or missing) are refreshed inline. Concurrent refreshes for a key share one task.
+    def __init__(self, ttl_seconds: float, max_stale_seconds: float, max_entries: int = 64) -> None:
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.max_stale_seconds = max(self.ttl_seconds, float(max_stale_seconds))
+        self.max_entries = max(1, int(max_entries))
+        self.entries: dict[Any, tuple[float, Any]] = {}
+        self.refreshing: dict[Any, asyncio.Task] = {}
+
+    def refresh(self, key: Any, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self.refreshing.get(key)
+        if task is not None:
+            return task
+
+        async def run() -> Any:
+            try:
+                value = await loader()
+                self.entries[key] = (time.monotonic(), value)
+                while len(self.entries) > self.max_entries:
+                    del self.entries[min(self.entries, key=lambda entry: self.entries[entry][0])]
+                return value
+            finally:
+                self.refreshing.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        # Background refresh errors surface on the next inline load; retrieve them here so they are not logged as unhandled.
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.refreshing[key] = task
+        return task
+
+    async def get(self, key: Any, loader: Callable[[], Awaitable[Any]]) -> tuple[Any, str, float]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl_seconds:
+                return entry[1], "fresh", age
+            if age < self.max_stale_seconds:
+                self.refresh(key, loader)
+                return entry[1], "stale", age
+        value = await asyncio.shield(self.refresh(key, loader))
+        return value, "miss", 0.0
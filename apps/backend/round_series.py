@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import base64
+import statistics
+import sys
+import time
+import zlib
+from array import array
+from collections import Counter, OrderedDict
+from itertools import compress
+from operator import ne, sub
+from typing import Any, Iterable
+
+from daily_rollup import day_key
+from duo_analytics import pct
+
+ROUND_SERIES_VERSION = 1
+STAGE_MAJORS = 8
+ROUNDS_PER_STAGE = 7
+STAGE_SLOTS = STAGE_MAJORS * ROUNDS_PER_STAGE
+PLAYER_SLOTS = ("A", "B")
+# Column order is part of the encoded layout; append new fields at the end and bump ROUND_SERIES_VERSION.
+ROUND_FIELDS = ("hp", "gold", "level", "boardPower", "benchCount", "winStreak", "lossStreak", "componentsHeld", "componentsSlammed")
+MISSING = -1
+# boardPower is numeric(10,4) in duo_round_snapshot; columns hold it as fixed-point ten-thousandths.
+BOARD_POWER_SCALE = 10000
+SLOT_RANGE = range(STAGE_SLOTS)
+# Stage 1 has four rounds, so round order skips slots 1-5..1-7: a 1-4 -> 2-1 gap is one round, not four.
+ROUND_ORDINAL = [slot if slot < ROUNDS_PER_STAGE else slot - (ROUNDS_PER_STAGE - 4) for slot in SLOT_RANGE]
+ALIGNED_GAP_ROUNDS = 1
+EMPTY_COLUMN = array("i", [MISSING]) * STAGE_SLOTS
+
+
+def stage_slot(stage_major: Any, stage_minor: Any) -> int | None:
+    try:
+        major, minor = int(stage_major), int(stage_minor)
+    except (TypeError, ValueError):
+        return None
+    if not 1 <= major <= STAGE_MAJORS or not 1 <= minor <= ROUNDS_PER_STAGE:
+        return None
+    return (major - 1) * ROUNDS_PER_STAGE + minor - 1
+
+
+def slot_label(slot: int) -> str:
+    return f"{slot // ROUNDS_PER_STAGE + 1}-{slot % ROUNDS_PER_STAGE + 1}"
+
+
+def snapshot_slot(snapshot: dict[str, Any]) -> int | None:
+    # Accepts stageMajor/stageMinor or a "3-2" round key.
+    if snapshot.get("stageMajor") is not None:
+        return stage_slot(snapshot.get("stageMajor"), snapshot.get("stageMinor"))
+    major, _, minor = str(snapshot.get("round") or "").partition("-")
+    return stage_slot(major, minor)
+
+
+def event_slot(event: dict[str, Any]) -> int | None:
+    payload = event.get("payload") if isinstance(event.get("payload"), dict) else {}
+    return stage_slot(event.get("stageMajor", payload.get("stageMajor")), event.get("stageMinor", payload.get("stageMinor")))
+
+
+class MatchRounds:
+    # Columnar round series for one match: a fixed-width int32 column of STAGE_SLOTS per (player, field), indexed
+    # by stage slot, MISSING where no snapshot arrived. Power spikes are cached until the next write.
+    def __init__(self, columns: dict[str, array] | None = None, created_at: int | None = None) -> None:
+        self.columns = columns or {f"{player}.{field}": array("i", EMPTY_COLUMN) for player in PLAYER_SLOTS for field in ROUND_FIELDS}
+        self.created_at = int(created_at if created_at is not None else time.time() * 1000)
+        self.spikes: tuple[int | None, int | None] | None = None
+
+    def put(self, player: str, slot: int, snapshot: dict[str, Any]) -> int:
+        written = 0
+        for field in ROUND_FIELDS:
+            value = snapshot.get(field)
+            if value is None:
+                continue
+            try:
+                number = round(float(value) * BOARD_POWER_SCALE) if field == "boardPower" else int(value)
+            except (TypeError, ValueError):
+                continue
+            self.columns[f"{player}.{field}"][slot] = max(0, min(number, 2**31 - 1))
+            written += 1
+        if written:
+            self.spikes = None
+        return written
+
+    def column(self, player: str, field: str) -> array:
+        return self.columns[f"{player}.{field}"]
+
+    def power_spikes(self) -> tuple[int | None, int | None]:
+        if self.spikes is None:
+            self.spikes = (power_spike(self.column("A", "boardPower")), power_spike(self.column("B", "boardPower")))
+        return self.spikes
+
+    def series(self) -> dict[str, Any]:
+        # Readable view for API responses: per player, field -> {round: value} for recorded rounds only.
+        out: dict[str, Any] = {}
+        for player in PLAYER_SLOTS:
+            fields = {}
+            for field in ROUND_FIELDS:
+                column = self.column(player, field)
+                recorded = {slot_label(slot): (column[slot] / BOARD_POWER_SCALE if field == "boardPower" else column[slot]) for slot in compress(SLOT_RANGE, map(ne, column, EMPTY_COLUMN))}
+                if recorded:
+                    fields[field] = recorded
+            out[player] = fields
+        return out
+
+    def encode(self) -> str:
+        # zlib over the concatenated little-endian columns; sparse series compress to a few hundred bytes.
+        columns = [self.columns[f"{player}.{field}"] for player in PLAYER_SLOTS for field in ROUND_FIELDS]
+        if sys.byteorder == "big":
+            columns = [array("i", column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        raw = b"".join(column.tobytes() for column in columns)
+        return base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+
+    @classmethod
+    def decode(cls, encoded: str, created_at: int | None = None) -> MatchRounds:
+        raw = zlib.decompress(base64.b64decode(encoded))
+        width = STAGE_SLOTS * EMPTY_COLUMN.itemsize
+        columns = {}
+        for index, key in enumerate(f"{player}.{field}" for player in PLAYER_SLOTS for field in ROUND_FIELDS):
+            column = array("i")
+            column.frombytes(raw[index * width : (index + 1) * width])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns[key] = column
+        return cls(columns, created_at)
+
+
+class RoundStore:
+    # Per-duo round series keyed by match ID; the oldest match is dropped once `capacity` matches are held.
+    def __init__(self, state: dict[str, Any] | None = None, capacity: int = 600) -> None:
+        self.capacity = max(1, int(capacity))
+        self.matches: OrderedDict[str, MatchRounds] = OrderedDict()
+        if (state or {}).get("version") != ROUND_SERIES_VERSION:
+            return
+        for match_id, entry in ((state or {}).get("matches") or {}).items():
+            self.matches[match_id] = MatchRounds.decode(entry["columns"], entry.get("createdAt"))
+
+    def ingest(self, match_id: str, snapshots: Iterable[Any]) -> tuple[int, int]:
+        # Later snapshots for the same (round, player) overwrite earlier ones, so retries are idempotent.
+        accepted = rejected = 0
+        rounds = self.matches.get(match_id) or MatchRounds()
+        for snapshot in snapshots:
+            snapshot = snapshot if isinstance(snapshot, dict) else {}
+            player = str(snapshot.get("playerSlot") or "").strip().upper()
+            slot = snapshot_slot(snapshot)
+            if player not in PLAYER_SLOTS or slot is None or not rounds.put(player, slot, snapshot):
+                rejected += 1
+                continue
+            accepted += 1
+        # A batch with nothing usable leaves no empty series behind.
+        if accepted and match_id not in self.matches:
+            self.matches[match_id] = rounds
+            while len(self.matches) > self.capacity:
+                self.matches.popitem(last=False)
+        return accepted, rejected
+
+    def since(self, since_day: str | None = None, played_at: dict[str, Any] | None = None) -> list[tuple[str, MatchRounds]]:
+        # Windows follow the day each match was played (played_at: match ID -> gameDatetime ms), like the daily
+        # rollup; ingest time only stands in for matches whose summary is not stored.
+        if since_day is None:
+            return list(self.matches.items())
+        played_at = played_at or {}
+        return [(match_id, rounds) for match_id, rounds in self.matches.items() if (day_key(played_at.get(match_id) or rounds.created_at) or "") >= since_day]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"version": ROUND_SERIES_VERSION, "matches": {match_id: {"createdAt": rounds.created_at, "columns": rounds.encode()} for match_id, rounds in self.matches.items()}}
+
+
+def power_spike(power: array) -> int | None:
+    # Slot of the largest board-power gain between consecutive recorded rounds (None without a positive gain).
+    recorded = list(compress(SLOT_RANGE, map(ne, power, EMPTY_COLUMN)))
+    if len(recorded) < 2:
+        return None
+    values = [power[slot] for slot in recorded]
+    gains = list(map(sub, values[1:], values[:-1]))
+    best = max(range(len(gains)), key=gains.__getitem__)
+    return recorded[best + 1] if gains[best] > 0 else None
+
+
+def board_timing(entries: list[tuple[str, MatchRounds]], placements: dict[str, int], gifts_by_match: dict[str, list[dict[str, Any]]]) -> tuple[dict[str, Any], dict[str, Any]]:
+    # Returns (boardTimingAlignment, giftUsageStyle) for the synergy fingerprint. placements maps match ID to team
+    # placement (1-4). Spikes are cached per match, so a scorecard over hundreds of matches folds two ints per match
+    # plus that match's gifts.
+    gaps: list[int] = []
+    spikes_a: Counter[str] = Counter()
+    spikes_b: Counter[str] = Counter()
+    leader: Counter[str] = Counter()
+    # [games, Top 4 finishes] (team placement 1-2) by whether the partners spiked within ALIGNED_GAP_ROUNDS.
+    top4 = {"aligned": [0, 0], "staggered": [0, 0]}
+    latencies: list[int] = []
+    gifts_after_spike = 0
+    for match_id, rounds in entries:
+        spike_a, spike_b = rounds.power_spikes()
+        if spike_a is not None:
+            spikes_a[slot_label(spike_a)] += 1
+        if spike_b is not None:
+            spikes_b[slot_label(spike_b)] += 1
+        if spike_a is not None and spike_b is not None:
+            gap = abs(ROUND_ORDINAL[spike_a] - ROUND_ORDINAL[spike_b])
+            gaps.append(gap)
+            leader["A" if spike_a < spike_b else "B" if spike_b < spike_a else "together"] += 1
+            placement = placements.get(match_id)
+            if placement is not None:
+                bucket = top4["aligned" if gap <= ALIGNED_GAP_ROUNDS else "staggered"]
+                bucket[0] += 1
+                bucket[1] += int(placement <= 2)
+        for gift in gifts_by_match.get(match_id) or []:
+            target = str(gift.get("targetSlot") or "").upper() or {"A": "B", "B": "A"}.get(str(gift.get("actorSlot") or "").upper(), "")
+            spike = spike_a if target == "A" else spike_b if target == "B" else None
+            slot = event_slot(gift)
+            if spike is None or slot is None:
+                continue
+            if spike >= slot:
+                latencies.append(ROUND_ORDINAL[spike] - ROUND_ORDINAL[slot])
+            else:
+                gifts_after_spike += 1
+
+    if not gaps:
+        alignment = {"status": "needs_round_events", "reason": "No matches with board power snapshots for both players yet (POST /api/duo/rounds/batch).", "matchesWithRounds": len(entries)}
+    else:
+        alignment = {
+            "status": "ok",
+            "matchesWithRounds": len(entries),
+            "matchesWithBothSpikes": len(gaps),
+            "spikeStageA": spikes_a.most_common(1)[0][0] if spikes_a else None,
+            "spikeStageB": spikes_b.most_common(1)[0][0] if spikes_b else None,
+            "avgSpikeGapRounds": round(statistics.fmean(gaps), 2),
+            "alignedRate": pct(sum(1 for gap in gaps if gap <= ALIGNED_GAP_ROUNDS), len(gaps)),
+            "firstToSpike": {"A": pct(leader["A"], len(gaps)), "B": pct(leader["B"], len(gaps)), "together": pct(leader["together"], len(gaps))},
+            "alignedTop4Rate": pct(top4["aligned"][1], top4["aligned"][0]),
+            "staggeredTop4Rate": pct(top4["staggered"][1], top4["staggered"][0]),
+        }
+
+    analyzed = len(latencies) + gifts_after_spike
+    if not analyzed:
+        gift_style = {"status": "needs_gift_events", "reason": "Needs gift events with stage and slot on matches that have round snapshots.", "giftsAnalyzed": 0}
+    else:
+        before_rate = pct(len(latencies), analyzed)
+        gift_style = {
+            "status": "ok",
+            "giftsAnalyzed": analyzed,
+            "avgGiftToSpikeRounds": round(statistics.fmean(latencies), 2) if latencies else None,
+            "medianGiftToSpikeRounds": statistics.median(latencies) if latencies else None,
+            "giftsBeforeSpikeRate": before_rate,
+            "giftsAfterSpikeRate": pct(gifts_after_spike, analyzed),
+            "style": "enabler" if (before_rate or 0) >= 60 else "reactive",
+        }
+    return alignment, gift_style
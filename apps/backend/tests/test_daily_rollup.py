@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import time
+import unittest
+from typing import Any
+
+from bench.synthetic import DUO_PUUID_A, DUO_PUUID_B, generate_events, generate_matches
+from daily_rollup import DailyRollup, day_key, window_start_day
+from duo_analytics import build_duo_highlights, build_duo_scorecard, build_personalized_playbook, highlights_from_counts, playbook_from_counts, scorecard_from_counters
+from match_summary import summarize_duo_match
+from opener_index import OpenerIndex
+
+
+def without_generated_at(result: dict[str, Any]) -> str:
+    return json.dumps({key: value for key, value in result.items() if key != "generatedAt"}, sort_keys=True)
+
+
+class DailyRollupTest(unittest.TestCase):
+    # The windowed scorecard, highlights and playbook are read from rollup counters; over the same matches and events
+    # they must equal what duo_analytics computes from the raw rows.
+    def setUp(self) -> None:
+        self.now = int(time.time() * 1000)
+        self.matches = [summary for raw in generate_matches(120) if (summary := summarize_duo_match(raw["metadata"]["match_id"], raw, DUO_PUUID_A, DUO_PUUID_B))]
+        for index, match in enumerate(self.matches):
+            match["gameDatetime"] = self.now - index * 3 * 3600 * 1000
+        self.events = generate_events(400, [match["id"] for match in self.matches])
+        for index, event in enumerate(self.events):
+            event["createdAt"] = self.now - index * 3600 * 1000
+        self.rollup = DailyRollup()
+        self.rollup.add_matches(self.matches)
+        for event in self.events:
+            self.rollup.add_event(event)
+        self.openers = OpenerIndex()
+        self.openers.add_matches(self.matches)
+
+    def in_window(self, since_day: str) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        return [match for match in self.matches if day_key(match["gameDatetime"]) >= since_day], [event for event in self.events if day_key(event["createdAt"]) >= since_day]
+
+    def test_counters_match_raw_analytics(self) -> None:
+        for window_days in (3, 10, 365):
+            since_day = window_start_day(window_days, self.now)
+            matches, events = self.in_window(since_day)
+            match_totals, event_totals = self.rollup.totals(since_day)
+            self.assertEqual((match_totals["games"], event_totals["events"]), (len(matches), len(events)))
+            self.assertEqual(without_generated_at(scorecard_from_counters(match_totals, event_totals)), without_generated_at(build_duo_scorecard(matches, events)))
+            self.assertEqual(without_generated_at(highlights_from_counts(match_totals["wins"], event_totals["types"].get("rescue_arrival", 0), event_totals["types"].get("gift_sent", 0))), without_generated_at(build_duo_highlights(matches, events)))
+            top_openers = self.openers.rank()
+            self.assertEqual(without_generated_at(playbook_from_counts(event_totals["types"].get("roll_down", 0), event_totals["types"].get("gift_sent", 0), match_totals["sameTeamGames"], top_openers)), without_generated_at(build_personalized_playbook(matches, events, top_openers)))
+
+    def test_events_older_than_the_window_drop_out(self) -> None:
+        # Unlike the pre-rollup scorecard, which counted every retained event, events are windowed by createdAt day.
+        since_day = window_start_day(3, self.now)
+        _match_totals, event_totals = self.rollup.totals(since_day)
+        self.assertLess(event_totals["events"], len(self.events))
+        self.assertEqual(self.rollup.totals()[1]["events"], len(self.events))
+
+    def test_adding_a_match_twice_counts_it_once(self) -> None:
+        before = self.rollup.totals()[0]["games"]
+        self.assertEqual(self.rollup.add_matches(self.matches[:10]), 0)
+        self.assertEqual(self.rollup.totals()[0]["games"], before)
+
+
+if __name__ == "__main__":
+    unittest.main()
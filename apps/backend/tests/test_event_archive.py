@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("RIOT_API_KEY", "test-key")
+
+import main
+
+
+class EvictedEventArchiveTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store_dir = Path(tempfile.mkdtemp())
+        self.saved = {name: getattr(main, name) for name in ("ANALYTICS_STORE_PATH", "PERSISTED_CACHE_PATH", "EVENT_LOG_CAPACITY", "cold_archive", "pending_archive", "analytics_store", "stores_loaded", "pending_save")}
+        main.ANALYTICS_STORE_PATH = self.store_dir / "duo-analytics-store.json"
+        main.PERSISTED_CACHE_PATH = self.store_dir / "duo-history-cache.json"
+        main.EVENT_LOG_CAPACITY = 3
+        main.cold_archive = main.ColdArchive(self.store_dir / "archive")
+        main.pending_archive = {}
+        main.analytics_store = {"version": 1, "duos": {}}
+        main.stores_loaded = True
+
+    def tearDown(self) -> None:
+        for name, value in self.saved.items():
+            setattr(main, name, value)
+
+    def test_evictions_after_a_save_are_still_archived(self) -> None:
+        record = main.analytics_store["duos"].setdefault("duo", {"duoId": "duo", "matchesById": {}, "events": [], "journals": []})
+        events = main.duo_event_log(record)
+        for sequence in range(5):
+            events.append({"type": "gift_sent", "sequence": sequence, "createdAt": 1_700_000_000_000 + sequence})
+        asyncio.run(main.save_stores())
+        self.assertEqual(len(list(main.cold_archive.read_window("duo", "events"))), 2)
+
+        for sequence in range(5, 10):
+            events.append({"type": "gift_sent", "sequence": sequence, "createdAt": 1_700_000_000_000 + sequence})
+        self.assertEqual(len(main.pending_archive["duo"]["events"]), 5)
+        asyncio.run(main.save_stores())
+        archived = list(main.cold_archive.read_window("duo", "events"))
+        self.assertEqual([event["sequence"] for event in archived], list(range(7)))
+        self.assertEqual([event["sequence"] for event in events], [7, 8, 9])
+
+    def test_ingest_archives_evicted_events_before_responding(self) -> None:
+        main.analytics_store["duos"]["duo"] = {"duoId": "duo", "matchesById": {}, "events": [], "journals": []}
+        response = TestClient(main.app).post("/api/duo/events/batch", json={"duoId": "duo", "matchId": "NA1_1", "events": [{"type": "gift_sent", "sequence": sequence, "source": "test"} for sequence in range(5)]})
+        self.assertEqual(response.status_code, 200)
+        # No save has run yet: the two evicted events are already in the gzip segment, not only in memory.
+        self.assertEqual([event["idempotencyKey"] for event in main.cold_archive.read_window("duo", "events")], ["duo:NA1_1:test:0", "duo:NA1_1:test:1"])
+        self.assertNotIn("duo", main.pending_archive)
+
+
+if __name__ == "__main__":
+    unittest.main()
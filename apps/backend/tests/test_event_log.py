@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import unittest
+
+from event_log import DuoEventLog, idempotency_key
+
+
+def gift(sequence: int, match_id: str = "NA1_1", stage: int | None = 2, **extra: object) -> dict[str, object]:
+    event: dict[str, object] = {"type": "gift_sent", "matchId": match_id, "sequence": sequence, **extra}
+    if stage is not None:
+        event["stageMajor"] = stage
+    return event
+
+
+class DuoEventLogTest(unittest.TestCase):
+    def assert_indexes_match(self, log: DuoEventLog) -> None:
+        # Every secondary index must hold exactly the retained events, in arrival order.
+        retained = list(log)
+        for index, key_of in ((log.by_type, lambda event: str(event.get("type"))), (log.by_match, lambda event: str(event.get("matchId") or "")), (log.by_stage, lambda event: event.get("stageMajor"))):
+            expected: dict[object, list[int]] = {}
+            for event in retained:
+                key = key_of(event)
+                if key not in ("", None):
+                    expected.setdefault(key, []).append(event["seq"])
+            self.assertEqual({key: [event["seq"] for event in bucket] for key, bucket in index.items()}, expected)
+        self.assertEqual(set(log.by_key), {event["idempotencyKey"] for event in retained if event.get("idempotencyKey")})
+
+    def test_indexes_stay_consistent_across_evictions(self) -> None:
+        evicted: list[dict[str, object]] = []
+        log = DuoEventLog(capacity=4, on_evict=evicted.append)
+        for sequence in range(10):
+            log.append(gift(sequence, match_id=f"NA1_{sequence % 3}", stage=sequence % 2 + 2 if sequence % 4 else None, idempotencyKey=f"k{sequence}", type="gift_sent" if sequence % 2 else "roll_down"))
+            self.assert_indexes_match(log)
+        self.assertEqual([event["seq"] for event in log], [7, 8, 9, 10])
+        self.assertEqual([event["seq"] for event in evicted], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(log.count_type("gift_sent") + log.count_type("roll_down"), 4)
+
+    def test_duplicate_keys_are_rejected_while_retained(self) -> None:
+        log = DuoEventLog(capacity=2)
+        self.assertIsNotNone(log.append(gift(1, idempotencyKey="same")))
+        self.assertIsNone(log.append(gift(2, idempotencyKey="same")))
+        self.assertEqual(len(log), 1)
+        self.assertTrue(log.has_key("same"))
+        # Once the keyed event is evicted, the key is free again.
+        log.append(gift(3))
+        log.append(gift(4))
+        self.assertFalse(log.has_key("same"))
+        self.assertIsNotNone(log.append(gift(5, idempotencyKey="same")))
+
+    def test_stage_and_match_lookups(self) -> None:
+        log = DuoEventLog()
+        log.append(gift(1, match_id="NA1_1", stage=2))
+        log.append(gift(2, match_id="NA1_2", stage=None, payload={"stageMajor": "3"}))
+        log.append(gift(3, match_id="NA1_1", stage=3))
+        log.append({"type": "roll_down", "sequence": 4})
+        self.assertEqual([event["sequence"] for event in log.of_match("NA1_1")], [1, 3])
+        self.assertEqual([event["sequence"] for event in log.of_stage(3)], [2, 3])
+        self.assertEqual(log.of_stage(5), [])
+        self.assertEqual(log.of_match("NA1_9"), [])
+
+    def test_restored_sequence_numbers_keep_increasing(self) -> None:
+        log = DuoEventLog(events=[{"type": "gift_sent", "seq": 7}, {"type": "gift_sent", "seq": 3}, {"payload": {}}])
+        self.assertEqual([event["seq"] for event in log], [7, 8])
+        self.assertEqual(log.append(gift(1))["seq"], 9)
+
+    def test_idempotency_key_prefers_the_client_key(self) -> None:
+        self.assertEqual(idempotency_key("duo", "NA1_1", {"idempotencyKey": " abc ", "source": "overlay", "sequence": 4}), "abc")
+        self.assertEqual(idempotency_key("duo", "NA1_1", {"source": "overlay", "sequence": 0}), "duo:NA1_1:overlay:0")
+        self.assertIsNone(idempotency_key("duo", "NA1_1", {"source": "overlay"}))
+        self.assertIsNone(idempotency_key("duo", "NA1_1", {"sequence": 4}))
+
+
+if __name__ == "__main__":
+    unittest.main()
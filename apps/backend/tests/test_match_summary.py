@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+
+os.environ.setdefault("RIOT_API_KEY", "test-key")
+
+import main
+from bench.synthetic import DUO_PUUID_A, DUO_PUUID_B, generate_matches
+from match_summary import summarize_matches
+
+
+class SummaryPoolTest(unittest.TestCase):
+    # Cold loads summarize in worker processes; whatever path a batch takes, the summaries must be the ones an inline
+    # pass produces, in the same order.
+    def setUp(self) -> None:
+        self.saved = {name: getattr(main, name) for name in ("MATCH_SUMMARY_WORKERS", "MATCH_SUMMARY_POOL_MIN_MATCHES", "summary_pool")}
+        main.MATCH_SUMMARY_WORKERS = 2
+        main.MATCH_SUMMARY_POOL_MIN_MATCHES = 10
+        main.summary_pool = main.new_summary_pool()
+        self.rows = [(raw["metadata"]["match_id"], raw) for raw in generate_matches(40)]
+        self.rows.insert(7, ("NA1_missing", None))
+
+    def tearDown(self) -> None:
+        if main.summary_pool is not None:
+            main.summary_pool.shutdown(wait=True, cancel_futures=True)
+        for name, value in self.saved.items():
+            setattr(main, name, value)
+
+    def inline(self, lobby: bool) -> list[dict[str, object]]:
+        return [summary for summary in summarize_matches(self.rows, DUO_PUUID_A, DUO_PUUID_B, lobby) if summary is not None]
+
+    def test_pooled_and_inline_summaries_match(self) -> None:
+        pool = main.summary_pool
+        for lobby in (True, False):
+            pooled = asyncio.run(main.summarize_shared_matches(self.rows, DUO_PUUID_A, DUO_PUUID_B, lobby))
+            self.assertEqual(len(pooled), len(self.rows) - 1)
+            self.assertEqual(pooled, self.inline(lobby))
+            self.assertEqual(all("lobby" in summary for summary in pooled), lobby)
+        # The pool was used, not replaced after a silent inline fallback.
+        self.assertIs(main.summary_pool, pool)
+
+    def test_small_batches_stay_inline(self) -> None:
+        main.summary_pool.shutdown(wait=True)
+        self.rows = self.rows[:5]
+        # A shut-down pool would raise on submit, so this only passes if the batch never reaches it.
+        self.assertEqual(asyncio.run(main.summarize_shared_matches(self.rows, DUO_PUUID_A, DUO_PUUID_B)), self.inline(True))
+        main.summary_pool = None
+
+    def test_a_broken_pool_is_replaced_and_the_batch_summarized_inline(self) -> None:
+        broken = main.summary_pool
+        with self.assertRaises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+        for lobby in (True, False):
+            self.assertEqual(asyncio.run(main.summarize_shared_matches(self.rows, DUO_PUUID_A, DUO_PUUID_B, lobby)), self.inline(lobby))
+        self.assertIsNotNone(main.summary_pool)
+        self.assertIsNot(main.summary_pool, broken)
+        # The replacement pool serves the next cold load.
+        replacement = main.summary_pool
+        self.assertEqual(asyncio.run(main.summarize_shared_matches(self.rows, DUO_PUUID_A, DUO_PUUID_B)), self.inline(True))
+        self.assertIs(main.summary_pool, replacement)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import unittest
+from typing import Any
+
+from duo_analytics import OPENER_PRIOR_GAMES
+from opener_index import OpenerIndex
+
+
+def game(match_id: str, team_placement: int, a_traits: list[str], b_traits: list[str], set_number: int = 13, patch: str = "14.1", played: int = 0, same_team: bool = True) -> dict[str, Any]:
+    placement = team_placement * 2
+    return {"id": match_id, "sameTeam": same_team, "setNumber": set_number, "patch": patch, "gameDatetime": played, "openerTraits": [a_traits, b_traits], "playerA": {"placement": placement - 1}, "playerB": {"placement": placement}}
+
+
+def pair(row: dict[str, Any]) -> tuple[str, ...]:
+    return (*row["playerA"], "|", *row["playerB"])
+
+
+class OpenerIndexTest(unittest.TestCase):
+    def test_posting_lists_follow_entries_and_survive_a_reload(self) -> None:
+        index = OpenerIndex()
+        added = index.add_matches([game("m1", 1, ["Bruiser", "Sniper"], ["Mage"]), game("m2", 2, ["Bruiser", "Sniper"], ["Mage"], patch="14.2"), game("m3", 3, ["Rebel"], ["Mage"], set_number=12, patch="13.24"), game("m1", 4, ["Rebel"], ["Mage"]), game("m4", 1, ["Rebel"], ["Mage"], same_team=False), "not a match"])  # type: ignore[list-item]
+        self.assertEqual(added, 3)
+        self.assertEqual(index.stats(), {"games": 3, "openers": 3, "sets": ["12", "13"], "patches": ["13.24", "14.1", "14.2"]})
+        self.assertEqual({set_number: len(keys) for set_number, keys in index.by_set.items()}, {13: 2, 12: 1})
+        self.assertEqual(index.by_trait["Mage"], set(index.entries))
+        self.assertEqual(index.by_trait["Bruiser"], index.by_trait["Sniper"])
+        self.assertEqual(index.by_trait["Rebel"], index.by_set[12])
+        restored = OpenerIndex(index.to_dict())
+        self.assertEqual((restored.by_set, restored.by_patch, restored.by_trait, restored.match_ids, restored.latest), (index.by_set, index.by_patch, index.by_trait, index.match_ids, index.latest))
+
+    def test_queries_narrow_by_set_patch_and_trait(self) -> None:
+        index = OpenerIndex()
+        index.add_matches([game("m1", 2, ["Bruiser"], ["Mage"], played=1), game("m2", 1, ["Rebel"], ["Mage"], patch="14.2", played=2), game("m3", 1, ["Sniper"], ["Mage"], set_number=12, played=0)])
+        # Without a set, the set of the most recent game is ranked; patches of one trait pair are merged.
+        self.assertEqual([pair(row) for row in index.rank()], [("Rebel", "|", "Mage"), ("Bruiser", "|", "Mage")])
+        self.assertEqual([pair(row) for row in index.rank(patch="14.1")], [("Bruiser", "|", "Mage")])
+        self.assertEqual([pair(row) for row in index.rank(trait="Rebel")], [("Rebel", "|", "Mage")])
+        self.assertEqual([pair(row) for row in index.rank(set_number=12)], [("Sniper", "|", "Mage")])
+        self.assertEqual(index.rank(patch="99.1"), [])
+
+    def test_one_lucky_game_does_not_outrank_a_proven_opener(self) -> None:
+        index = OpenerIndex()
+        index.add_match(game("lucky", 1, ["Rebel"], ["Mage"]))
+        index.add_matches(game(f"proven{n}", 1 + n % 2, ["Bruiser"], ["Sniper"]) for n in range(20))
+        index.add_matches(game(f"weak{n}", 4, ["Flex"], ["Flex"]) for n in range(20))
+        ranked = index.rank()
+        lucky = next(row for row in ranked if row["matchId"] == "lucky")
+        self.assertEqual(pair(ranked[0]), ("Bruiser", "|", "Sniper"))
+        self.assertLess(lucky["avgPlacement"], ranked[0]["avgPlacement"])
+        # The lone 1st is shrunk toward the duo mean (111 placement points over 41 games) by OPENER_PRIOR_GAMES.
+        self.assertEqual(lucky["expectedPlacement"], round((1 + OPENER_PRIOR_GAMES * 111 / 41) / (1 + OPENER_PRIOR_GAMES), 3))
+        self.assertLess(lucky["confidence"], ranked[0]["confidence"])
+        self.assertIsNone(lucky["placementRange"])
+
+    def test_rankings_are_cached_until_new_matches_arrive(self) -> None:
+        index = OpenerIndex()
+        index.add_matches([game("m1", 1, ["Rebel"], ["Mage"]), game("m2", 3, ["Bruiser"], ["Mage"])])
+        first = index.rank()
+        self.assertIs(index.rank(), first)
+        # Re-folding a known match is a no-op and keeps the cache.
+        index.add_matches([game("m1", 1, ["Rebel"], ["Mage"])])
+        self.assertIs(index.rank(), first)
+        index.add_matches([game("m3", 1, ["Bruiser"], ["Mage"]), game("m4", 1, ["Bruiser"], ["Mage"])])
+        refreshed = index.rank()
+        self.assertIsNot(refreshed, first)
+        self.assertEqual({pair(row): row["games"] for row in refreshed}, {("Bruiser", "|", "Mage"): 3, ("Rebel", "|", "Mage"): 1})
+        self.assertLess(refreshed[1]["expectedPlacement"], first[1]["expectedPlacement"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+import unittest
+from typing import Any
+
+from daily_rollup import DAY_MS, window_start_day
+from round_series import MISSING, ROUND_ORDINAL, MatchRounds, RoundStore, board_timing, stage_slot
+
+
+def power(player: str, round_key: str, value: float, **extra: Any) -> dict[str, Any]:
+    return {"playerSlot": player, "round": round_key, "boardPower": value, **extra}
+
+
+def spiking(a_round: str, b_round: str) -> MatchRounds:
+    # Flat board power for both players except one jump each, landing on the given rounds.
+    rounds = MatchRounds()
+    for round_key in ("1-2", "1-3", "1-4", "2-1", "2-2", "3-1", "3-2"):
+        rounds.put("A", stage_slot(*round_key.split("-")), {"boardPower": 10 if round_key == a_round else 1})
+        rounds.put("B", stage_slot(*round_key.split("-")), {"boardPower": 10 if round_key == b_round else 1})
+    return rounds
+
+
+class RoundOrdinalTest(unittest.TestCase):
+    def test_stage_one_has_four_rounds(self) -> None:
+        self.assertEqual(stage_slot(1, 4), 3)
+        self.assertEqual(stage_slot(2, 1), 7)
+        self.assertEqual(ROUND_ORDINAL[stage_slot(2, 1)] - ROUND_ORDINAL[stage_slot(1, 4)], 1)
+        self.assertEqual(ROUND_ORDINAL[stage_slot(3, 1)] - ROUND_ORDINAL[stage_slot(2, 1)], 7)
+        self.assertIsNone(stage_slot(9, 1))
+        self.assertIsNone(stage_slot(2, 8))
+        self.assertIsNone(stage_slot("x", 1))
+
+    def test_board_timing_measures_gaps_in_rounds_played(self) -> None:
+        # 1-4 -> 2-1 is one round apart (aligned); 2-1 -> 3-1 is seven (staggered).
+        entries = [("aligned", spiking("2-1", "1-4")), ("staggered", spiking("2-1", "3-1")), ("unplaced", spiking("2-2", "2-2"))]
+        gifts = {"aligned": [{"type": "gift_sent", "targetSlot": "A", "stageMajor": 1, "stageMinor": 2}, {"type": "gift_sent", "actorSlot": "A", "stageMajor": 3, "stageMinor": 2}]}
+        alignment, gift_style = board_timing(entries, {"aligned": 1, "staggered": 4}, gifts)
+        self.assertEqual(alignment["matchesWithBothSpikes"], 3)
+        self.assertEqual(alignment["avgSpikeGapRounds"], round((1 + 7 + 0) / 3, 2))
+        self.assertAlmostEqual(alignment["alignedRate"], 200 / 3)
+        self.assertEqual(alignment["spikeStageA"], "2-1")
+        self.assertAlmostEqual(alignment["firstToSpike"]["together"], 100 / 3)
+        self.assertEqual((alignment["alignedTop4Rate"], alignment["staggeredTop4Rate"]), (100.0, 0.0))
+        # The gift to A at 1-2 precedes A's 2-1 spike by three rounds; B's gift from A at 3-2 lands after B spiked at 1-4.
+        self.assertEqual((gift_style["giftsAnalyzed"], gift_style["avgGiftToSpikeRounds"], gift_style["giftsBeforeSpikeRate"]), (2, 3, 50.0))
+
+    def test_board_timing_without_spikes_asks_for_round_events(self) -> None:
+        alignment, gift_style = board_timing([("flat", spiking("", ""))], {}, {})
+        self.assertEqual((alignment["status"], alignment["matchesWithRounds"]), ("needs_round_events", 1))
+        self.assertEqual(gift_style["status"], "needs_gift_events")
+
+
+class MatchRoundsTest(unittest.TestCase):
+    def test_values_are_clamped_and_unrecorded_slots_stay_missing(self) -> None:
+        rounds = MatchRounds()
+        slot = stage_slot(2, 1)
+        self.assertEqual(rounds.put("A", slot, {"hp": -5, "gold": 2**40, "level": "7", "boardPower": 1.23456, "winStreak": None, "lossStreak": "lots"}), 4)
+        self.assertEqual([rounds.column("A", field)[slot] for field in ("hp", "gold", "level", "boardPower", "winStreak", "lossStreak")], [0, 2**31 - 1, 7, 12346, MISSING, MISSING])
+        self.assertEqual(rounds.column("A", "hp")[slot - 1], MISSING)
+        self.assertEqual(rounds.column("B", "hp")[slot], MISSING)
+        self.assertEqual(rounds.series(), {"A": {"hp": {"2-1": 0}, "gold": {"2-1": 2**31 - 1}, "level": {"2-1": 7}, "boardPower": {"2-1": 1.2346}}, "B": {}})
+        restored = MatchRounds.decode(rounds.encode(), rounds.created_at)
+        self.assertEqual(restored.columns, rounds.columns)
+
+    def test_a_write_refreshes_cached_spikes(self) -> None:
+        rounds = spiking("2-1", "1-4")
+        self.assertEqual(rounds.power_spikes(), (stage_slot(2, 1), stage_slot(1, 4)))
+        rounds.put("A", stage_slot(4, 1), {"boardPower": 50})
+        self.assertEqual(rounds.power_spikes(), (stage_slot(4, 1), stage_slot(1, 4)))
+
+
+class RoundStoreTest(unittest.TestCase):
+    def test_partial_ingests_merge_into_the_existing_match(self) -> None:
+        store = RoundStore()
+        self.assertEqual(store.ingest("NA1_1", [power("A", "2-1", 1.5, hp=80)]), (1, 0))
+        self.assertEqual(store.ingest("NA1_1", [power("b", "2-1", 2.0), {"playerSlot": "A", "round": "2-1", "gold": 30}, {"playerSlot": "A", "stageMajor": 2, "stageMinor": 2, "hp": 72}]), (3, 0))
+        self.assertEqual(len(store.matches), 1)
+        self.assertEqual(store.matches["NA1_1"].series(), {"A": {"hp": {"2-1": 80, "2-2": 72}, "gold": {"2-1": 30}, "boardPower": {"2-1": 1.5}}, "B": {"boardPower": {"2-1": 2.0}}})
+        # Retrying a snapshot overwrites the same cell instead of adding a round.
+        store.ingest("NA1_1", [power("A", "2-1", 1.75)])
+        self.assertEqual(store.matches["NA1_1"].series()["A"]["boardPower"], {"2-1": 1.75})
+
+    def test_unusable_snapshots_are_rejected_without_creating_a_series(self) -> None:
+        store = RoundStore()
+        self.assertEqual(store.ingest("NA1_2", [power("C", "2-1", 1.0), power("A", "9-1", 1.0), {"playerSlot": "A", "round": "2-1", "hp": "full"}, "not a snapshot"]), (0, 4))
+        self.assertNotIn("NA1_2", store.matches)
+
+    def test_capacity_drops_the_oldest_match(self) -> None:
+        store = RoundStore(capacity=2)
+        for match_id in ("NA1_1", "NA1_2", "NA1_3"):
+            store.ingest(match_id, [power("A", "2-1", 1.0)])
+        self.assertEqual(list(store.matches), ["NA1_2", "NA1_3"])
+        self.assertEqual(list(RoundStore(store.to_dict(), capacity=2).matches), ["NA1_2", "NA1_3"])
+
+    def test_windows_follow_game_time_with_ingest_time_as_fallback(self) -> None:
+        now = int(time.time() * 1000)
+        store = RoundStore()
+        for match_id in ("old_game", "recent_game", "unsummarized"):
+            store.ingest(match_id, [power("A", "2-1", 1.0)])
+        store.matches["stale_ingest"] = MatchRounds(created_at=now - 30 * DAY_MS)
+        played_at = {"old_game": now - 20 * DAY_MS, "recent_game": now - DAY_MS, "stale_ingest": now}
+        since_day = window_start_day(7, now)
+        self.assertEqual([match_id for match_id, _rounds in store.since(since_day, played_at)], ["recent_game", "unsummarized", "stale_ingest"])
+        self.assertEqual(len(store.since()), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+import http.server
+import threading
+import unittest
+
+import httpx
+
+from upstream_pools import UpstreamPools
+
+
+class OkHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *_args: object) -> None:
+        pass
+
+
+class ConnectionCountsTest(unittest.TestCase):
+    # connection_counts reads httpcore's pool internals; this pins that layout so an upgrade fails here, not silently.
+    def setUp(self) -> None:
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_counts_active_and_idle_connections(self) -> None:
+        async def run() -> list[dict[str, int] | None]:
+            pools = UpstreamPools(http2=False)
+            client = pools.client("other")
+            seen = [pools.connection_counts()["other"]]
+            async with client.stream("GET", self.url) as response:
+                seen.append(pools.connection_counts()["other"])
+                await response.aread()
+            seen.append(pools.connection_counts()["other"])
+            await pools.aclose()
+            return seen
+
+        self.assertEqual(asyncio.run(run()), [{"active": 0, "idle": 0}, {"active": 1, "idle": 0}, {"active": 0, "idle": 1}])
+
+    def test_transports_without_a_pool_report_unavailable(self) -> None:
+        async def app(_scope: object, _receive: object, _send: object) -> None:
+            pass
+
+        async def run() -> dict[str, object]:
+            pools = UpstreamPools(transport_factory=lambda _name: httpx.ASGITransport(app=app))
+            pools.client("other")
+            stats = pools.stats()["pools"]["other"]
+            await pools.aclose()
+            return stats
+
+        self.assertIsNone(asyncio.run(run())["connections"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import importlib.util
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from metrics import UPSTREAM_CONNECTIONS_OPENED, UPSTREAM_POOL_IN_FLIGHT, UPSTREAM_POOL_WAIT, InstrumentedTransport
+
+if TYPE_CHECKING:
+    import httpx
+
+RIOT_ROUTING_REGIONS = {"americas", "europe", "asia", "sea"}
+# Pool -> (max connections, keep-alive connections, keep-alive expiry s, connect timeout s, read timeout s, pool wait timeout s).
+# Riot routing hosts carry match fetches; OpenAI gets its own small pool so slow completions cannot starve them.
+POOL_DEFAULTS: dict[str, tuple[int, int, float, float, float, float]] = {
+    "riot-routing": (20, 20, 60.0, 5.0, 20.0, 10.0),
+    "riot-platform": (8, 8, 60.0, 5.0, 20.0, 10.0),
+    "cdragon": (4, 2, 30.0, 10.0, 30.0, 15.0),
+    "render": (10, 10, 30.0, 5.0, 20.0, 10.0),
+    "openai": (8, 4, 30.0, 10.0, 60.0, 5.0),
+    "other": (10, 5, 15.0, 10.0, 25.0, 10.0),
+}
+# First httpcore trace event after a request is handed to the pool, i.e. the moment it got a connection.
+CONNECTION_ACQUIRED_EVENTS = ("connection.connect_tcp.started", "http11.send_request_headers.started", "http2.send_request_headers.started")
+
+
+def pool_name(host: str) -> str:
+    if host.endswith(".api.riotgames.com"):
+        return "riot-routing" if host.split(".", 1)[0] in RIOT_ROUTING_REGIONS else "riot-platform"
+    if host.endswith("communitydragon.org"):
+        return "cdragon"
+    if host.endswith("render.com"):
+        return "render"
+    if host.endswith("openai.com"):
+        return "openai"
+    return "other"
+
+
+def parse_pool_limits(raw: str) -> dict[str, int]:
+    # Format: "riot-routing=32,openai=4" (pool=max connections); unknown pools and bad values are ignored.
+    limits: dict[str, int] = {}
+    for token in [part.strip() for part in str(raw or "").split(",") if part.strip()]:
+        name, _, value = token.partition("=")
+        try:
+            if name.strip() in POOL_DEFAULTS:
+                limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            continue
+    return limits
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class PoolTransport:
+    # Tracks in-flight requests per pool, time spent waiting for a pooled connection and new connections opened.
+    def __init__(self, name: str, transport: Any) -> None:
+        self.name = name
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        queued = time.perf_counter()
+        acquired = False
+
+        async def trace(event: str, _info: dict[str, Any]) -> None:
+            nonlocal acquired
+            if not acquired and event in CONNECTION_ACQUIRED_EVENTS:
+                acquired = True
+                UPSTREAM_POOL_WAIT.observe(time.perf_counter() - queued, pool=self.name)
+            if event == "connection.connect_tcp.complete":
+                UPSTREAM_CONNECTIONS_OPENED.inc(pool=self.name)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        UPSTREAM_POOL_IN_FLIGHT.inc(pool=self.name)
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            UPSTREAM_POOL_IN_FLIGHT.dec(pool=self.name)
+
+    def connection_counts(self) -> dict[str, int] | None:
+        # httpx exposes no public pool introspection (and httpcore fires no trace event when an idle connection
+        # expires), so this reads httpcore's pool behind AsyncHTTPTransport. httpcore is pinned in requirements.txt
+        # and tests/test_upstream_pools.py fails on a layout change; other transports report None (unavailable).
+        try:
+            connections = list(self.transport._pool.connections)
+            idle = sum(1 for connection in connections if connection.is_idle())
+        except Exception:
+            return None
+        return {"active": len(connections) - idle, "idle": idle}
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class UpstreamPools:
+    # One lazily created AsyncClient per upstream pool, each with its own limits and timeouts. transport_factory
+    # replaces the network transport (load tests route every pool to an in-process stand-in).
+    def __init__(self, limits: dict[str, int] | None = None, http2: bool = True, transport_factory: Callable[[str], Any] | None = None) -> None:
+        self.limits = dict(limits or {})
+        self.http2 = bool(http2) and http2_available()
+        self.transport_factory = transport_factory
+        self.clients: dict[str, httpx.AsyncClient] = {}
+        self.transports: dict[str, PoolTransport] = {}
+        self.warmup: dict[str, Any] = {}
+
+    def settings(self, name: str) -> tuple[int, int, float, float, float, float]:
+        max_connections, keepalive, expiry, connect, read, pool = POOL_DEFAULTS[name]
+        max_connections = self.limits.get(name, max_connections)
+        return max_connections, min(keepalive, max_connections), expiry, connect, read, pool
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        client = self.clients.get(name)
+        if client is None:
+            import httpx
+
+            max_connections, keepalive, expiry, connect, read, pool = self.settings(name)
+            if self.transport_factory is not None:
+                transport = self.transport_factory(name)
+            else:
+                limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=keepalive, keepalive_expiry=expiry)
+                transport = httpx.AsyncHTTPTransport(limits=limits, http2=self.http2)
+            self.transports[name] = PoolTransport(name, transport)
+            client = httpx.AsyncClient(timeout=httpx.Timeout(read, connect=connect, pool=pool), transport=InstrumentedTransport(self.transports[name]))
+            self.clients[name] = client
+        return client
+
+    def for_url(self, url: str) -> httpx.AsyncClient:
+        host = url.split("://", 1)[-1].split("/", 1)[0].split(":", 1)[0].lower()
+        return self.client(pool_name(host))
+
+    async def warm_up(self, urls: dict[str, str | None], fetch: Callable[[str], Awaitable[Any]]) -> dict[str, Any]:
+        # Opens (TLS + HTTP/2 negotiation) one keep-alive connection per host with a cheap authenticated request
+        # through `fetch`, so the call is budgeted and answered like real traffic instead of a 401/404 on "/".
+        # urls maps host -> URL (None when the host has no cheap endpoint yet). httpx is imported off the event loop
+        # so a freshly woken instance keeps serving while this runs.
+        await asyncio.to_thread(importlib.import_module, "httpx")
+
+        async def open_one(host: str, url: str | None) -> None:
+            if url is None:
+                self.warmup[host] = {"skipped": "no cheap authenticated endpoint"}
+                return
+            started = time.perf_counter()
+            try:
+                await fetch(url)
+                self.warmup[host] = {"ms": round((time.perf_counter() - started) * 1000, 1)}
+            except Exception as error:
+                self.warmup[host] = {"error": type(error).__name__, "status": getattr(error, "status", None)}
+            # Idle connections left in the host's pool, i.e. whether the next request can reuse one.
+            self.warmup[host]["idleConnections"] = (self.connection_counts().get(pool_name(host)) or {}).get("idle")
+
+        await asyncio.gather(*(open_one(host, url) for host, url in urls.items()))
+        return dict(self.warmup)
+
+    def connection_counts(self) -> dict[str, dict[str, int] | None]:
+        return {name: transport.connection_counts() for name, transport in self.transports.items()}
+
+    def stats(self) -> dict[str, Any]:
+        counts = self.connection_counts()
+        pools = {}
+        for name in POOL_DEFAULTS:
+            max_connections, keepalive, _expiry, _connect, read, pool = self.settings(name)
+            pools[name] = {"open": name in self.clients, "maxConnections": max_connections, "keepalive": keepalive, "readTimeout": read, "poolTimeout": pool, "inFlight": int(UPSTREAM_POOL_IN_FLIGHT.values.get((name,), 0)), "connections": counts.get(name)}
+        return {"http2": self.http2, "pools": pools, "warmup": dict(self.warmup)}
+
+    async def aclose(self) -> None:
+        clients, self.clients, self.transports = list(self.clients.values()), {}, {}
+        for client in clients:
+            await client.aclose()
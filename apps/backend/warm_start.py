@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+SNAPSHOT_MAGIC = b"TFTWARM1"
+
+
+def process_started_at() -> float:
+    # Wall-clock process start from /proc (10 ms resolution), so interpreter start-up and imports count toward wake time.
+    try:
+        with open("/proc/self/stat", encoding="utf-8") as handle:
+            start_ticks = int(handle.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="utf-8") as handle:
+            uptime = float(handle.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+class BootClock:
+    # Milestones in milliseconds since process start: imported, startup (incl. snapshot restore), firstResponse.
+    def __init__(self, ignore_paths: tuple[str, ...] = ("/health", "/metrics")) -> None:
+        self.started_at = process_started_at()
+        self.ignore_paths = ignore_paths
+        self.marks: dict[str, float] = {}
+        self.details: dict[str, Any] = {}
+
+    def mark(self, phase: str, **details: Any) -> None:
+        self.marks.setdefault(phase, round((time.time() - self.started_at) * 1000, 1))
+        if details:
+            self.details[phase] = details
+
+    def report(self) -> dict[str, Any]:
+        return {"processStartedAt": int(self.started_at * 1000), "marksMs": dict(self.marks), "details": dict(self.details)}
+
+
+class FirstResponseMiddleware:
+    # Records the first successful response to a real route: the "first useful response" after a wake.
+    def __init__(self, app: Any, clock: BootClock) -> None:
+        self.app = app
+        self.clock = clock
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        path = scope.get("path") or ""
+        if scope["type"] != "http" or "firstResponse" in self.clock.marks or path in self.clock.ignore_paths:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marking(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self.clock.mark("firstResponse", path=path, status=message["status"])
+            await send(message)
+
+        await self.app(scope, receive, send_marking)
+
+
+class AnalysisMemo:
+    # Recent per-duo analytics responses keyed by (endpoint, duoId, windowDays); entries expire after ttl_seconds
+    # and are dropped whenever the duo's data changes.
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 256) -> None:
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.max_entries = max(1, int(max_entries))
+        self.entries: OrderedDict[str, tuple[float, str, Any]] = OrderedDict()
+
+    def get(self, kind: str, duo_id: str, window_days: int) -> Any | None:
+        key = f"{kind}:{duo_id}:{int(window_days)}"
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] >= self.ttl_seconds:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, kind: str, duo_id: str, window_days: int, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        key = f"{kind}:{duo_id}:{int(window_days)}"
+        self.entries[key] = (time.time(), duo_id, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, duo_id: str) -> None:
+        for key in [key for key, entry in self.entries.items() if entry[1] == duo_id]:
+            del self.entries[key]
+
+    def export(self) -> list[list[Any]]:
+        cutoff = time.time() - self.ttl_seconds
+        return [[key, *entry] for key, entry in self.entries.items() if entry[0] > cutoff]
+
+    def restore(self, rows: list[list[Any]]) -> int:
+        for key, stamp, duo_id, value in rows:
+            self.entries[key] = (stamp, duo_id, value)
+        return len(rows)
+
+
+def write_snapshot(path: Path, state: dict[str, Any]) -> int:
+    # Compact binary file: magic header + zlib-compressed JSON. Written to a temp file and swapped in atomically.
+    data = SNAPSHOT_MAGIC + zlib.compress(json.dumps(state, separators=(",", ":"), default=str).encode("utf-8"), 6)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix(path.suffix + ".tmp")
+    temp.write_bytes(data)
+    os.replace(temp, path)
+    return len(data)
+
+
+def read_snapshot(path: Path) -> dict[str, Any] | None:
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if not data.startswith(SNAPSHOT_MAGIC):
+        return None
+    try:
+        state = json.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC) :]))
+    except (zlib.error, ValueError):
+        return None
+    return state if isinstance(state, dict) else None
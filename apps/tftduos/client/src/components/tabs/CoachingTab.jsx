@@ -378,7 +378,7 @@ export default function CoachingTab({
             <Tooltip content="AI-first coaching dashboard with compact high-signal KPIs.">
               <Heading size={600}>Duo Coaching Console</Heading>
             </Tooltip>
-            {aiCoaching?.fallback ? <Badge color="yellow">Fallback</Badge> : <Badge color="green">Live LLM</Badge>}
+            {aiCoaching?.provisional ? <Badge color="neutral">Streaming</Badge> : aiCoaching?.fallback ? <Badge color="yellow">Fallback</Badge> : <Badge color="green">Live LLM</Badge>}
             {aiCoaching?.webSearchUsed ? <Badge color="blue">Web Meta</Badge> : null}
           </Pane>
           <Pane display="flex" alignItems="center" gap={8} flexWrap="wrap">
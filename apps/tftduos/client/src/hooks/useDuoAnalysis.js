@@ -13,6 +13,7 @@ import {
   toEpochMs,
 } from "../utils/tft";
 import { buildCoachingIntel } from "../utils/coachingIntel";
+import { readSseStream } from "../utils/sse";
 
 const API_BASE_URL = String(import.meta.env.VITE_API_BASE_URL || "").trim().replace(/\/+$/, "");
 const EMPTY_MATCHES = [];
@@ -711,13 +712,38 @@ export default function useDuoAnalysis() {
     setAiCoachingLoading(true);
     setAiCoachingError("");
     try {
-      const response = await fetch(apiUrl("/api/coach/llm-brief"), {
+      const response = await fetch(apiUrl("/api/coach/llm-brief/stream"), {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
         body: JSON.stringify(requestBody),
       });
-      const data = await response.json();
-      if (!response.ok || !data?.ok) {
+      if (!response.ok) {
+        const failure = await response.json().catch(() => null);
+        throw new Error(failure?.error || "Failed to generate AI coaching.");
+      }
+      let data = null;
+      await readSseStream(response, ({ event, data: eventData }) => {
+        if (aiRequestKeyRef.current !== requestKey) return;
+        if (event === "findings") {
+          // Show the server's local brief right away; the live model brief replaces it when the stream finishes.
+          setAiCoaching({
+            ok: true,
+            fallback: true,
+            provisional: true,
+            reason: "Live brief streaming",
+            model: null,
+            generatedAt: Date.now(),
+            deterministicFindings: eventData?.deterministicFindings || null,
+            brief: eventData?.provisionalBrief || null,
+            cacheHit: false,
+          });
+          setAiCoachingLoading(false);
+        } else if (event === "brief") {
+          data = eventData;
+        }
+      });
+      if (aiRequestKeyRef.current !== requestKey) return;
+      if (!data?.ok) {
         throw new Error(data?.error || "Failed to generate AI coaching.");
       }
       setAiCoaching({ ...data, cacheHit: false });
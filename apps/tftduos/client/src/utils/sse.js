@@ -0,0 +1,59 @@
+export function parseSseBlock(block) {
+  let event = "message";
+  const dataLines = [];
+  for (const rawLine of String(block || "").split(/\r?\n/)) {
+    if (!rawLine || rawLine.startsWith(":")) continue;
+    const colon = rawLine.indexOf(":");
+    const field = colon < 0 ? rawLine : rawLine.slice(0, colon);
+    let value = colon < 0 ? "" : rawLine.slice(colon + 1);
+    if (value.startsWith(" ")) value = value.slice(1);
+    if (field === "event") event = value;
+    if (field === "data") dataLines.push(value);
+  }
+  if (!dataLines.length) return null;
+  const raw = dataLines.join("\n");
+  try {
+    return { event, data: JSON.parse(raw) };
+  } catch {
+    return { event, data: raw };
+  }
+}
+
+export function createSseParser(onEvent) {
+  let buffer = "";
+  return {
+    push(text) {
+      buffer += String(text || "").replace(/\r\n/g, "\n");
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary >= 0) {
+        const parsed = parseSseBlock(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        if (parsed) onEvent(parsed);
+        boundary = buffer.indexOf("\n\n");
+      }
+    },
+    flush() {
+      const parsed = parseSseBlock(buffer);
+      buffer = "";
+      if (parsed) onEvent(parsed);
+    },
+  };
+}
+
+export async function readSseStream(response, onEvent) {
+  const parser = createSseParser(onEvent);
+  if (!response?.body?.getReader) {
+    parser.push(await response.text());
+    parser.flush();
+    return;
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    parser.push(decoder.decode(value, { stream: true }));
+  }
+  parser.push(decoder.decode());
+  parser.flush();
+}
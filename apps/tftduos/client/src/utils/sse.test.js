@@ -0,0 +1,38 @@
+import { describe, expect, it } from "vitest";
+import { createSseParser, parseSseBlock, readSseStream } from "./sse";
+
+describe("parseSseBlock", () => {
+  it("parses event name and JSON data", () => {
+    expect(parseSseBlock('event: findings\ndata: {"promptTokens":12}')).toEqual({ event: "findings", data: { promptTokens: 12 } });
+  });
+
+  it("defaults to message events and keeps non-JSON data as text", () => {
+    expect(parseSseBlock("data: hello\ndata: world")).toEqual({ event: "message", data: "hello\nworld" });
+  });
+
+  it("ignores comments and blocks without data", () => {
+    expect(parseSseBlock(": keep-alive\nevent: delta")).toBeNull();
+  });
+});
+
+describe("createSseParser", () => {
+  it("emits events only once a block is complete across chunks", () => {
+    const events = [];
+    const parser = createSseParser((event) => events.push(event));
+    parser.push('event: delta\ndata: {"text":"He');
+    expect(events).toHaveLength(0);
+    parser.push('llo"}\n\nevent: brief\ndata: {"ok":true}\n');
+    expect(events).toEqual([{ event: "delta", data: { text: "Hello" } }]);
+    parser.flush();
+    expect(events[1]).toEqual({ event: "brief", data: { ok: true } });
+  });
+});
+
+describe("readSseStream", () => {
+  it("falls back to reading the whole body when streaming is unavailable", async () => {
+    const events = [];
+    const response = { text: async () => 'event: findings\ndata: {"a":1}\n\nevent: brief\ndata: {"b":2}\n\n' };
+    await readSseStream(response, (event) => events.push(event.event));
+    expect(events).toEqual(["findings", "brief"]);
+  });
+});